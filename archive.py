@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+
+from models import Event, Submission, Vote
+from scoring import Standing
+
+# Archival settings used when config.yaml has no "archive" section
+DEFAULT_ARCHIVE_SETTINGS = {
+    "enabled": True,
+    "directory": "archive",  # Relative paths are next to the database file
+    "archive_after": 24,     # Hours after an event ends before its rows leave the hot tables
+    "retention_days": None,  # Days after an event ends before its archive is deleted (None: keep forever)
+    "interval": 3600,        # Seconds between archival passes
+}
+
+# Archive tables: (name, columns, hot table query for one event). Columns are declared
+# without types so values keep the storage class they had in the hot tables.
+ARCHIVE_TABLES = [
+    ("events", Event.__slots__, f"SELECT {Event.columns()} FROM events WHERE event_id = ?"),
+    ("submissions", Submission.__slots__, f"SELECT {Submission.columns()} FROM submissions WHERE event_id = ?"),
+    ("votes", Vote.__slots__, f"SELECT {Vote.columns()} FROM votes WHERE event_id = ? ORDER BY vote_id"),
+    (
+        "submission_scores",
+        ("submission_id", "score", "vote_count", "last_voted_at"),
+        "SELECT submission_id, score, vote_count, last_voted_at FROM submission_scores WHERE event_id = ?"
+    ),
+    (
+        "standings_snapshots",
+        ("snapshot_id", "published_at"),
+        "SELECT snapshot_id, published_at FROM standings_snapshots WHERE event_id = ? ORDER BY snapshot_id"
+    ),
+    (
+        "standings_snapshot_rows",
+        ("snapshot_id", "submission_id", "rank", "score"),
+        "SELECT r.snapshot_id, r.submission_id, r.rank, r.score "
+        "FROM standings_snapshot_rows r "
+        "JOIN standings_snapshots ss ON ss.snapshot_id = r.snapshot_id "
+        "WHERE ss.event_id = ?"
+    ),
+]
+
+# Hot rows removed once an event is archived, children first. The events row itself stays
+# (marked with archived_at) so names and guilds still resolve.
+HOT_DELETES = [
+    "DELETE FROM standings_snapshot_rows WHERE snapshot_id IN (SELECT snapshot_id FROM standings_snapshots WHERE event_id = ?)",
+    "DELETE FROM standings_snapshots WHERE event_id = ?",
+    "DELETE FROM submission_messages WHERE event_id = ?",
+    "DELETE FROM votes WHERE event_id = ?",
+    "DELETE FROM submission_scores WHERE event_id = ?",
+    "DELETE FROM submissions WHERE event_id = ?",
+]
+
+def archive_directory(cursor, directory=None):
+    """Resolves the archive directory on the host that holds the database.
+
+    Relative directories are taken relative to the database file, so the storage server
+    and the bot agree on it whichever of them runs the query.
+    """
+    cursor.execute("PRAGMA database_list")
+    database_path = next(row[2] for row in cursor.fetchall() if row[1] == "main")
+    return os.path.join(os.path.dirname(database_path), directory or DEFAULT_ARCHIVE_SETTINGS["directory"])
+
+def archive_path(cursor, event_id, directory=None):
+    return os.path.join(archive_directory(cursor, directory), f"event-{event_id}.sqlite")
+
+ARCHIVABLE_EVENTS_QUERY = "SELECT event_id FROM events WHERE active = 0 AND archived_at IS NULL AND end_at < ?"
+
+def get_archivable_events(cursor, ended_before):
+    """Returns the ids of inactive, unarchived events that ended before ended_before."""
+    cursor.execute(ARCHIVABLE_EVENTS_QUERY, (ended_before,))
+    return [row[0] for row in cursor.fetchall()]
+
+def write_archive(path, tables):
+    """Writes {table: (columns, rows)} to a new SQLite file at path, replacing it atomically."""
+    partial_path = path + ".partial"
+    if os.path.exists(partial_path):
+        os.remove(partial_path)
+    archive = sqlite3.connect(partial_path)
+    try:
+        # Written once and then only read: no journal, and fsynced once before the rename
+        archive.execute("PRAGMA journal_mode = OFF")
+        archive.execute("PRAGMA synchronous = OFF")
+        for table, (columns, rows) in tables.items():
+            archive.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+            archive.executemany(
+                f"INSERT INTO {table} VALUES ({', '.join('?' for _ in columns)})",
+                rows
+            )
+        archive.commit()
+    finally:
+        archive.close()
+    with open(partial_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(partial_path, path)
+
+def archive_event(conn, cursor, event_id, directory=None):
+    """Moves an ended event's submissions, votes, scores and snapshots to its archive file.
+
+    The archive is written and renamed into place before the hot rows are deleted, in the
+    same write transaction, so a crash leaves either the hot rows or both. Returns the
+    archive path, or None when the event is active or already archived.
+    """
+    if not conn.in_transaction:
+        cursor.execute("BEGIN IMMEDIATE")
+    cursor.execute("SELECT active, archived_at FROM events WHERE event_id = ?", (event_id,))
+    row = cursor.fetchone()
+    if row is None or row[0] or row[1] is not None:
+        return None
+
+    archived_at = int(time.time())
+    tables = {}
+    for table, columns, query in ARCHIVE_TABLES:
+        cursor.execute(query, (event_id,))
+        tables[table] = (columns, cursor.fetchall())
+    # The archived copy of the event row already carries its archived_at (the last column)
+    columns, rows = tables["events"]
+    tables["events"] = (columns, [row[:-1] + (archived_at,) for row in rows])
+
+    path = archive_path(cursor, event_id, directory)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_archive(path, tables)
+
+    for statement in HOT_DELETES:
+        cursor.execute(statement, (event_id,))
+    cursor.execute("UPDATE events SET archived_at = ? WHERE event_id = ?", (archived_at, event_id))
+    return path
+
+def expire_archives(conn, cursor, ended_before, directory=None):
+    """Deletes the event rows of archived events that ended before ended_before.
+
+    Returns [(event_id, archive path), ...]. The files are left in place: remove them with
+    remove_archives once this transaction has committed, so a rollback never leaves event
+    rows without their archives.
+    """
+    cursor.execute(
+        "SELECT event_id FROM events WHERE archived_at IS NOT NULL AND end_at < ?",
+        (ended_before,)
+    )
+    expired = [(row[0], archive_path(cursor, row[0], directory)) for row in cursor.fetchall()]
+    for event_id, path in expired:
+        cursor.execute("DELETE FROM events WHERE event_id = ?", (event_id,))
+    return expired
+
+def remove_archives(conn, cursor, paths):
+    """Deletes archive files whose event rows are gone. Returns the paths that were removed."""
+    removed = []
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+            removed.append(path)
+    return removed
+
+def read_archive(cursor, event_id, directory=None):
+    """Reads an event's archive file. Returns {table: rows}, or None when there is none."""
+    path = archive_path(cursor, event_id, directory)
+    if not os.path.exists(path):
+        return None
+    archive = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True)
+    try:
+        return {
+            table: archive.execute(f"SELECT {', '.join(columns)} FROM {table}").fetchall()
+            for table, columns, query in ARCHIVE_TABLES
+        }
+    finally:
+        archive.close()
+
+class EventArchive:
+    """An archived event loaded into memory for historical stats."""
+
+    def __init__(self, tables):
+        self.event = Event.from_row(tables["events"][0])
+        self.submissions = [Submission.from_row(row) for row in tables["submissions"]]
+        self.votes = [Vote.from_row(row) for row in tables["votes"]]
+        self.scores = {submission_id: (score, vote_count) for submission_id, score, vote_count, _ in tables["submission_scores"]}
+        self.snapshots = tables["standings_snapshots"]
+
+    def standings(self):
+        """Final standings, ranked like scoring.get_standings."""
+        rows = []
+        for submission in self.submissions:
+            score, vote_count = self.scores.get(submission.submission_id, (0, 0))
+            rows.append((-score, -vote_count, submission.submission_id, submission))
+        rows.sort()
+        return [
+            Standing(rank, submission.submission_id, submission.track_id, submission.song_name, submission.url, submission.submitter_name, -score, -vote_count)
+            for rank, (score, vote_count, _, submission) in enumerate(rows, 1)
+        ]
+
+    def voter_count(self):
+        return len({vote.user_id for vote in self.votes})
+
+class Archiver:
+    """Moves ended events out of the hot tables and deletes archives past their retention.
+
+    Runs a pass every interval seconds in one process (the one running shard 0). Archival
+    waits archive_after hours so the end-of-event reveal and late admin commands still
+    read the hot tables.
+    """
+
+    def __init__(self, db, settings=None):
+        self.db = db
+        settings = dict(DEFAULT_ARCHIVE_SETTINGS, **(settings or {}))
+        self.enabled = bool(settings["enabled"])
+        self.directory = settings["directory"]
+        self.archive_after = float(settings["archive_after"]) * 3600
+        self.retention = float(settings["retention_days"]) * 86400 if settings["retention_days"] is not None else None
+        self.interval = float(settings["interval"])
+
+    async def run(self):
+        if not self.enabled or self.interval <= 0:
+            return
+        while True:
+            try:
+                await self.archive_due()
+            except (sqlite3.Error, OSError) as e:
+                logging.error(f"Archival pass failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def archive_due(self):
+        """Archives every event past archive_after and expires archives past the retention."""
+        now = int(time.time())
+        archived = []
+        for event_id in await self.db.get_archivable_events(now - self.archive_after):
+            path = await self.db.archive_event(event_id, self.directory)
+            if path:
+                logging.info(f"Archived event {event_id} to {path}")
+                archived.append(event_id)
+        expired = []
+        if self.retention is not None:
+            expired_archives = await self.db.expire_archives(now - self.retention, self.directory)
+            if expired_archives:
+                # Only now that the event rows are gone for good
+                await self.db.remove_archives([path for event_id, path in expired_archives])
+                expired = [event_id for event_id, path in expired_archives]
+                logging.info(f"Deleted the archives of events {expired}")
+        return archived, expired
+
+    async def load(self, event_id):
+        """Returns the EventArchive of an archived event, or None."""
+        tables = await self.db.read_archive(event_id, self.directory)
+        return EventArchive(tables) if tables else None
@@ -0,0 +1,287 @@
+"""Offline benchmarks for the voting and scoring hot paths.
+
+Seeds a scratch SQLite database, loads the real bot modules against it with stub
+Discord objects, times each code path and writes the results as JSON:
+
+    python benchmark.py --submissions 200 --votes 3000 --output results.json
+    python benchmark.py --compare baseline.json --output results.json
+
+With --compare, paths whose mean time grew by more than --tolerance are reported and
+the exit status is 1.
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from migrations import migrate
+import scoring
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_ids = itertools.count(10_000_000)
+
+class StubMessage:
+    def __init__(self, message_id=None, channel=None, content=None, embed=None):
+        self.id = message_id if message_id is not None else next(_ids)
+        self.channel = channel
+        self.content = content
+        self.embed = embed
+        self.author = None
+
+    async def edit(self, content=None, embed=None):
+        self.embed = embed
+
+class StubChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.sent = 0
+
+    async def send(self, content=None, embed=None):
+        self.sent += 1
+        return StubMessage(channel=self, content=content, embed=embed)
+
+    async def fetch_message(self, message_id):
+        return StubMessage(message_id, channel=self)
+
+class StubUser:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.name = f"user{user_id}"
+
+class StubReaction:
+    def __init__(self, message):
+        self.message = message
+
+def seed(path, events, submissions, votes, seed_value):
+    """Creates events with submissions, votes and submission messages.
+
+    The last event is the active one that the benchmarks run against. Returns
+    (active_event_id, [submission ids], {submission_id: message_id}).
+    """
+    rng = random.Random(seed_value)
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    cursor = conn.cursor()
+
+    now = int(time.time())
+    event_id = submission_ids = messages = None
+    for event_number in range(events):
+        active = event_number == events - 1
+        cursor.execute(
+            (
+                "INSERT INTO events (name, duration, start_at, end_at, channel_id, message_id, active) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)"
+            ),
+            (
+                f"Benchmark {event_number}", 7,
+                now - 3600, now + 24 * 3600,
+                1000 + event_number, next(_ids), int(active)
+            )
+        )
+        event_id = cursor.lastrowid
+
+        rows = [
+            (event_id, n, f"Song {n}", f"https://example.com/{event_id}/{n}", 200, now - 3600, f"Track-{n}", f"submitter{n}")
+            for n in range(1, submissions + 1)
+        ]
+        cursor.executemany(
+            (
+                "INSERT INTO submissions (event_id, user_id, song_name, url, duration, submitted_at, track_id, submitter_name) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+            ),
+            rows
+        )
+        cursor.execute("SELECT submission_id FROM submissions WHERE event_id = ?", (event_id,))
+        submission_ids = [row[0] for row in cursor.fetchall()]
+
+        # Votes are spread over the hour since the event started
+        vote_rows = []
+        for user_id in range(1, votes // 3 + 1):
+            for rank, submission_id in enumerate(rng.sample(submission_ids, min(3, len(submission_ids)))):
+                vote_rows.append((submission_id, event_id, user_id, (5, 3, 1)[rank], rank, now - rng.randrange(3600), f"voter{user_id}"))
+        cursor.executemany(
+            (
+                "INSERT INTO votes (submission_id, event_id, user_id, vote_value, vote_rank, voted_at, voter_name) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)"
+            ),
+            vote_rows
+        )
+
+        messages = {submission_id: next(_ids) for submission_id in submission_ids}
+        cursor.executemany(
+            "INSERT INTO submission_messages (message_id, event_id, submission_id) VALUES (?, ?, ?)",
+            [(message_id, event_id, submission_id) for submission_id, message_id in messages.items()]
+        )
+    conn.commit()
+    scoring.rebuild_scores(conn, cursor)
+    conn.commit()
+    conn.close()
+    return event_id, submission_ids, messages
+
+def summarize(durations, wall_time=None):
+    durations = sorted(durations)
+    count = len(durations)
+    total = sum(durations)
+    return {
+        "iterations": count,
+        "total_s": round(total, 6),
+        "mean_ms": round(total / count * 1000, 4),
+        "p50_ms": round(durations[count // 2] * 1000, 4),
+        "p95_ms": round(durations[min(count - 1, int(count * 0.95))] * 1000, 4),
+        "max_ms": round(durations[-1] * 1000, 4),
+        "ops_per_s": round(count / (wall_time if wall_time is not None else total), 2) if total else None,
+    }
+
+async def measure(fn, iterations):
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await fn()
+        durations.append(time.perf_counter() - start)
+    return summarize(durations)
+
+async def run_benchmarks(args, event_id, submission_ids, messages):
+    # Imported here: the bot modules open DB_PATH and read config.yaml at import time
+    with contextlib.redirect_stdout(sys.stderr):
+        import bot_core
+        from bot_setup import vote_queue, outbound, message_index, rankings, event_cache
+
+    logging.getLogger().setLevel(logging.WARNING)
+    bot = bot_core.bot
+    channels = {}
+    bot.get_channel = lambda channel_id: channels.setdefault(channel_id, StubChannel(channel_id))
+
+    await bot.load_extension("commands")
+    vote_queue.start()
+    outbound.start()
+    await message_index.load()
+    await rankings.load()
+    await event_cache.load()
+    cog = bot.get_cog("Commands")
+    await cog.load_milestones()
+
+    ended = []
+    async def skip_end_event(ended_event_id):
+        ended.append(ended_event_id)
+    cog.end_event = skip_end_event  # The reveal waits on an admin reply; ranking is timed on its own below
+
+    results = {}
+    rng = random.Random(args.seed)
+    iterations = args.iterations
+
+    # Reaction votes: every voter reacts to three submissions, all voters at once
+    reactions = [
+        (StubReaction(StubMessage(messages[submission_id])), StubUser(1_000_000 + voter))
+        for voter in range(args.reactions // 3)
+        for submission_id in rng.sample(submission_ids, min(3, len(submission_ids)))
+    ]
+    latencies = []
+    async def react(reaction, user):
+        start = time.perf_counter()
+        await bot_core.on_reaction_add(reaction, user)
+        latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    await asyncio.gather(*(react(reaction, user) for reaction, user in reactions))
+    results["on_reaction_add"] = summarize(latencies, time.perf_counter() - start)
+
+    sample = [rng.choice(submission_ids) for _ in range(iterations)]
+    scores = iter(sample)
+    results["calculate_score"] = await measure(lambda: cog.calculate_score(next(scores)), iterations)
+    results["render_event_message"] = await measure(lambda: cog.render_event_message(event_id), iterations)
+    results["generate_public_leaderboard"] = await measure(lambda: cog.generate_public_leaderboard(event_id, "Benchmark"), iterations)
+    results["generate_user_leaderboard"] = await measure(lambda: cog.generate_user_leaderboard(event_id, "Benchmark", 1), iterations)
+
+    async def admin_leaderboard():
+        async for chunk in cog.generate_admin_leaderboard(event_id, "Benchmark"):
+            pass
+    results["generate_admin_leaderboard"] = await measure(admin_leaderboard, max(1, iterations // 10))
+
+    async def vote_stats():
+        async for line in cog.vote_stats_lines(await event_cache.get_event(event_id), 60):
+            pass
+    results["vote_stats"] = await measure(vote_stats, max(1, iterations // 10))
+
+    async def end_event_ranking():
+        ranking = await rankings.get_ranking(event_id)
+        ranking.top(10)
+        ranking.bottom_up()
+    results["end_event_ranking"] = await measure(end_event_ranking, iterations)
+
+    async def end_event_ranking_cold():
+        rankings.drop_event(event_id)
+        await rankings.load(event_id)
+        await end_event_ranking()
+    results["end_event_ranking_cold"] = await measure(end_event_ranking_cold, max(1, iterations // 10))
+
+    await vote_queue.stop()
+    await outbound.stop()
+    cog.event_scheduler.stop()
+    return results, len(ended)
+
+def compare(results, baseline, tolerance):
+    """Returns [(name, baseline_mean_ms, mean_ms)] for every path slower than baseline by more than tolerance."""
+    regressions = []
+    for name, stats in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if previous and stats["mean_ms"] > previous["mean_ms"] * (1 + tolerance):
+            regressions.append((name, previous["mean_ms"], stats["mean_ms"]))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bot's voting and scoring paths without Discord.")
+    parser.add_argument("--events", type=int, default=3, help="Events to seed (the last one is active)")
+    parser.add_argument("--submissions", type=int, default=100, help="Submissions per event")
+    parser.add_argument("--votes", type=int, default=1500, help="Seeded votes per event")
+    parser.add_argument("--reactions", type=int, default=600, help="Reaction votes cast during the benchmark")
+    parser.add_argument("--iterations", type=int, default=200, help="Iterations per timed path")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the generated data")
+    parser.add_argument("--output", default="-", help="Where to write the JSON results (- for stdout)")
+    parser.add_argument("--compare", help="Earlier results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before a path counts as a regression")
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))  # config.yaml is read from the working directory
+    with tempfile.TemporaryDirectory() as scratch:
+        os.environ["DB_PATH"] = os.path.join(scratch, "benchmark.db")
+        event_id, submission_ids, messages = seed(os.environ["DB_PATH"], args.events, args.submissions, args.votes, args.seed)
+        results, ended = asyncio.run(run_benchmarks(args, event_id, submission_ids, messages))
+
+        from bot_setup import db
+        db.close()
+
+    report = {
+        "timestamp": datetime.now().strftime(DATE_FORMAT),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "tolerance")},
+        "end_event_calls": ended,  # Submissions that reached the score limit during on_reaction_add
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, before, after in regressions:
+            print(f"Regression: {name} {before:.3f} ms -> {after:.3f} ms", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,11 @@
 import os
-import sqlite3  # Import the sqlite3 module
-
-# Get the absolute path of the directory where bot_setup.py is located
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-
-# Construct the absolute path to the database file
-DB_PATH = os.path.join(BASE_DIR, "countdown_bot.db")
-
-conn = sqlite3.connect(DB_PATH)
-cursor = conn.cursor()
 import logging
-import asyncio
-from datetime import datetime, timedelta
 
 import discord
 from discord.ext import commands
 
-from bot_setup import conn, cursor, get_active_event, setup_db, DB_PATH, config
+import metrics
+from bot_setup import db, vote_queue, message_index, rankings, outbound, config, guild_config, shards, archiver
 
 # Configure logging
 logging.basicConfig(level=config['bot']['log_level'])
@@ -26,117 +15,107 @@ intents = discord.Intents.default()
 intents.message_content = True
 intents.reactions = True
 intents.members = True
-bot = commands.Bot(command_prefix="/", intents=intents)
+if shards.sharded:
+    # This process runs shard_ids (all shards when unset) of shard_count
+    bot = commands.AutoShardedBot(command_prefix="/", intents=intents, shard_count=shards.shard_count, shard_ids=shards.shard_ids)
+else:
+    bot = commands.Bot(command_prefix="/", intents=intents)
+
+REACTION_SECONDS = metrics.REGISTRY.histogram(
+    "countdown_reaction_duration_seconds",
+    "Duration of on_reaction_add, from the reaction to the vote being applied"
+)
 
 async def setup_hook() -> None:
-    """Loads commands extension and starts event loops for active events."""
-    cursor.execute(
-        (
-            "SELECT event_id "
-            "FROM events "
-            "WHERE active = 1"
-        )
-    )
-    active_events = cursor.fetchall()
-
-    for event in active_events:
-        event_id = event[0]
-        bot.loop.create_task(bot.get_cog("Commands").event_loop(event_id))
+    """Loads commands extension and schedules the deadlines of active events."""
     await bot.load_extension('commands')
+    bot.loop.create_task(db.checkpoint_loop())
+    if shards.owns(None):
+        bot.loop.create_task(archiver.run())
+    # Replay journaled votes first so the indexes below load the recovered scores
+    for event_id in await vote_queue.recover():
+        if await db.verify_scores(event_id):
+            await db.rebuild_scores(event_id)
+            logging.warning(f"Rebuilt the scores of event {event_id} after replaying the vote journal")
+    vote_queue.start()
+    outbound.start()
+    await message_index.load()
+    await rankings.load()
+    await guild_config.load()
+    commands_cog = bot.get_cog("Commands")
+    await commands_cog.load_schedule()
+
+    registry = metrics.REGISTRY
+    registry.gauge("countdown_active_events", "Events with a pending deadline", lambda: len(commands_cog.event_scheduler.scheduled_events()))
+    registry.gauge("countdown_pending_embed_updates", "Events waiting for a coalesced embed update", commands_cog.embed_updates.pending)
+    registry.gauge("countdown_vote_queue_depth", "Votes waiting to be committed", vote_queue.pending)
+    registry.gauge("countdown_outbound_queue_depth", "Discord sends and edits waiting in the outbound queue", outbound.pending)
+    registry.gauge("countdown_submission_message_routes", "Submission messages routed in memory", lambda: len(message_index))
+    await registry.start_server()
+
+bot.setup_hook = setup_hook
+
+async def close() -> None:
+    """Writes any queued votes and finishes in-flight sends before disconnecting."""
+    commands_cog = bot.get_cog("Commands")
+    if commands_cog:
+        commands_cog.event_scheduler.stop()
+    await vote_queue.stop()
+    await outbound.stop()
+    await metrics.REGISTRY.stop_server()
+    await commands.Bot.close(bot)
 
-# Constants
-VOTE_VALUES = {0: 5, 1: 3, 2: 1}  # Updated weighted scoring
-WINNERS_CHANNEL_ID = config['bot']['winners_channel_id']
+bot.close = close
 
 # Bot Events
 @bot.event
 async def on_ready():
     logging.info(f"Logged in as {bot.user.name} ({bot.user.id})")
 
+@bot.listen("on_message")
+async def on_submission_message(message):
+    """Routes the bot's submission confirmations as they are posted, so reactions never parse them."""
+    if message.author != bot.user or message_index.lookup(message.id) is not None:
+        return
+    route = await message_index.register_message(message)
+    if route is not None:
+        await bot.get_cog("Commands").add_submission(*route)
+
 @bot.event
+@metrics.timed(REACTION_SECONDS)
 async def on_reaction_add(reaction, user):
     """Handles vote recording when a reaction is added to a submission message."""
     if user == bot.user:
         return
 
     message = reaction.message
-    if not message.content.startswith("✅ Your song has been submitted as"):
-        return
-
-    # Extract track ID and event name from the message
-    track_id = message.content.split("**")[1]
-    event_name = message.content.split("**")[3]
-
-    # Fetch event ID and submission ID using track ID and event name
-    cursor.execute(
-        (
-            "SELECT event_id "
-            "FROM events "
-            "WHERE name = ?"
-        ),
-        (event_name,)
-    )
-    event = cursor.fetchone()
-    if not event:
-        logging.warning(f"Event not found for name: {event_name}")
-        return
-    event_id = event[0]
-
-    cursor.execute(
-        (
-            "SELECT submission_id "
-            "FROM submissions "
-            "WHERE track_id = ? AND event_id = ?"
-        ),
-        (track_id, event_id)
-    )
-    submission = cursor.fetchone()
-    if not submission:
-        logging.warning(f"Submission not found for track ID: {track_id} in event: {event_id}")
-        return
-    submission_id = submission[0]
-
-    # Check if user has already voted 3 times for this event
-    cursor.execute(
-        (
-            "SELECT COUNT(*) "
-            "FROM votes "
-            "WHERE submission_id IN ("
-            "    SELECT submission_id "
-            "    FROM submissions "
-            "    WHERE event_id = ?"
-            ") "
-            "AND user_id = ?"
-        ),
-        (event_id, user.id)
-    )
-    vote_count = cursor.fetchone()[0]
-
-    if vote_count >= 3:
+    route = message_index.lookup(message.id)
+    if route is None:
+        # Only the bot's own messages can be submissions posted before the index existed
+        if message.author != bot.user:
+            return
+        route = await message_index.register_message(message)
+        if route is None:
+            return
+    event_id, submission_id = route
+
+    # Record the vote (the 3-votes-per-event quota is checked when its batch is written)
+    vote_value = await vote_queue.submit_vote(event_id, submission_id, user.id, user.name)
+    if vote_value is None:
         logging.info(f"User {user.name} has already voted 3 times for event {event_id}")
         return
-
-    # Record the vote
-    vote_value = VOTE_VALUES.get(vote_count, 1)
-    cursor.execute(
-        (
-            "INSERT INTO votes (submission_id, user_id, vote_value, vote_time, voter_name) "
-            "VALUES (?, ?, ?, ?, ?)"
-        ),
-        (submission_id, user.id, vote_value, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), user.name)
-    )
-    conn.commit()
     logging.info(f"Vote recorded for submission {submission_id} by user {user.name} (value: {vote_value})")
-    
-    # Update event message and check milestones
-    commands_cog = bot.get_cog("Commands")
-    await commands_cog.update_event_message(event_id)
-    score = commands_cog.calculate_score(submission_id)
-    await commands_cog.check_milestones(event_id, submission_id, score, conn, cursor)
 
-    if score >= 100:
-        await commands_cog.end_event(event_id)
+    # Update standings, the event message and milestones (None: another process owns the event)
+    score = await bot.get_cog("Commands").apply_vote(event_id, submission_id, vote_value, user.id, user.name)
+
+    if score is not None and score >= 100:
+        await bot.get_cog("Commands").end_event(event_id)
 
 # Run the bot
-BOT_TOKEN = os.environ.get("BOT_TOKEN")
-bot.run(BOT_TOKEN)
\ No newline at end of file
+if __name__ == "__main__":
+    BOT_TOKEN = os.environ.get("BOT_TOKEN")
+    try:
+        bot.run(BOT_TOKEN)
+    finally:
+        db.close()
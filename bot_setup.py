@@ -3,6 +3,20 @@ import os
 from datetime import datetime
 import yaml
 
+import metrics
+from archive import Archiver
+from database import Database, SQLiteStorage, DEFAULT_STORAGE_PROFILE
+from guild_config import GuildConfig
+from journal import VoteJournal
+from message_index import SubmissionMessageIndex
+from messages import OutboundQueue
+from migrations import migrate, find_full_scans
+from models import EventCache
+from ranking import RankingIndex
+from remote_storage import RemoteStorage
+from sharding import ShardOwnership
+from vote_queue import VoteQueue
+
 # Load configuration from YAML file
 try:
     with open("config.yaml", "r") as f:
@@ -13,7 +27,8 @@ except FileNotFoundError:
 
 # Database setup (executed when this module is imported)
 # Use a fixed path inside the container that corresponds to your volume mount
-DB_PATH = os.path.join("/app/data", "countdown_bot.db")
+# (DB_PATH in the environment overrides it, e.g. for benchmarks against a scratch database)
+DB_PATH = os.environ.get("DB_PATH", os.path.join("/app/data", "countdown_bot.db"))
 
 print(f"DB_PATH: {DB_PATH}")  # Verify the path
 
@@ -32,56 +47,64 @@ def setup_db():
     if os.path.exists(DB_PATH):
         os.chmod(DB_PATH, 0o644)  # Set file permissions to rw-r--r--
 
-    # Create tables if they don't exist
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS events (
-            event_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            duration INTEGER,
-            min_submissions INTEGER,
-            max_submissions INTEGER,
-            song_min_duration INTEGER,
-            song_max_duration INTEGER,
-            start_time TEXT,
-            end_time TEXT,
-            channel_id INTEGER,
-            message_id INTEGER,
-            highest_score INTEGER DEFAULT 0,
-            active INTEGER DEFAULT 0
-        )
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS submissions (
-            submission_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            event_id INTEGER,
-            user_id INTEGER,
-            song_name TEXT,
-            url TEXT,
-            duration INTEGER,
-            submission_time TEXT,
-            track_id TEXT,
-            submitter_name TEXT,
-            milestone_reached BOOLEAN DEFAULT 0,
-            FOREIGN KEY (event_id) REFERENCES events(event_id)
-        )
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS votes (
-            vote_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            submission_id INTEGER,
-            user_id INTEGER,
-            vote_value INTEGER,
-            vote_time TEXT,
-            voter_name TEXT,
-            FOREIGN KEY (submission_id) REFERENCES submissions(submission_id)
-        )
-    """)
-    conn.commit()
-
-conn = sqlite3.connect(DB_PATH)
-cursor = conn.cursor()
-
-setup_db()  # Call the function to create tables on module import
+    # Bring the schema up to date on a short-lived connection
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        version = migrate(conn)
+        print(f"Database schema version: {version}")
+
+        for query, detail in find_full_scans(conn.cursor()):
+            print(f"Warning: hot query does a full scan ({detail}): {query}")
+    finally:
+        conn.close()
+
+# Metrics are recorded (and served) only when enabled in config.yaml
+metrics.REGISTRY.configure(config.get('metrics'))
+
+# Shards run by this process, and so the events it owns
+shards = ShardOwnership.from_settings(config.get('sharding'))
+
+# Async data-access layer shared by the bot and the commands cog. With the remote backend
+# the storage server owns the database (and its migrations); otherwise this process does.
+storage_settings = dict(DEFAULT_STORAGE_PROFILE, **(config.get('storage') or {}))
+if storage_settings['backend'] == "remote":
+    storage = RemoteStorage(
+        os.environ.get("STORAGE_HOST", storage_settings['server_host']),
+        int(os.environ.get("STORAGE_PORT", storage_settings['server_port'])),
+        os.environ.get("STORAGE_TOKEN")
+    )
+else:
+    if shards.partial:
+        raise ValueError("Running only some shards in this process needs storage.backend: remote")
+    setup_db()  # Create or migrate the tables on module import
+    storage = SQLiteStorage(DB_PATH, config.get('storage'))
+db = Database(storage)
+
+# Group-commit queue that every vote goes through, journaled before it is written
+vote_queue = VoteQueue(db, config.get('votes'), VoteJournal.from_settings(config.get('journal'), DB_PATH, shards))
+
+# Active events with their submissions and votes, written through to the database
+event_cache = EventCache(db)
+
+# Routes reactions on submission messages without parsing or querying
+message_index = SubmissionMessageIndex(db)
+
+# Live standings of active events, updated on every committed vote
+rankings = RankingIndex(db)
+
+# Prioritized, rate-limited queue for announcements, results and embed edits
+outbound = OutboundQueue(config.get('outbound'))
+
+# Moves ended events to per-event archive files (run by the process with shard 0)
+archiver = Archiver(db, config.get('archive'))
+
+# Per-guild channels; the environment variables and config.yaml are the defaults for every guild
+guild_config = GuildConfig(db, {
+    "admin_channel": int(os.environ.get("ADMIN_CHANNEL_ID", 0)),
+    "public_channel": int(os.environ.get("PUBLIC_CHANNEL_ID", 0)),
+    "winners_channel": int(os.environ.get("WINNERS_CHANNEL_ID", 0)),
+    "milestones_channel": config['bot'].get('milestones_channel_id'),
+})
 
 # Helper Functions
 def time_to_seconds(time_str):
@@ -92,8 +115,6 @@ def time_to_seconds(time_str):
     except ValueError:
         raise ValueError("Invalid time format. Use 'MM:SS'")
 
-def get_active_event():
-    """Retrieves the currently active event."""
-    cursor.execute("SELECT * FROM events WHERE active = 1")
-    result = cursor.fetchone()
-    return result
\ No newline at end of file
+async def get_active_events(guild_id=None):
+    """Retrieves the active events of a guild, or of every guild."""
+    return await db.get_active_events(guild_id)
@@ -1,23 +1,64 @@
-import sqlite3
 import os
 import logging
 import asyncio
-from datetime import datetime, timedelta
-import json
+import time
+import typing
+from datetime import timedelta
 
 import discord
 from discord.ext import commands
 
-from bot_setup import cursor, conn, time_to_seconds, get_active_event, DB_PATH
-
-# File to store previous standings
-PREVIOUS_STANDINGS_FILE = "previous_standings.json"
+import metrics
+from database import VOTE_VALUES
+from guild_config import GUILD_SETTINGS
+from messages import chunk_lines, PRIORITY_RESULTS, DISCORD_MESSAGE_LIMIT
+from milestones import MilestoneEngine
+from profiling import Profiler, AllocationTracer, DEFAULT_PROFILING_SETTINGS
+from scheduler import EmbedUpdateScheduler, EventScheduler
+from snapshots import rank_changes
+from bot_setup import db, vote_queue, message_index, rankings, event_cache, outbound, config, guild_config, shards, archiver, time_to_seconds, get_active_events, DB_PATH
+
+COMMAND_SECONDS = metrics.REGISTRY.histogram(
+    "countdown_command_duration_seconds",
+    "Duration of each command, including the time spent waiting for replies",
+    ("command", "status")
+)
 
 class Commands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-
- @commands.command(name="countdownstart")
+        self.embed_updates = EmbedUpdateScheduler(bot, outbound, self.render_event_message, config['event'].get('embed_update_window', 5))
+        self.event_scheduler = EventScheduler(self.end_event, self.update_event_message, config['event'].get('refresh_interval', 60))
+        self.milestones = MilestoneEngine(
+            config['event'].get('milestone_points', [25, 50, 75]),
+            config['event'].get('milestone_percentages', [0.5, 0.75, 1.0])
+        )
+
+        profiling = dict(DEFAULT_PROFILING_SETTINGS, **(config.get('profiling') or {}))
+        profile_dir = profiling['output_dir'] or os.path.join(os.path.dirname(DB_PATH), "profiles")
+        self.profiler = Profiler(profile_dir, profiling['top'])
+        self.allocation_tracer = AllocationTracer(profile_dir, profiling['top'], profiling['frames'])
+        self.max_profile_duration = profiling['max_duration']
+        self._profile_task = None
+
+        # Active events this process runs (see ShardOwnership); only tracked when sharded across processes
+        self.owned_events = set()
+        # Events whose end_event is running
+        self.ending_events = set()
+        db.subscribe(self.on_storage_message)
+
+    async def cog_before_invoke(self, ctx):
+        ctx.metrics_started = time.perf_counter()
+
+    async def cog_after_invoke(self, ctx):
+        # Runs after failed commands too
+        COMMAND_SECONDS.observe(
+            time.perf_counter() - ctx.metrics_started,
+            ctx.command.qualified_name,
+            "error" if ctx.command_failed else "ok"
+        )
+
+    @commands.command(name="countdownstart")
     @commands.has_permissions(administrator=True)
     async def countdownstart(self, ctx):
         """Start a new countdown event."""
@@ -65,39 +106,34 @@ class Commands(commands.Cog):
             max_duration = time_to_seconds(max_dur_msg.content)
 
             # Calculate end time
-            start_time = datetime.now()
             if duration_unit == "days":
-                end_time = start_time + timedelta(days=duration_value)
                 duration_seconds = duration_value * 24 * 60 * 60
             elif duration_unit == "hours":
-                end_time = start_time + timedelta(hours=duration_value)
                 duration_seconds = duration_value * 60 * 60
             elif duration_unit == "minutes":
-                end_time = start_time + timedelta(minutes=duration_value)
                 duration_seconds = duration_value * 60
+            start_at = int(time.time())
+            end_at = start_at + duration_seconds
 
             # Insert into database
-            cursor.execute("""
-                INSERT INTO events (name, duration, min_submissions, max_submissions, song_min_duration, song_max_duration, start_time, end_time, channel_id, active)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
-            """, (event_name, duration_seconds, min_submissions, max_submissions, min_duration, max_duration, start_time.strftime("%Y-%m-%d %H:%M:%S"), end_time.strftime("%Y-%m-%d %H:%M:%S"), ctx.channel.id))
-            event_id = cursor.lastrowid
-            conn.commit()
+            event_id = await db.create_event(event_name, duration_seconds, min_submissions, max_submissions, min_duration, max_duration, start_at, end_at, ctx.channel.id, ctx.guild.id if ctx.guild else None)
 
             embed = discord.Embed(title=f"Countdown Event: {event_name}", description="Current Standings:")
             embed.add_field(name="No Submissions Yet!", value="\u200b", inline=False)
-            time_left = end_time - start_time
+            time_left = timedelta(seconds=duration_seconds)
             embed.set_footer(text=f"Time left: {time_left}")
 
             message = await ctx.send(embed=embed)
 
-            cursor.execute("UPDATE events SET message_id = ? WHERE event_id = ?", (message.id, event_id))
-            conn.commit()
+            await db.set_event_message(event_id, message.id)
 
             logging.info(f"Event started: {event_name} (ID: {event_id})")
 
-            # Start the event loop for this event
-            self.bot.loop.create_task(self.event_loop(event_id))
+            # End the event at its deadline and refresh its standings until then
+            await event_cache.load_event(event_id)
+            await rankings.start_event(event_id)
+            self.owned_events.add(event_id)
+            self.event_scheduler.schedule(event_id, end_at)
 
             await ctx.send(f"✅ **Countdown Event '{event_name}' created!** Submissions are now open!")
 
@@ -109,22 +145,22 @@ class Commands(commands.Cog):
             
     @commands.command(name="submitvote")
     async def submitvote(self, ctx, *votes):
-        """Submits votes to the active event (DM only)."""
+        """Submits votes to an active event (DM only). Prefix the track numbers with the event name when several are running."""
         if not isinstance(ctx.channel, discord.DMChannel):
             await ctx.send("⚠️ This command can only be used in DMs.")
             return
 
-        event = get_active_event()
+        event_name = " ".join(votes[:-3]) if len(votes) > 3 else None
+        votes = votes[-3:] if len(votes) > 3 else votes
+        event = await self.resolve_event(ctx, event_name)
         if not event:
-            await ctx.author.send("⚠️ No active event found.")
             return
 
-        event_id = event[0]
-        event_name = event[1]
+        event_id = event.event_id
+        event_name = event.name
 
         # Check if user has already voted
-        cursor.execute("SELECT COUNT(*) FROM votes WHERE user_id = ? AND submission_id IN (SELECT submission_id FROM submissions WHERE event_id = ?)", (ctx.author.id, event_id))
-        vote_count = cursor.fetchone()[0]
+        vote_count = await event_cache.count_user_votes(event_id, ctx.author.id)
         if vote_count > 0:
             await ctx.author.send("⚠️ You have already voted in this event.")
             return
@@ -133,47 +169,41 @@ class Commands(commands.Cog):
             await ctx.author.send("⚠️ You must submit exactly 3 votes.")
             return
 
-        vote_values = {0: 5, 1: 3, 2: 1}
         submission_ids = []
         for i, vote in enumerate(votes):
             try:
                 track_number = int(vote)
-                cursor.execute("SELECT submission_id FROM submissions WHERE event_id = ? AND track_id = ?", (event_id, f"Track-{track_number}"))
-                submission = cursor.fetchone()
-                if not submission:
+                submission_id = await event_cache.get_submission_id(event_id, f"Track-{track_number}")
+                if not submission_id:
                     await ctx.author.send(f"⚠️ Invalid track number: {track_number}")
                     return
-                submission_id = submission[0]
                 submission_ids.append(submission_id)
             except ValueError:
                 await ctx.author.send(f"⚠️ Invalid track number format: {vote}")
                 return
 
-        # Store the votes
-        for i, submission_id in enumerate(submission_ids):
-            vote_value = vote_values[i]
-            cursor.execute("INSERT INTO votes (submission_id, user_id, vote_value, vote_time, voter_name) VALUES (?, ?, ?, ?, ?)",
-                           (submission_id, ctx.author.id, vote_value, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), ctx.author.name))
-        conn.commit()
+        # Store the votes (the "already voted" rule and the event's end are re-checked when the batch is written)
+        if not await vote_queue.submit_ballot(event_id, submission_ids, ctx.author.id, ctx.author.name):
+            await ctx.author.send("⚠️ You have already voted in this event, or it has ended.")
+            return
 
-        await self.update_event_message(event_id)
+        for rank, submission_id in enumerate(submission_ids):
+            await self.apply_vote(event_id, submission_id, VOTE_VALUES[rank], ctx.author.id, ctx.author.name)
         await ctx.author.send(f"✅ Your votes for event '{event_name}' have been recorded!")
 
     @commands.command(name="charts")
     @commands.has_permissions(administrator=True)
-    async def charts(self, ctx):
-        """Displays the current leaderboard (Charts) for the active event (Admin only)."""
-        event = get_active_event()
+    async def charts(self, ctx, *, event_name=None):
+        """Displays the current leaderboard (Charts) for an active event (Admin only)."""
+        event = await self.resolve_event(ctx, event_name)
         if not event:
-            await ctx.send("⚠️ No active event found.")
             return
 
-        event_id = event[0]
-        event_name = event[1]
-        channel_id = event[9]
+        event_id = event.event_id
+        event_name = event.name
 
-        leaderboard_msg = await self.generate_admin_leaderboard(event_id, event_name)
-        await ctx.send(leaderboard_msg)
+        async for chunk in self.generate_admin_leaderboard(event_id, event_name):
+            await ctx.send(chunk)
         await ctx.send("What would you like to do?\n\n1. Publish to [Public Channel Name]\n2. Exit")
 
         def check(msg):
@@ -184,13 +214,12 @@ class Commands(commands.Cog):
             response = response_msg.content.lower()
 
             if response == "1":
-                public_channel_id = int(os.environ.get("PUBLIC_CHANNEL_ID"))  # Replace with your actual channel ID environment variable
-                if public_channel_id:
-                    public_channel = self.bot.get_channel(public_channel_id)
+                public_channel = self.event_channel(event, "public_channel", fallback=False)
+                if public_channel:
                     await self.publish_public_charts(event_id, event_name, public_channel)
                     await ctx.send("Standings published to the public channel!")
                 else:
-                    await ctx.send("⚠️ Public channel ID not configured. Please set the PUBLIC_CHANNEL_ID environment variable.")
+                    await ctx.send("⚠️ Public channel not configured. Use `/guildconfig public_channel #channel` or set PUBLIC_CHANNEL_ID.")
             elif response == "2":
                 await ctx.send("Exiting command. Standings not published.")
             else:
@@ -199,315 +228,516 @@ class Commands(commands.Cog):
         except asyncio.TimeoutError:
             await ctx.send("⚠️ No response received. Standings not published.")
 
+    @commands.command(name="movement")
+    @commands.has_permissions(administrator=True)
+    async def movement(self, ctx, from_snapshot: typing.Optional[int] = None, to_snapshot: typing.Optional[int] = None, *, event_name=None):
+        """Shows rank movement between two chart publications of an active event (Admin only)."""
+        event = await self.resolve_event(ctx, event_name)
+        if not event:
+            return
+
+        event_id = event.event_id
+        snapshots = await db.get_snapshots(event_id)
+        if len(snapshots) < 2 and (from_snapshot is None or to_snapshot is None):
+            listing = "\n".join(f"- #{snapshot_id} (<t:{published_at}:f>)" for snapshot_id, published_at in snapshots)
+            await ctx.send(f"⚠️ Need two chart publications to compare.\n{listing}")
+            return
+
+        snapshot_ids = {snapshot_id for snapshot_id, published_at in snapshots}
+        from_snapshot = from_snapshot if from_snapshot is not None else snapshots[-2][0]
+        to_snapshot = to_snapshot if to_snapshot is not None else snapshots[-1][0]
+        if from_snapshot not in snapshot_ids or to_snapshot not in snapshot_ids:
+            await ctx.send("⚠️ Unknown chart publication for this event.")
+            return
+
+        previous_ranks = await db.get_snapshot_ranks(from_snapshot)
+        current_ranks = await db.get_snapshot_ranks(to_snapshot)
+        changes = rank_changes(previous_ranks, current_ranks)
+        song_names = {submission.submission_id: submission.song_name for submission in await event_cache.get_submissions(event_id)}
+
+        lines = [f"**Movement from chart #{from_snapshot} to #{to_snapshot}**\n"]
+        for submission_id, rank in sorted(current_ranks.items(), key=lambda item: item[1]):
+            previous_rank = previous_ranks.get(submission_id)
+            was = f" (was {previous_rank})" if previous_rank is not None else ""
+            lines.append(f"{rank}. {song_names.get(submission_id, submission_id)}{was} {changes[submission_id]}".rstrip())
+        await ctx.send("\n".join(lines))
+
+    @commands.command(name="verifyscores")
+    @commands.has_permissions(administrator=True)
+    async def verifyscores(self, ctx, *, event_name=None):
+        """Checks the materialized scores of an active event against the raw votes (Admin only)."""
+        event = await self.resolve_event(ctx, event_name)
+        if not event:
+            return
+
+        drifted = await db.verify_scores(event.event_id)
+        if not drifted:
+            await ctx.send(f"✅ All scores for '{event.name}' match the recorded votes.")
+            return
+
+        details = "\n".join(
+            f"- Submission {submission_id}: stored {stored_score} ({stored_votes} votes), actual {actual_score} ({actual_votes} votes)"
+            for submission_id, stored_score, stored_votes, actual_score, actual_votes in drifted[:10]
+        )
+        await ctx.send(f"⚠️ {len(drifted)} submission(s) have drifted:\n{details}\n\nRun `/rebuildscores` to fix them.")
+
+    @commands.command(name="rebuildscores")
+    @commands.has_permissions(administrator=True)
+    async def rebuildscores(self, ctx, *, event_name=None):
+        """Recomputes the materialized scores of an active event from the raw votes (Admin only)."""
+        event = await self.resolve_event(ctx, event_name)
+        if not event:
+            return
+
+        event_id = event.event_id
+        drifted = await db.verify_scores(event_id)
+        await db.rebuild_scores(event_id)
+        logging.info(f"Scores rebuilt for event {event_id} ({len(drifted)} drifted submissions)")
+        if self.owns(event_id):
+            await self.reload_event(event_id)
+        else:
+            await db.publish(("scores_rebuilt", event_id))
+        await ctx.send(f"✅ Scores for '{event.name}' rebuilt ({len(drifted)} submission(s) corrected).")
+
+    @commands.command(name="votestats")
+    @commands.has_permissions(administrator=True)
+    async def votestats(self, ctx, minutes: typing.Optional[int] = 15, *, event_name=None):
+        """Shows the votes per minute of an active event and the votes since the last chart (Admin only)."""
+        event = await self.resolve_event(ctx, event_name)
+        if not event:
+            return
+
+        minutes = max(1, min(minutes, 24 * 60))
+        async for chunk in chunk_lines(self.vote_stats_lines(event, minutes)):
+            await ctx.send(chunk)
+
+    async def vote_stats_lines(self, event, minutes):
+        """Yields the /votestats report: votes since the last chart, then one line per minute."""
+        since = int(time.time()) // 60 * 60 - (minutes - 1) * 60
+        per_minute = {minute: (votes, points) for minute, votes, points in await db.get_votes_per_minute(event.event_id, since)}
+        published_at, chart_votes, chart_points = await db.get_votes_since_last_chart(event.event_id)
+
+        total_votes = sum(votes for votes, points in per_minute.values())
+        yield f"**📈 Votes for '{event.name}' in the last {minutes} minute(s): {total_votes}**\n"
+        if published_at is None:
+            yield f"No chart published yet; {chart_votes} vote(s) ({chart_points} points) so far.\n"
+        else:
+            yield f"Since the last chart (<t:{published_at}:R>): {chart_votes} vote(s), {chart_points} points.\n"
+        for minute in range(since, since + minutes * 60, 60):
+            votes, points = per_minute.get(minute, (0, 0))
+            yield f"<t:{minute}:t> {votes} vote(s), {points} points"
+
+    @commands.command(name="eventhistory")
+    @commands.has_permissions(administrator=True)
+    async def eventhistory(self, ctx, *, event_name):
+        """Shows the final top 10 and vote totals of an ended event, from its archive once it has one (Admin only)."""
+        event = await db.get_ended_event(event_name, ctx.guild.id if ctx.guild else None)
+        if not event:
+            await ctx.send(f"⚠️ No ended event named '{event_name}'.")
+            return
+
+        if event.archived_at is not None:
+            archived = await archiver.load(event.event_id)
+            if archived is None:
+                await ctx.send(f"⚠️ The archive of '{event.name}' is missing.")
+                return
+            standings = archived.standings()
+            vote_count = len(archived.votes)
+        else:
+            standings = await db.get_standings(event.event_id)
+            vote_count, points = await db.count_votes(event.event_id, 0)
+
+        lines = [f"**📚 {event.name}** (ended <t:{event.end_at}:D>): {len(standings)} submissions, {vote_count} votes\n"]
+        for standing in standings[:10]:
+            lines.append(f"{standing.rank}. {standing.song_name} by {standing.submitter_name} - **{standing.score}** points ({standing.vote_count} votes)")
+        await ctx.send("\n".join(lines))
+
+    @commands.command(name="guildconfig")
+    @commands.guild_only()
+    @commands.has_permissions(administrator=True)
+    async def guildconfig(self, ctx, setting: str = None, channel: discord.TextChannel = None):
+        """Shows this server's channel settings, or sets one (omit the channel to reset it) (Admin only)."""
+        if setting is None:
+            overrides = guild_config.overrides(ctx.guild.id)
+            lines = ["**⚙️ Channel settings for this server**\n"]
+            for name, description in GUILD_SETTINGS.items():
+                channel_id = guild_config.get(ctx.guild.id, name)
+                value = f"<#{channel_id}>" if channel_id else "not set"
+                source = "" if name in overrides else " (default)"
+                lines.append(f"- `{name}`: {value}{source} - {description}")
+            await ctx.send("\n".join(lines))
+            return
+
+        if setting not in GUILD_SETTINGS:
+            await ctx.send(f"⚠️ Unknown setting. Choose one of: {', '.join(GUILD_SETTINGS)}")
+            return
+
+        await guild_config.set(ctx.guild.id, setting, channel.id if channel else None)
+        await db.publish(("guild_setting", ctx.guild.id, setting, channel.id if channel else None))
+        logging.info(f"Guild {ctx.guild.id} set {setting} to {channel.id if channel else None}")
+        if channel:
+            await ctx.send(f"✅ `{setting}` set to {channel.mention}.")
+        else:
+            await ctx.send(f"✅ `{setting}` reset to the default.")
+
+    @commands.command(name="profilestart")
+    @commands.has_permissions(administrator=True)
+    async def profilestart(self, ctx, seconds: int = 60):
+        """Profiles the bot's event loop for a number of seconds and posts the hot spots (Admin only)."""
+        if self.profiler.running:
+            await ctx.send("⚠️ A profile is already running. Use `/profilestop` to end it.")
+            return
+
+        seconds = max(1, min(seconds, self.max_profile_duration))
+        try:
+            self.profiler.start()
+        except ValueError as e:
+            await ctx.send(f"⚠️ Could not start the profiler: {e}")
+            return
+
+        self._profile_task = asyncio.get_running_loop().create_task(self.finish_profile_later(seconds, ctx.channel))
+        await ctx.send(f"⏱️ Profiling for {seconds} seconds. Use `/profilestop` to stop early.")
+
+    @commands.command(name="profilestop")
+    @commands.has_permissions(administrator=True)
+    async def profilestop(self, ctx):
+        """Stops a running profile early and posts the hot spots (Admin only)."""
+        if not self.profiler.running:
+            await ctx.send("⚠️ No profile is running.")
+            return
+        self._profile_task.cancel()
+        await self.finish_profile(ctx.channel)
+
+    @commands.command(name="memsnapshot")
+    @commands.has_permissions(administrator=True)
+    async def memsnapshot(self, ctx):
+        """Takes a tracemalloc snapshot and posts the top allocation sites and the change since the last one (Admin only)."""
+        path, lines = await asyncio.to_thread(self.allocation_tracer.snapshot)
+        logging.info(f"Memory snapshot saved to {path}")
+        await self.send_diagnostics(ctx.channel, f"🧠 Memory snapshot saved to `{path}`", lines)
+
+    @commands.command(name="memstop")
+    @commands.has_permissions(administrator=True)
+    async def memstop(self, ctx):
+        """Stops allocation tracing (Admin only)."""
+        if not self.allocation_tracer.tracing:
+            await ctx.send("⚠️ Allocation tracing is not running.")
+            return
+        self.allocation_tracer.stop()
+        await ctx.send("✅ Allocation tracing stopped.")
+
+    async def finish_profile_later(self, seconds, channel):
+        await asyncio.sleep(seconds)
+        await self.finish_profile(channel)
+
+    async def finish_profile(self, channel):
+        """Stops the profiler, saves its stats and posts the summary."""
+        profile, seconds = self.profiler.stop()  # Must run on the loop thread that started it
+        path, lines = await asyncio.to_thread(self.profiler.save, profile, seconds)
+        logging.info(f"Profile saved to {path}")
+        await self.send_diagnostics(channel, f"⏱️ Profile saved to `{path}`", lines)
+
+    async def send_diagnostics(self, fallback_channel, title, lines):
+        """Posts a diagnostics summary to the admin channel (or where the command was run)."""
+        guild = getattr(fallback_channel, "guild", None)
+        admin_channel_id = guild_config.get(guild.id if guild else None, "admin_channel")
+        channel = self.bot.get_channel(admin_channel_id) if admin_channel_id else None
+        channel = channel or fallback_channel
+
+        body = "\n".join(lines)
+        limit = DISCORD_MESSAGE_LIMIT - len(title) - 10  # Room for the title and code fences
+        if len(body) > limit:
+            body = body[:limit - 1] + "…"
+        await channel.send(f"{title}\n```\n{body}\n```")
+
     async def generate_public_leaderboard(self, event_id, event_name):
         """Generates a formatted leaderboard for public view."""
-        submissions = self.get_submissions(event_id)
-        scores = {}
-        for submission in submissions:
-            score = self.calculate_score(submission[0])
-            scores[submission[0]] = (submission[3], score, submission[4])  # Store song name, score, and URL
-
-        sorted_scores = sorted(scores.items(), key=lambda x: x[1][1], reverse=True)
+        standings = await rankings.get_standings(event_id)
+        return self.format_public_leaderboard(event_name, standings)
 
+    def format_public_leaderboard(self, event_name, standings, changes=None):
+        """Formats standings for public view, with optional rank-change arrows per submission."""
         leaderboard_msg = f"**🏆 {event_name} - Current Standings 🏆**\n\n"
-        if not sorted_scores:
+        if not standings:
             leaderboard_msg += "No submissions yet!"
         else:
-            for rank, (submission_id, (song_name, score, url)) in enumerate(sorted_scores, 1):
-                leaderboard_msg += f"{rank}. [{song_name}]({url}) - **{score}** points\n"
+            for standing in standings:
+                change = changes.get(standing.submission_id, "") if changes else ""
+                leaderboard_msg += f"{standing.rank}. [{standing.song_name}]({standing.url}) - **{standing.score}** points{' ' + change if change else ''}\n"
 
         return leaderboard_msg
 
     async def generate_admin_leaderboard(self, event_id, event_name):
-        """Generates a formatted leaderboard for admin view with vote details."""
-        submissions = self.get_submissions(event_id)
-        scores = {}
-        for submission in submissions:
-            score = self.calculate_score(submission[0])
-
-            if submission[0] not in scores:
-                scores[submission[0]] = {
-                    'song_name': submission[3],
-                    'score': score,
-                    'url': submission[4],
-                    'submitter': submission[7]
-                }
-
-        sorted_scores = sorted(scores.items(), key=lambda x: x[1]['score'], reverse=True)
-
-        leaderboard_msg = f"**🏆 {event_name} - Current Standings (Admin View) 🏆**\n\n"
-        if not sorted_scores:
-            leaderboard_msg += "No submissions yet!"
-        else:
-            for rank, (submission_id, submission_data) in enumerate(sorted_scores, 1):
-                leaderboard_msg += f"{rank}. [{submission_data['song_name']}]({submission_data['url']}) (submitted by {submission_data['submitter']}) - **{submission_data['score']}** points\n"
-                # Fetch and format votes for this submission
-                cursor.execute("SELECT voter_name, vote_value FROM votes WHERE submission_id = ?", (submission_id,))
-                votes = cursor.fetchall()
-                vote_details = ""
-                for voter_name, vote_value in votes:
-                  vote_details += f"  - {voter_name}: {vote_value}\n"
-
-                if vote_details:
-                    leaderboard_msg += "  **Votes:**\n" + vote_details
+        """Streams the leaderboard for admin view, with vote details, as message-sized chunks."""
+        async for chunk in chunk_lines(self.admin_leaderboard_lines(event_id, event_name)):
+            yield chunk
+
+    async def admin_leaderboard_lines(self, event_id, event_name):
+        """Yields the admin leaderboard line by line: from memory for a cached event, else from a single standings-and-votes query."""
+        yield f"**🏆 {event_name} - Current Standings (Admin View) 🏆**\n"
+
+        if event_cache.get(event_id) is not None:
+            # Active event: standings and votes are in memory
+            standings = await rankings.get_standings(event_id)
+            for standing in standings:
+                yield f"{standing.rank}. [{standing.song_name}]({standing.url}) (submitted by {standing.submitter_name}) - **{standing.score}** points"
+                votes = event_cache.get_votes(event_id, standing.submission_id)
+                if votes:
+                    yield "  **Votes:**"
+                for vote in votes:
+                    yield f"  - {vote.voter_name}: {vote.vote_value}"
+            if not standings:
+                yield "No submissions yet!"
+            return
 
-        return leaderboard_msg
-async def generate_user_leaderboard(self, event_id, event_name, user_id):
+        rank = 0
+        current_submission = None
+        async for submission_id, song_name, url, submitter_name, score, voter_name, vote_value in db.stream_standings_with_votes(event_id):
+            if submission_id != current_submission:
+                current_submission = submission_id
+                rank += 1
+                yield f"{rank}. [{song_name}]({url}) (submitted by {submitter_name}) - **{score}** points"
+                if voter_name is not None:
+                    yield "  **Votes:**"
+            if voter_name is not None:
+                yield f"  - {voter_name}: {vote_value}"
+
+        if not rank:
+            yield "No submissions yet!"
+
+    async def generate_user_leaderboard(self, event_id, event_name, user_id):
         """Generates a formatted leaderboard for a specific user."""
-        submissions = self.get_submissions(event_id)
-        scores = {}
-        for submission in submissions:
-            score = self.calculate_score(submission[0])
-            scores[submission[0]] = (submission[3], score, submission[4])  # Store song name, score, and URL
-
-        sorted_scores = sorted(scores.items(), key=lambda x: x[1][1], reverse=True)
+        standings = await rankings.get_standings(event_id)
 
         leaderboard_msg = f"**🏆 {event_name} - Current Standings 🏆**\n\n"
-        if not sorted_scores:
+        if not standings:
             leaderboard_msg += "No submissions yet!"
         else:
-            for rank, (submission_id, (song_name, score, url)) in enumerate(sorted_scores, 1):
-                leaderboard_msg += f"{rank}. [{song_name}]({url}) - **{score}** points\n"
+            for standing in standings:
+                leaderboard_msg += f"{standing.rank}. [{standing.song_name}]({standing.url}) - **{standing.score}** points\n"
 
         return leaderboard_msg
 
     async def publish_public_charts(self, event_id, event_name, channel):
         """Publishes the public version of the charts to a designated channel, with arrows indicating rank changes."""
-        current_standings = await self.generate_public_leaderboard(event_id, event_name)
-        previous_standings = self.load_previous_standings()
-
-        if previous_standings:
-            updated_standings = self.compare_standings(previous_standings, current_standings)
-        else:
-            updated_standings = current_standings
-
-        await channel.send(updated_standings)
-        self.save_current_standings(current_standings)
-        
-    def load_previous_standings(self):
-        """Loads the previous standings from a JSON file."""
+        ranking = await rankings.get_ranking(event_id)
+        standings = ranking.top()
+        previous_ranks = await db.get_snapshot_ranks(await db.get_latest_snapshot_id(event_id))
+        changes = rank_changes(previous_ranks, ranking.ranks())
+
+        outbound.send(channel, self.format_public_leaderboard(event_name, standings, changes), priority=PRIORITY_RESULTS)
+        await db.save_snapshot(event_id, standings)
+
+    async def load_schedule(self):
+        """Schedules the deadlines of the active events this process owns (called once at startup).
+
+        Events of guilds on other processes' shards are dropped from the indexes loaded
+        before this: their owners keep them.
+        """
+        for event in await get_active_events():
+            event_id = event.event_id
+            if not shards.owns(event.guild_id):
+                message_index.drop_event(event_id)
+                rankings.drop_event(event_id)
+                continue
+            self.owned_events.add(event_id)
+            await event_cache.load_event(event_id)
+            self.event_scheduler.schedule(event_id, event.end_at)
+        self.event_scheduler.start()
+        await self.load_milestones()
+
+    async def load_milestones(self, event_id=None):
+        """Seeds the milestone engine with the scores and masks of active events (or one event)."""
+        if event_id is not None:
+            self.milestones.drop_event(event_id)
+        rows = await db.get_milestone_state(event_id)
+        if shards.partial:
+            rows = [row for row in rows if row[1] in self.owned_events]
+        for submission_id, submission_event_id, mask, milestone_reached, score in rows:
+            if not mask and milestone_reached:
+                # Reached before masks existed: mark the points milestones it has passed
+                mask = self.milestones.crossed_mask(score)
+            self.milestones.load_submission(submission_event_id, submission_id, score, mask or 0)
+        logging.info(f"Loaded milestone state for {len(rows)} submissions")
+
+    def owns(self, event_id):
+        """Returns True when this process keeps the event's standings, milestones and embed."""
+        return not shards.partial or event_id in self.owned_events
+
+    async def reload_event(self, event_id):
+        """Reloads an owned event's cached rows, standings and milestones from the database."""
+        await event_cache.load_event(event_id)
+        await rankings.load(event_id)
+        await self.load_milestones(event_id)
+        self.update_event_message(event_id)
+
+    async def on_storage_message(self, message):
+        """Handles a message published by another bot process."""
         try:
-            with open(PREVIOUS_STANDINGS_FILE, "r") as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return None
+            kind = message[0]
+            if kind == "vote":
+                event_id, submission_id, vote_value, user_id, voter_name = message[1:]
+                if self.owns(event_id):
+                    score = await self.apply_vote(event_id, submission_id, vote_value, user_id, voter_name)
+                    if score >= 100:
+                        await self.end_event(event_id)
+            elif kind == "scores_rebuilt":
+                if self.owns(message[1]):
+                    await self.reload_event(message[1])
+            elif kind == "guild_setting":
+                guild_config.update(*message[1:])
+            elif kind == "reconnected":
+                # Votes forwarded while the connection was down were missed
+                for event_id in list(self.owned_events):
+                    await self.reload_event(event_id)
+        except Exception as e:
+            logging.error(f"Error handling storage message {message!r}: {e}")
 
-    def save_current_standings(self, standings):
-        """Saves the current standings to a JSON file."""
-        with open(PREVIOUS_STANDINGS_FILE, "w") as f:
-            json.dump(standings, f)
-
-    def compare_standings(self, previous, current):
-        """Compares the current standings to the previous standings and adds up/down arrows."""
-        # Extract rankings from the formatted strings
-        prev_ranks = {line.split(".")[1].split("]")[0].strip(): rank for rank, line in enumerate(previous.split("\n")[2:] if line and "." in line)}
-        curr_ranks = {line.split(".")[1].split("]")[0].strip(): rank for rank, line in enumerate(current.split("\n")[2:] if line and "." in line)}
-    
-        updated_lines = []
-        for line in current.split("\n"):
-            parts = line.split(".")
-            if len(parts) > 1:
-                song_name = parts[1].split("]")[0].strip()
-                # Find the previous rank
-                prev_rank = prev_ranks.get(song_name)
-    
-                # Determine the change in rank
-                if prev_rank is not None:
-                    curr_rank = curr_ranks[song_name]
-                    if curr_rank < prev_rank:
-                        change = "⬆️"  # Up arrow
-                    elif curr_rank > prev_rank:
-                        change = "⬇️"  # Down arrow
-                    else:
-                        change = ""  # No change
-                else:
-                    change = ""
-    
-                updated_lines.append(f"{line} {change}")
-            else:
-                updated_lines.append(line)
-    
-        return "\n".join(updated_lines)
-    
-    async def event_loop(self, event_id):
-        """Background loop for each active event."""
-        while True:
-            event = self.get_event(event_id)
-            if not event or event[10] == 0:  # Check if event is inactive or message id is null
-                break
-
-            current_time = datetime.now()
-            end_time = datetime.strptime(event[7], "%Y-%m-%d %H:%M:%S")
-
-            if current_time >= end_time:
-                await self.end_event(event_id)
-                break
-
-            await self.update_event_message(event_id)
-            await asyncio.sleep(60)  # Check every 60 seconds
-
-    async def update_event_message(self, event_id):
-        """Updates the event message with current standings."""
-        event = self.get_event(event_id)
-        if not event:
+    async def add_submission(self, event_id, submission_id):
+        """Caches and ranks a submission whose message was just posted (when this process owns its event)."""
+        if not self.owns(event_id):
             return
+        await event_cache.get_submission(submission_id)
+        rankings.add_submission(event_id, submission_id)
+        self.update_event_message(event_id)
+
+    async def apply_vote(self, event_id, submission_id, vote_value, user_id=None, voter_name=None):
+        """Feeds a committed vote to the event cache, live standings and milestones.
+
+        Returns the new score, or None when another process owns the event; the vote is
+        forwarded to it.
+        """
+        if not self.owns(event_id):
+            await db.publish(("vote", event_id, submission_id, vote_value, user_id, voter_name))
+            return None
 
-        channel_id = event[9]
-        message_id = event[10]
-        channel = self.bot.get_channel(channel_id)
-
-        try:
-            message = await channel.fetch_message(message_id)
+        event_cache.add_vote(event_id, submission_id, user_id, voter_name, vote_value)
+        rankings.apply_vote(event_id, submission_id, vote_value)
+        self.update_event_message(event_id)
+        return await self.check_milestones(event_id, submission_id, vote_value)
 
-            submissions = self.get_submissions(event_id)
-            scores = {}
-            for submission in submissions:
-                score = self.calculate_score(submission[0])
-                scores[submission[3]] = score
+    def update_event_message(self, event_id):
+        """Marks the event message as needing an update; bursts are coalesced by the scheduler."""
+        self.embed_updates.mark_dirty(event_id)
 
-            sorted_scores = sorted(scores.items(), key=lambda x: x[1][1], reverse=True)
+    async def render_event_message(self, event_id):
+        """Renders the event embed with current standings.
 
-            embed = discord.Embed(title=f"Countdown Event: {event[1]}", description="Current Standings:")
+        Returns (channel_id, message_id, embed), or None when the event has no message.
+        """
+        event = await self.get_event(event_id)
+        if not event or not event.message_id:
+            return None
 
-            if not sorted_scores:
-                embed.add_field(name="No Submissions Yet!", value="\u200b", inline=False)
-            else:
-                for song, score in sorted_scores:
-                    embed.add_field(name=song, value=f"Score: {score}", inline=False)
+        standings = await rankings.get_standings(event_id)
 
-            # Find the highest score
-            highest_score = sorted_scores[0][1] if sorted_scores else 0
-            cursor.execute("UPDATE events SET highest_score = ? WHERE event_id = ?", (highest_score, event_id))
-            conn.commit()
+        embed = discord.Embed(title=f"Countdown Event: {event.name}", description="Current Standings:")
 
-            current_time = datetime.now()
-            end_time = datetime.strptime(event[7], "%Y-%m-%d %H:%M:%S")
+        if not standings:
+            embed.add_field(name="No Submissions Yet!", value="\u200b", inline=False)
+        else:
+            for standing in standings:
+                embed.add_field(name=standing.song_name, value=f"Score: {standing.score}", inline=False)
 
-            time_left = end_time - current_time
-            embed.set_footer(text=f"Time left: {self.format_time_remaining(time_left)}") # Format time
+        # Store the highest score (written only when it changed)
+        await event_cache.update_highest_score(event_id, standings)
 
-            await message.edit(embed=embed)
+        time_left = timedelta(seconds=event.end_at - int(time.time()))
+        embed.set_footer(text=f"Time left: {self.format_time_remaining(time_left)}") # Format time
 
-        except discord.NotFound:
-            logging.error(f"Message with ID {message_id} not found in channel {channel_id}.")
-        except Exception as e:
-            logging.error(f"Error updating event message: {e}")
+        return event.channel_id, event.message_id, embed
 
     def format_time_remaining(self, time_left):
-        """Formats the remaining time into a human-readable string."""
+        """Formats the remaining time into a human-readable string.
+
+        Shown to the minute, so refreshes within the same minute render an identical embed.
+        """
         days = time_left.days
         hours, remainder = divmod(time_left.seconds, 3600)
-        minutes, seconds = divmod(remainder, 60)
+        minutes = remainder // 60
 
         if days > 0:
-            return f"{days} days, {hours} hours, {minutes} minutes, {seconds} seconds"
+            return f"{days} days, {hours} hours, {minutes} minutes"
         elif hours > 0:
-            return f"{hours} hours, {minutes} minutes, {seconds} seconds"
+            return f"{hours} hours, {minutes} minutes"
+        elif minutes > 0:
+            return f"{minutes} minutes"
         else:
-            return f"{minutes} minutes, {seconds} seconds"
-
-            # Find the highest score
-            highest_score = sorted_scores[0][1] if sorted_scores else 0
-            cursor.execute("UPDATE events SET highest_score = ? WHERE event_id = ?", (highest_score, event_id))
-            conn.commit()
-
-            current_time = datetime.now()
-            end_time = datetime.strptime(event[7], "%Y-%m-%d %H:%M:%S")
-
-            time_left = end_time - current_time
-            embed.set_footer(text=f"Time left: {time_left}")
+            return "less than a minute"
+
+    async def check_milestones(self, event_id, submission_id, vote_value):
+        """Applies a committed vote to the milestone engine and announces newly crossed milestones.
+
+        Returns the submission's new score.
+        """
+        score, crossed = self.milestones.apply_vote(event_id, submission_id, vote_value)
+        if not crossed:
+            return score
+
+        await event_cache.set_milestone_mask(submission_id, self.milestones.get_mask(event_id, submission_id))
+        submission = await event_cache.get_submission(submission_id)
+        song_name, submitter_name = submission.song_name, submission.submitter_name
+
+        event = await self.get_event(event_id)
+        channel = self.event_channel(event, "milestones_channel") if event else None
+        if not channel:
+            logging.warning(f"No channel for milestone announcements of event {event_id}")
+            return score
+
+        for milestone in crossed:
+            if milestone.kind == "points":
+                message = f"🌟 {submitter_name} has reached a milestone of {milestone.threshold} points!"
+            else:
+                message = f"🎉 {song_name} has reached {int(milestone.threshold * 100)}% of the highest score with {score} points!"
+            outbound.send(channel, message)
+        return score
 
-            await message.edit(embed=embed)
+    async def end_event(self, event_id):
+        """Ends the event, displays the results, and provides options for publishing.
 
-        except discord.NotFound:
-            logging.error(f"Message with ID {message_id} not found in channel {channel_id}.")
-        except Exception as e:
-            logging.error(f"Error updating event message: {e}")
-
-async def check_milestones(self, event_id, submission_id, score, conn, cursor):
-    """Checks for milestones and updates the event message."""
-    cursor.execute("SELECT milestone_reached FROM submissions WHERE submission_id = ?", (submission_id,))
-    milestone_reached = cursor.fetchone()[0]
-
-    if not milestone_reached:
-        milestones = [25, 50, 75]
-        for milestone in milestones:
-            if score >= milestone:
-                cursor.execute("UPDATE submissions SET milestone_reached = 1 WHERE submission_id = ?", (submission_id,))
-                conn.commit()
-
-                cursor.execute("SELECT submitter_name FROM submissions WHERE submission_id = ?", (submission_id,))
-                submitter_name = cursor.fetchone()[0]
-
-                message = f"🌟 {submitter_name} has reached a milestone of {milestone} points!"
-                channel = self.bot.get_channel(config['bot']['milestones_channel_id'])
-                await channel.send(message)
-                break
-
-        # Get the highest score from the database
-        cursor.execute("SELECT highest_score FROM events WHERE event_id = ?", (event_id,))
-        result = cursor.fetchone()
-        highest_score = result[0] if result else 0
-
-        # Calculate milestones based on the highest score
-        milestones = [0.5, 0.75, 1.0]  # Example: 50%, 75%, and 100% of the highest score
-        for milestone in milestones:
-            target_score = highest_score * milestone
-
-            if score >= target_score:
-                cursor.execute("SELECT milestone_reached FROM submissions WHERE submission_id = ?", (submission_id,))
-                result = cursor.fetchone()
-                milestone_reached = bool(result[0]) if result else False
-
-                if not milestone_reached:
-                    try:
-                        await channel.send(f"🎉 {song_name} has reached {int(milestone * 100)}% of the highest score with {score} points!")
-                    except Exception as e:
-                        logging.error(f"Failed to send milestone message: {e}")
-
-                    cursor.execute("UPDATE submissions SET milestone_reached = ? WHERE submission_id = ?", (True, submission_id))
-                    conn.commit()
+        Runs once per event: calls made while the event is already ending (more votes past
+        100 points during the admin prompt, or its deadline) return at once.
+        """
+        if event_id in self.ending_events:
+            return
+        self.ending_events.add(event_id)
+        try:
+            await self.finish_event(event_id)
+        finally:
+            self.ending_events.discard(event_id)
 
-    async def end_event(self, event_id):
-        """Ends the event, displays the results, and provides options for publishing."""
-        event = self.get_event(event_id)
-        if not event:
+    async def finish_event(self, event_id):
+        event = await self.get_event(event_id)
+        if not event or not event.active:
             return
 
-        channel_id = event[9]
-        channel = self.bot.get_channel(channel_id)
+        # Stop the deadline and refreshes (the event may be ending early on score)
+        self.event_scheduler.cancel(event_id)
 
-        submissions = self.get_submissions(event_id)
-        scores = {}
-        for submission in submissions:
-            score = self.calculate_score(submission[0])
-            scores[submission[3]] = score
+        channel = self.bot.get_channel(event.channel_id)
 
-        sorted_scores = sorted(scores.items(), key=lambda x: x[1][1], reverse=True)
+        ranking = await rankings.get_ranking(event_id)
+        await event_cache.update_highest_score(event_id, ranking.top(1))
 
-        top_10 = sorted_scores[:10]
+        top_10 = ranking.top(10)
 
-        embed = discord.Embed(title=f"Event '{event[1]}' has ended!", description="Top 10 Results:")
-        for song, score in top_10:
-            embed.add_field(name=song, value=f"Score: {score}", inline=False)
+        embed = discord.Embed(title=f"Event '{event.name}' has ended!", description="Top 10 Results:")
+        for standing in top_10:
+            embed.add_field(name=standing.song_name, value=f"Score: {standing.score}", inline=False)
 
-        try:
-            await channel.send(embed=embed)
-            winners_channel_id = int(os.environ.get("WINNERS_CHANNEL_ID", 0))
-            if winners_channel_id:
-                winners_channel = self.bot.get_channel(winners_channel_id)
-                await winners_channel.send(embed=embed)
-        except Exception as e:
-            logging.error(f"Failed to send results message: {e}")
+        if channel:
+            outbound.send(channel, embed=embed, priority=PRIORITY_RESULTS)
+        winners_channel = self.event_channel(event, "winners_channel", fallback=False)
+        if winners_channel:
+            outbound.send(winners_channel, embed=embed, priority=PRIORITY_RESULTS)
 
-        # Send results to admin channel and prompt for action
-        admin_channel_id = int(os.environ.get("ADMIN_CHANNEL_ID", channel_id)) # You'll need to add an ADMIN_CHANNEL_ID env variable.
-        admin_channel = self.bot.get_channel(admin_channel_id)
+        # Send results to the event guild's admin channel and prompt for action
+        admin_channel = self.event_channel(event, "admin_channel")
 
         if admin_channel:
-            admin_results = await self.generate_admin_leaderboard(event_id, event[1])
-            await admin_channel.send(admin_results)
-            await admin_channel.send("Event has ended. What would you like to do?\n\n1. Publish final results to #general\n2. Countdown results from lowest to highest\n3. Exit and finish the event")
+            async for chunk in self.generate_admin_leaderboard(event_id, event.name):
+                outbound.send(admin_channel, chunk, priority=PRIORITY_RESULTS)
+            outbound.send(admin_channel, "Event has ended. What would you like to do?\n\n1. Publish final results to #general\n2. Countdown results from lowest to highest\n3. Exit and finish the event", priority=PRIORITY_RESULTS)
 
             def check(msg):
                 return msg.channel == admin_channel and msg.author.guild_permissions.administrator
@@ -517,23 +747,26 @@ async def check_milestones(self, event_id, submission_id, score, conn, cursor):
                 response = response_msg.content.lower()
 
                 if response == "1":
-                    public_channel_id = int(os.environ.get("PUBLIC_CHANNEL_ID", channel_id)) # Use event channel as default
-                    public_channel = self.bot.get_channel(public_channel_id)
+                    public_channel = self.event_channel(event, "public_channel")
                     if public_channel:
-                        public_results = await self.generate_public_leaderboard(event_id, event[1])
-                        await public_channel.send(public_results)
+                        public_results = await self.generate_public_leaderboard(event_id, event.name)
+                        outbound.send(public_channel, public_results, priority=PRIORITY_RESULTS)
                         await admin_channel.send("Final results published to the public channel!")
                     else:
                         await admin_channel.send("⚠️ Public channel ID not configured. Could not publish results.")
 
                 elif response == "2":
                     await admin_channel.send("Counting down results...")
-                    sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=False)  # Sort ascending for countdown
-                    for rank, (song, score) in enumerate(sorted_scores, 1):
-                        await channel.send(f"{len(sorted_scores) - rank + 1}. {song} - **{score}** points")
-                        await asyncio.sleep(5)  # 5-second delay between announcements
-
-                    await admin_channel.send("Countdown complete!")
+                    # Lowest rank first, 5 seconds apart; the queue paces the reveal so this coroutine is not held
+                    countdown = ranking.bottom_up()
+                    for position, standing in enumerate(countdown):
+                        outbound.send(
+                            channel,
+                            f"{standing.rank}. {standing.song_name} - **{standing.score}** points",
+                            priority=PRIORITY_RESULTS,
+                            delay=5 * position
+                        )
+                    outbound.send(admin_channel, "Countdown complete!", priority=PRIORITY_RESULTS, delay=5 * len(countdown))
 
                 elif response == "3":
                     await admin_channel.send("Exiting and finishing the event.")
@@ -545,31 +778,71 @@ async def check_milestones(self, event_id, submission_id, score, conn, cursor):
                 await admin_channel.send("⚠️ No response received. Event finished without further action.")
 
         # Mark event as inactive
-        cursor.execute("UPDATE events SET active = 0 WHERE event_id = ?", (event_id,))
-        conn.commit()
-
-        # Clear previous standings
-        self.save_current_standings("")
+        await event_cache.deactivate_event(event_id)
+        self.embed_updates.forget(event_id)
+        message_index.drop_event(event_id)
+        rankings.drop_event(event_id)
+        self.milestones.drop_event(event_id)
+        self.owned_events.discard(event_id)
 
         logging.info(f"Event {event_id} has ended and been marked inactive.")
 
     # Helper functions
-    def get_event(self, event_id):
-        """Retrieves event details from the database."""
-        cursor.execute("SELECT * FROM events WHERE event_id = ?", (event_id,))
-        return cursor.fetchone()
-
-    def get_submissions(self, event_id):
-        """Retrieves submissions for an event from the database."""
-        cursor.execute("SELECT * FROM submissions WHERE event_id = ?", (event_id,))
-        return cursor.fetchall()
-
-    def calculate_score(self, submission_id):
-        """Calculates the score for a submission."""
-        cursor.execute("SELECT vote_value FROM votes WHERE submission_id = ?", (submission_id,))
-        votes = cursor.fetchall()
-        score = sum(vote[0] for vote in votes)
-        return score
+    async def resolve_event(self, ctx, event_name=None):
+        """Picks the active event a command refers to, or tells the user why it cannot.
+
+        Only events of the command's guild are candidates (in DMs, of the guilds the author
+        shares with the bot). A name selects one explicitly; otherwise the event running in
+        the current channel is preferred.
+        """
+        if ctx.guild:
+            events = await self.active_events(ctx.guild.id)
+        else:
+            guild_ids = {guild.id for guild in ctx.author.mutual_guilds}
+            events = [event for event in await self.active_events() if event.guild_id is None or event.guild_id in guild_ids]
 
-def setup(bot):
-    bot.add_cog(Commands(bot))
\ No newline at end of file
+        if event_name:
+            events = [event for event in events if event.name.lower() == event_name.lower()]
+        elif len(events) > 1:
+            events = [event for event in events if event.channel_id == ctx.channel.id] or events
+
+        if not events:
+            await ctx.send(f"⚠️ No active event named '{event_name}' found." if event_name else "⚠️ No active event found.")
+            return None
+        if len(events) > 1:
+            names = ", ".join(f"'{event.name}'" for event in events)
+            await ctx.send(f"⚠️ Several events are active ({names}). Add the event name to the command.")
+            return None
+        return events[0]
+
+    def event_channel(self, event, setting, fallback=True):
+        """Returns the channel configured for setting in the event's guild, else the event channel (when fallback)."""
+        channel_id = guild_config.get(event.guild_id, setting)
+        channel = self.bot.get_channel(channel_id) if channel_id else None
+        if channel is None and fallback:
+            channel = self.bot.get_channel(event.channel_id)
+        return channel
+
+    async def active_events(self, guild_id=None):
+        """Returns the active events of a guild (or all), from the event cache when it holds every one of them."""
+        if not shards.partial:
+            return event_cache.active(guild_id)
+        return await get_active_events(guild_id)  # Other processes' events are not cached here
+
+    async def get_event(self, event_id):
+        """Retrieves event details (from memory while the event is active)."""
+        return await event_cache.get_event(event_id)
+
+    async def get_submissions(self, event_id):
+        """Retrieves submissions for an event (from memory while the event is active)."""
+        return await event_cache.get_submissions(event_id)
+
+    async def calculate_score(self, submission_id):
+        """Calculates the score for a submission (from the live standings while its event is active)."""
+        submission = await event_cache.get_submission(submission_id)
+        if submission is not None and event_cache.get(submission.event_id) is not None:
+            return (await rankings.get_ranking(submission.event_id)).score(submission_id)
+        return await db.get_score(submission_id)
+
+async def setup(bot):
+    await bot.add_cog(Commands(bot))
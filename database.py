@@ -0,0 +1,610 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import archive
+import metrics
+import scoring
+from models import Event, Submission, Vote
+import snapshots
+import vote_stats
+
+# Constants
+VOTE_VALUES = {0: 5, 1: 3, 2: 1}  # Weighted scoring: first vote 5, second 3, third 1
+MAX_VOTES_PER_EVENT = 3
+
+# Storage profile used when config.yaml has no "storage" section
+DEFAULT_STORAGE_PROFILE = {
+    "backend": "sqlite",
+    "server_host": "127.0.0.1",
+    "server_port": 9200,
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,
+    "mmap_size": 268435456,
+    "busy_timeout": 5000,
+    "reader_connections": 4,
+    "checkpoint_interval": 300,
+    "checkpoint_mode": "TRUNCATE",
+}
+STORAGE_BACKENDS = {"sqlite", "remote"}
+JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+CHECKPOINT_MODES = {"PASSIVE", "FULL", "RESTART", "TRUNCATE"}
+STREAM_BATCH_SIZE = 200  # Rows fetched per round trip by Database.stream
+
+SQL_SECONDS = metrics.REGISTRY.histogram(
+    "countdown_sql_duration_seconds",
+    "Time spent running database work on the reader and writer threads",
+    ("statement", "mode")
+)
+
+# Generic query helpers (run on a database thread)
+def fetchone(cursor, query, params=()):
+    cursor.execute(query, params)
+    return cursor.fetchone()
+
+def fetchall(cursor, query, params=()):
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+def execute(conn, cursor, query, params=()):
+    cursor.execute(query, params)
+    return cursor.lastrowid
+
+def statement_class(fn, args):
+    """Names database work for metrics: the SQL verb for the generic helpers, else the function."""
+    if fn in (fetchone, fetchall, execute):
+        return args[0].split(None, 1)[0].lower()
+    return fn.__name__
+
+def checkpoint(conn, cursor, mode):
+    cursor.execute(f"PRAGMA wal_checkpoint({mode})")
+    return cursor.fetchone()  # (busy, wal_pages, checkpointed_pages)
+
+# Statements on the vote and leaderboard paths, shared with migrations.HOT_QUERIES so the
+# query plan check runs exactly what the bot runs
+ACTIVE_EVENTS_QUERY = f"SELECT {Event.columns()} FROM events WHERE active = 1"
+GUILD_ACTIVE_EVENTS_QUERY = f"SELECT {Event.columns()} FROM events WHERE (guild_id = ? OR guild_id IS NULL) AND active = 1"
+ACTIVE_EVENT_IDS_QUERY = "SELECT event_id FROM events WHERE active = 1"
+ACTIVE_EVENT_IDS_BY_NAME_QUERY = "SELECT event_id FROM events WHERE name = ? AND active = 1"
+GUILD_ACTIVE_EVENT_IDS_BY_NAME_QUERY = ACTIVE_EVENT_IDS_BY_NAME_QUERY + " AND (guild_id = ? OR guild_id IS NULL)"
+EVENT_SUBMISSIONS_QUERY = f"SELECT {Submission.columns()} FROM submissions WHERE event_id = ?"
+SUBMISSION_ID_QUERY = "SELECT submission_id FROM submissions WHERE event_id = ? AND track_id = ?"
+MILESTONE_STATE_SELECT = (
+    "SELECT s.submission_id, s.event_id, s.milestone_mask, s.milestone_reached, COALESCE(sc.score, 0) "
+    "FROM submissions s "
+    "JOIN events e ON e.event_id = s.event_id "
+    "LEFT JOIN submission_scores sc ON sc.submission_id = s.submission_id "
+)
+ACTIVE_MILESTONE_STATE_QUERY = MILESTONE_STATE_SELECT + "WHERE e.active = 1"
+EVENT_MILESTONE_STATE_QUERY = MILESTONE_STATE_SELECT + "WHERE s.event_id = ?"
+ACTIVE_SUBMISSION_MESSAGES_QUERY = (
+    "SELECT m.message_id, m.event_id, m.submission_id "
+    "FROM submission_messages m "
+    "JOIN events e ON e.event_id = m.event_id "
+    "WHERE e.active = 1"
+)
+COUNT_USER_VOTES_QUERY = "SELECT COUNT(*) FROM votes WHERE event_id = ? AND user_id = ?"
+EVENT_VOTES_QUERY = f"SELECT {Vote.columns()} FROM votes WHERE event_id = ? ORDER BY vote_id"
+SUBMISSION_VOTES_QUERY = "SELECT voter_name, vote_value FROM votes WHERE submission_id = ?"
+
+def count_user_votes(cursor, event_id, user_id):
+    cursor.execute(COUNT_USER_VOTES_QUERY, (event_id, user_id))
+    return cursor.fetchone()[0]
+
+# A queued vote. Reaction votes carry one submission id and take the next weight in the
+# user's quota; ballots (submitvote) carry the user's ordered picks and must be their first votes.
+# voted_at is only set for votes replayed from the journal; live votes take the batch's time.
+VoteRequest = namedtuple("VoteRequest", ["event_id", "user_id", "voter_name", "submission_ids", "ballot", "voted_at"], defaults=(None,))
+
+# Quota check, rank and weight assignment in a single statement. The row is only inserted
+# while the event is active and the user has votes left in it (and, for ballot rows, only
+# at the expected rank). The UNIQUE (event_id, user_id, vote_rank) index rejects a
+# concurrent writer that computed the same rank.
+VOTE_WEIGHT_CASE = "CASE n " + " ".join(f"WHEN {rank} THEN {value}" for rank, value in VOTE_VALUES.items()) + " ELSE 1 END"
+INSERT_VOTE_SQL = (
+    "INSERT INTO votes (event_id, submission_id, user_id, vote_rank, vote_value, voted_at, voter_name) "
+    f"SELECT :event_id, :submission_id, :user_id, n, {VOTE_WEIGHT_CASE}, :voted_at, :voter_name "
+    "FROM (SELECT COUNT(*) AS n FROM votes WHERE event_id = :event_id AND user_id = :user_id) "
+    f"WHERE n < {MAX_VOTES_PER_EVENT} AND (:rank IS NULL OR n = :rank) "
+    "AND EXISTS (SELECT 1 FROM events WHERE event_id = :event_id AND active = 1)"
+)
+
+def record_votes(conn, cursor, requests, journal=None):
+    """Records a batch of vote requests in one transaction.
+
+    Runs of reaction votes are written with executemany; ballot rows are written one by one
+    so a ballot from a user who already voted is rejected as a whole. Returns one result per
+    request: the vote value (or None when the quota is used up or the event has ended) for
+    reaction votes, True/False for ballots. journal is the (name, sequence number) of the
+    batch's last journal entry, stored with the votes so recovery knows where the database
+    stands.
+    """
+    # Take the write lock up front so the counts read below cannot go stale under another writer
+    if not conn.in_transaction:
+        cursor.execute("BEGIN IMMEDIATE")
+    cursor.execute("SELECT COALESCE(MAX(vote_id), 0) FROM votes")
+    last_vote_id = cursor.fetchone()[0]
+    voted_at = int(time.time())
+
+    def params(request, submission_id, rank):
+        return {
+            "event_id": request.event_id,
+            "submission_id": submission_id,
+            "user_id": request.user_id,
+            "voted_at": int(request.voted_at) if request.voted_at else voted_at,
+            "voter_name": request.voter_name,
+            "rank": rank,
+        }
+
+    reaction_rows = []
+    ballot_results = {}
+    for i, request in enumerate(requests):
+        if not request.ballot:
+            reaction_rows.append(params(request, request.submission_ids[0], None))
+            continue
+
+        # Keep the original order: reactions queued before the ballot are written first
+        if reaction_rows:
+            cursor.executemany(INSERT_VOTE_SQL, reaction_rows)
+            reaction_rows = []
+
+        ballot_results[i] = True
+        for rank, submission_id in enumerate(request.submission_ids):
+            cursor.execute(INSERT_VOTE_SQL, params(request, submission_id, rank))
+            if cursor.rowcount == 0:
+                if rank > 0:
+                    # Another writer slipped in between the rows of this ballot
+                    raise sqlite3.IntegrityError(f"Ballot from user {request.user_id} was interleaved")
+                ballot_results[i] = False
+                break
+
+    if reaction_rows:
+        cursor.executemany(INSERT_VOTE_SQL, reaction_rows)
+
+    # Inserted rows come back in request order; a rejected reaction has no row
+    cursor.execute(
+        (
+            "SELECT event_id, submission_id, user_id, vote_value, voted_at "
+            "FROM votes "
+            "WHERE vote_id > ? "
+            "ORDER BY vote_id"
+        ),
+        (last_vote_id,)
+    )
+    inserted = cursor.fetchall()
+
+    results = []
+    position = 0
+    for i, request in enumerate(requests):
+        if request.ballot:
+            results.append(ballot_results[i])
+            if ballot_results[i]:
+                position += len(request.submission_ids)
+            continue
+
+        row = inserted[position] if position < len(inserted) else None
+        if row and row[:3] == (request.event_id, request.submission_ids[0], request.user_id):
+            results.append(row[3])
+            position += 1
+        else:
+            results.append(None)
+
+    scoring.add_vote_scores(
+        cursor,
+        [(submission_id, event_id, vote_value, voted_at) for event_id, submission_id, user_id, vote_value, voted_at in inserted]
+    )
+    if journal is not None:
+        cursor.execute(
+            (
+                "INSERT INTO vote_journals (name, last_seq) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET last_seq = excluded.last_seq"
+            ),
+            journal
+        )
+    return results
+
+class SQLiteStorage:
+    """Runs SQLite work off the asyncio event loop.
+
+    Writes go through a single writer connection on its own thread, so they are serialized
+    in submission order. Reads run concurrently on a pool of read-only connections. Every
+    thread owns its own connection and every call gets a fresh cursor, so coroutines never
+    share one. Connections are tuned with the storage profile from config.yaml.
+    """
+
+    def __init__(self, path, profile=None):
+        self.path = path
+        self.profile = dict(DEFAULT_STORAGE_PROFILE, **(profile or {}))
+        self._validate_profile()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._readers = ThreadPoolExecutor(max_workers=self.profile["reader_connections"], thread_name_prefix="db-reader")
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+        # Open the writer first so the journal mode is in place before any reader connects
+        self._writer.submit(self._connection).result()
+
+    def _validate_profile(self):
+        profile = self.profile
+        profile["journal_mode"] = str(profile["journal_mode"]).upper()
+        profile["synchronous"] = str(profile["synchronous"]).upper()
+        profile["checkpoint_mode"] = str(profile["checkpoint_mode"]).upper()
+        profile["backend"] = str(profile["backend"]).lower()
+        if profile["backend"] not in STORAGE_BACKENDS:
+            raise ValueError(f"Invalid storage.backend: {profile['backend']}")
+        if profile["journal_mode"] not in JOURNAL_MODES:
+            raise ValueError(f"Invalid storage.journal_mode: {profile['journal_mode']}")
+        if profile["synchronous"] not in SYNCHRONOUS_MODES:
+            raise ValueError(f"Invalid storage.synchronous: {profile['synchronous']}")
+        if profile["checkpoint_mode"] not in CHECKPOINT_MODES:
+            raise ValueError(f"Invalid storage.checkpoint_mode: {profile['checkpoint_mode']}")
+        for key in ("cache_size", "mmap_size", "busy_timeout", "reader_connections", "checkpoint_interval", "server_port"):
+            profile[key] = int(profile[key])
+        if profile["reader_connections"] < 1:
+            raise ValueError("storage.reader_connections must be at least 1")
+
+    def _connect(self, readonly):
+        # A connection is only used by one thread at a time: its owning thread, the awaited
+        # steps of a stream, or close() after the pools have stopped
+        if readonly:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+
+        profile = self.profile
+        conn.execute(f"PRAGMA busy_timeout = {profile['busy_timeout']}")
+        conn.execute(f"PRAGMA cache_size = {profile['cache_size']}")
+        conn.execute(f"PRAGMA mmap_size = {profile['mmap_size']}")
+        if readonly:
+            conn.execute("PRAGMA query_only = 1")
+        else:
+            # journal_mode is persistent in the file, so setting it on the writer covers the readers too
+            conn.execute(f"PRAGMA journal_mode = {profile['journal_mode']}")
+            conn.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+        return conn
+
+    def _connection(self, readonly=False):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect(readonly)
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _run_read(self, fn, args):
+        start = time.perf_counter()
+        cursor = self._connection(readonly=True).cursor()
+        try:
+            return fn(cursor, *args)
+        finally:
+            cursor.close()
+            if metrics.REGISTRY.enabled:
+                SQL_SECONDS.observe(time.perf_counter() - start, statement_class(fn, args), "read")
+
+    def _run_write(self, fn, args):
+        start = time.perf_counter()
+        conn = self._connection()
+        cursor = conn.cursor()
+        try:
+            result = fn(conn, cursor, *args)
+            conn.commit()
+            return result
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            if metrics.REGISTRY.enabled:
+                SQL_SECONDS.observe(time.perf_counter() - start, statement_class(fn, args), "write")
+
+    async def read(self, fn, *args):
+        """Runs fn(cursor, *args) on a reader thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, self._run_read, fn, args)
+
+    async def write(self, fn, *args):
+        """Runs fn(conn, cursor, *args) on the writer thread inside one transaction."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, self._run_write, fn, args)
+
+    async def stream(self, query, params=(), batch_size=STREAM_BATCH_SIZE):
+        """Yields the rows of a query, fetching batch_size rows at a time.
+
+        Runs on its own read-only connection so a long result neither holds a pooled
+        connection nor has to fit in memory. The connection is closed when the stream ends.
+        """
+        loop = asyncio.get_running_loop()
+        conn = await loop.run_in_executor(self._readers, self._connect, True)
+        try:
+            cursor = await loop.run_in_executor(self._readers, conn.execute, query, params)
+            while True:
+                rows = await loop.run_in_executor(self._readers, cursor.fetchmany, batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row
+        finally:
+            await loop.run_in_executor(self._readers, conn.close)
+
+    async def checkpoint(self):
+        """Checkpoints the WAL into the main database file."""
+        return await self.write(checkpoint, self.profile["checkpoint_mode"])
+
+    async def checkpoint_loop(self):
+        """Checkpoints the WAL periodically so it cannot grow without limit during long events."""
+        interval = self.profile["checkpoint_interval"]
+        if self.profile["journal_mode"] != "WAL" or interval <= 0:
+            return
+
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                busy, wal_pages, checkpointed_pages = await self.checkpoint()
+                logging.debug(f"WAL checkpoint: {checkpointed_pages}/{wal_pages} pages (busy: {busy})")
+            except sqlite3.Error as e:
+                logging.error(f"WAL checkpoint failed: {e}")
+
+    def close(self):
+        """Waits for pending work and closes every thread's connection."""
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+    async def publish(self, message):
+        """Nothing to do: a single process owns every event, so no other process needs telling."""
+
+    def subscribe(self, callback):
+        pass
+
+class Database:
+    """The bot's queries, run on a storage backend.
+
+    The backend decides where fn(cursor, ...) and fn(conn, cursor, ...) run: SQLiteStorage
+    runs them on local threads against the database file, RemoteStorage (remote_storage.py)
+    sends them to the storage server shared by every shard process. The backend also
+    carries the invalidation messages those processes send each other.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    async def read(self, fn, *args):
+        """Runs fn(cursor, *args) against the database."""
+        return await self.storage.read(fn, *args)
+
+    async def write(self, fn, *args):
+        """Runs fn(conn, cursor, *args) inside one transaction."""
+        return await self.storage.write(fn, *args)
+
+    def stream(self, query, params=(), batch_size=STREAM_BATCH_SIZE):
+        """Yields the rows of a query, fetching batch_size rows at a time."""
+        return self.storage.stream(query, params, batch_size)
+
+    async def checkpoint_loop(self):
+        await self.storage.checkpoint_loop()
+
+    def close(self):
+        self.storage.close()
+
+    async def publish(self, message):
+        """Sends an invalidation message (a tuple) to the other bot processes."""
+        await self.storage.publish(message)
+
+    def subscribe(self, callback):
+        """Calls async callback(message) for every message published by another process."""
+        self.storage.subscribe(callback)
+
+    async def fetchone(self, query, params=()):
+        return await self.read(fetchone, query, params)
+
+    async def fetchall(self, query, params=()):
+        return await self.read(fetchall, query, params)
+
+    async def execute(self, query, params=()):
+        """Runs a single write statement and returns the last inserted row id."""
+        return await self.write(execute, query, params)
+
+    # Events
+    async def get_event(self, event_id):
+        row = await self.fetchone(f"SELECT {Event.columns()} FROM events WHERE event_id = ?", (event_id,))
+        return Event.from_row(row) if row else None
+
+    async def get_active_events(self, guild_id=None):
+        """Returns the active events of a guild (plus those created before events had a guild), or of every guild."""
+        if guild_id is None:
+            rows = await self.fetchall(ACTIVE_EVENTS_QUERY)
+        else:
+            rows = await self.fetchall(GUILD_ACTIVE_EVENTS_QUERY, (guild_id,))
+        return [Event.from_row(row) for row in rows]
+
+    async def get_active_event_ids(self):
+        return [row[0] for row in await self.fetchall(ACTIVE_EVENT_IDS_QUERY)]
+
+    async def get_active_event_ids_by_name(self, name, guild_id=None):
+        """Returns the ids of the active events with this name in a guild (plus those created
+        before events had a guild), or in every guild."""
+        if guild_id is None:
+            rows = await self.fetchall(ACTIVE_EVENT_IDS_BY_NAME_QUERY, (name,))
+        else:
+            rows = await self.fetchall(GUILD_ACTIVE_EVENT_IDS_BY_NAME_QUERY, (name, guild_id))
+        return [row[0] for row in rows]
+
+    async def get_ended_event(self, name, guild_id=None):
+        """Returns the most recent ended event with this name in a guild (or in any guild), or None."""
+        query = f"SELECT {Event.columns()} FROM events WHERE name = ? AND active = 0 "
+        if guild_id is None:
+            row = await self.fetchone(query + "ORDER BY event_id DESC LIMIT 1", (name,))
+        else:
+            row = await self.fetchone(query + "AND (guild_id = ? OR guild_id IS NULL) ORDER BY event_id DESC LIMIT 1", (name, guild_id))
+        return Event.from_row(row) if row else None
+
+    async def create_event(self, name, duration, min_submissions, max_submissions, song_min_duration, song_max_duration, start_at, end_at, channel_id, guild_id=None):
+        """Creates an active event; start_at and end_at are UTC epoch seconds."""
+        return await self.execute(
+            (
+                "INSERT INTO events (name, duration, min_submissions, max_submissions, song_min_duration, song_max_duration, start_at, end_at, channel_id, guild_id, active) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)"
+            ),
+            (name, duration, min_submissions, max_submissions, song_min_duration, song_max_duration, start_at, end_at, channel_id, guild_id)
+        )
+
+    async def set_event_message(self, event_id, message_id):
+        await self.execute("UPDATE events SET message_id = ? WHERE event_id = ?", (message_id, event_id))
+
+    async def deactivate_event(self, event_id):
+        """Marks the event inactive; end_at becomes the actual end when it ended early."""
+        await self.execute(
+            "UPDATE events SET active = 0, end_at = MIN(end_at, ?) WHERE event_id = ?",
+            (int(time.time()), event_id)
+        )
+
+    # Archives
+    async def get_archivable_events(self, ended_before):
+        return await self.read(archive.get_archivable_events, ended_before)
+
+    async def archive_event(self, event_id, directory=None):
+        return await self.write(archive.archive_event, event_id, directory)
+
+    async def expire_archives(self, ended_before, directory=None):
+        return await self.write(archive.expire_archives, ended_before, directory)
+
+    async def remove_archives(self, paths):
+        return await self.write(archive.remove_archives, paths)
+
+    async def read_archive(self, event_id, directory=None):
+        return await self.read(archive.read_archive, event_id, directory)
+
+    # Guild settings
+    async def get_guild_settings(self):
+        return await self.fetchall("SELECT guild_id, setting, value FROM guild_settings")
+
+    async def set_guild_setting(self, guild_id, setting, value):
+        """Stores a guild setting; a value of None removes it."""
+        if value is None:
+            await self.execute("DELETE FROM guild_settings WHERE guild_id = ? AND setting = ?", (guild_id, setting))
+        else:
+            await self.execute(
+                "INSERT OR REPLACE INTO guild_settings (guild_id, setting, value) VALUES (?, ?, ?)",
+                (guild_id, setting, value)
+            )
+
+    # Submissions
+    async def get_submissions(self, event_id):
+        rows = await self.fetchall(EVENT_SUBMISSIONS_QUERY, (event_id,))
+        return [Submission.from_row(row) for row in rows]
+
+    async def get_submission(self, submission_id):
+        row = await self.fetchone(f"SELECT {Submission.columns()} FROM submissions WHERE submission_id = ?", (submission_id,))
+        return Submission.from_row(row) if row else None
+
+    async def get_submission_id(self, event_id, track_id):
+        row = await self.fetchone(SUBMISSION_ID_QUERY, (event_id, track_id))
+        return row[0] if row else None
+
+    async def get_submission_details(self, submission_id):
+        return await self.fetchone(
+            "SELECT track_id, song_name, url, submitter_name FROM submissions WHERE submission_id = ?",
+            (submission_id,)
+        )
+
+    async def get_submission_names(self, submission_id):
+        return await self.fetchone(
+            "SELECT song_name, submitter_name FROM submissions WHERE submission_id = ?",
+            (submission_id,)
+        )
+
+    # Milestones
+    async def get_milestone_state(self, event_id=None):
+        """Returns (submission_id, event_id, milestone_mask, milestone_reached, score) for every
+        submission of the active events, or of one event."""
+        if event_id is None:
+            return await self.fetchall(ACTIVE_MILESTONE_STATE_QUERY)
+        return await self.fetchall(EVENT_MILESTONE_STATE_QUERY, (event_id,))
+
+    async def set_milestone_mask(self, submission_id, mask):
+        await self.execute(
+            "UPDATE submissions SET milestone_mask = ?, milestone_reached = 1 WHERE submission_id = ?",
+            (mask, submission_id)
+        )
+
+    # Submission messages
+    async def get_active_submission_messages(self):
+        return await self.fetchall(ACTIVE_SUBMISSION_MESSAGES_QUERY)
+
+    async def add_submission_message(self, message_id, event_id, submission_id):
+        await self.execute(
+            "INSERT OR REPLACE INTO submission_messages (message_id, event_id, submission_id) VALUES (?, ?, ?)",
+            (message_id, event_id, submission_id)
+        )
+
+    # Standings snapshots
+    async def save_snapshot(self, event_id, standings):
+        return await self.write(snapshots.save_snapshot, event_id, standings)
+
+    async def get_snapshots(self, event_id):
+        return await self.read(snapshots.get_snapshots, event_id)
+
+    async def get_latest_snapshot_id(self, event_id):
+        return await self.read(snapshots.get_latest_snapshot_id, event_id)
+
+    async def get_snapshot_ranks(self, snapshot_id):
+        return await self.read(snapshots.get_snapshot_ranks, snapshot_id)
+
+    # Votes
+    async def count_user_votes(self, event_id, user_id):
+        return await self.read(count_user_votes, event_id, user_id)
+
+    async def record_votes(self, requests, journal=None):
+        return await self.write(record_votes, requests, journal)
+
+    async def get_journal_position(self, name):
+        """Returns the sequence number of the last journal entry committed from a vote journal (0 if none)."""
+        row = await self.fetchone("SELECT last_seq FROM vote_journals WHERE name = ?", (name,))
+        return row[0] if row else 0
+
+    async def get_event_votes(self, event_id):
+        rows = await self.fetchall(EVENT_VOTES_QUERY, (event_id,))
+        return [Vote.from_row(row) for row in rows]
+
+    async def get_votes(self, submission_id):
+        return await self.fetchall(SUBMISSION_VOTES_QUERY, (submission_id,))
+
+    async def count_votes(self, event_id, since, until=None):
+        return await self.read(vote_stats.count_votes, event_id, since, until)
+
+    async def get_votes_per_minute(self, event_id, since, until=None):
+        return await self.read(vote_stats.votes_per_minute, event_id, since, until)
+
+    async def get_votes_since_last_chart(self, event_id):
+        return await self.read(vote_stats.votes_since_last_chart, event_id)
+
+    def stream_standings_with_votes(self, event_id):
+        """Streams the event's standings joined with their votes (see scoring.STANDINGS_WITH_VOTES_QUERY)."""
+        return self.stream(scoring.STANDINGS_WITH_VOTES_QUERY, (event_id,))
+
+    # Scores
+    async def get_standings(self, event_id):
+        return await self.read(scoring.get_standings, event_id)
+
+    async def get_score(self, submission_id):
+        return await self.read(scoring.get_score, submission_id)
+
+    async def update_highest_score(self, event_id, standings):
+        return await self.write(scoring.update_highest_score, event_id, standings)
+
+    async def verify_scores(self, event_id=None):
+        return await self.read(scoring.verify_scores, event_id)
+
+    async def rebuild_scores(self, event_id=None):
+        await self.write(scoring.rebuild_scores, event_id)
@@ -0,0 +1,52 @@
+import logging
+
+# Per-guild channel settings, set with /guildconfig. Each one falls back to a process-wide default.
+GUILD_SETTINGS = {
+    "admin_channel": "Receives results, charts prompts and diagnostics",
+    "public_channel": "Where charts and final results are published",
+    "winners_channel": "Also receives the final top 10",
+    "milestones_channel": "Receives milestone announcements",
+}
+
+class GuildConfig:
+    """Channel settings per guild, persisted in the guild_settings table and held in memory.
+
+    Lookups are dict reads; a setting a guild has not configured falls back to the
+    defaults given at construction (environment variables and config.yaml), so a
+    single-guild deployment keeps working without running /guildconfig.
+    """
+
+    def __init__(self, db, defaults=None):
+        self.db = db
+        self.defaults = {setting: value for setting, value in (defaults or {}).items() if value}
+        self._settings = {}  # guild_id -> {setting: value}
+
+    async def load(self):
+        """Loads every guild's settings (called once at startup)."""
+        rows = await self.db.get_guild_settings()
+        for guild_id, setting, value in rows:
+            self._settings.setdefault(guild_id, {})[setting] = value
+        logging.info(f"Loaded {len(rows)} guild settings for {len(self._settings)} guilds")
+
+    def get(self, guild_id, setting):
+        """Returns the guild's value for setting, else the default (None when neither is set)."""
+        value = self._settings.get(guild_id, {}).get(setting)
+        return value if value is not None else self.defaults.get(setting)
+
+    def overrides(self, guild_id):
+        """Returns the settings the guild has configured itself."""
+        return dict(self._settings.get(guild_id, {}))
+
+    async def set(self, guild_id, setting, value):
+        """Stores a guild setting; None removes it so the default applies again."""
+        if setting not in GUILD_SETTINGS:
+            raise ValueError(f"Unknown guild setting: {setting}")
+        await self.db.set_guild_setting(guild_id, setting, value)
+        self.update(guild_id, setting, value)
+
+    def update(self, guild_id, setting, value):
+        """Updates the in-memory copy only (for a setting another process has stored)."""
+        if value is None:
+            self._settings.get(guild_id, {}).pop(setting, None)
+        else:
+            self._settings.setdefault(guild_id, {})[setting] = value
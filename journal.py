@@ -0,0 +1,159 @@
+import glob
+import json
+import logging
+import os
+import time
+
+from database import VoteRequest
+
+# Journal settings used when config.yaml has no "journal" section
+DEFAULT_JOURNAL_SETTINGS = {
+    "enabled": True,
+    "directory": None,            # Defaults to a "journal" directory next to the database
+    "fsync": True,                # fsync every batch before it is written to the database
+    "rotate_bytes": 64 * 1024 * 1024,  # Start a new file once the current one is this large
+    "keep_files": 5,              # Rotated files kept for audits and replays
+}
+
+def journal_name(shards):
+    """Names the journal of this process: one per set of shards, since each process has its own queue."""
+    if not shards.partial:
+        return "votes"
+    return "votes-shards-" + "-".join(str(shard_id) for shard_id in sorted(shards.shard_ids))
+
+def read_journal(path):
+    """Reads a journal file.
+
+    Returns ([(seq, VoteRequest)], {aborted seq}, size of the readable prefix). A torn last
+    line (the process died while writing it) ends the readable prefix; that batch was
+    never acknowledged.
+    """
+    entries = []
+    aborted = set()
+    good_size = 0
+    if not os.path.exists(path):
+        return entries, aborted, good_size
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if not line.endswith(b"\n"):
+                break
+            good_size += len(line)
+            if "aborted" in record:
+                first, last = record["aborted"]
+                aborted.update(range(first, last + 1))
+                continue
+            entries.append((record["seq"], VoteRequest(
+                record["event_id"], record["user_id"], record["voter_name"],
+                record["submission_ids"], record["ballot"], record["time"]
+            )))
+    return entries, aborted, good_size
+
+class VoteJournal:
+    """Append-only log of vote requests, written before they reach the database.
+
+    The vote queue appends each batch here (one fsync per batch) and then records it with
+    the sequence number of its last entry, in the same transaction as the votes. At startup,
+    entries past the recorded position were journaled but never committed and are replayed.
+    A batch the database rejected is marked aborted so it is not replayed later. Entries are
+    JSON lines in arrival order, so a journal also serves as an audit log and as input for
+    replay.py.
+    """
+
+    def __init__(self, directory, name="votes", fsync=True, rotate_bytes=64 * 1024 * 1024, keep_files=5):
+        self.directory = directory
+        self.name = name
+        self.path = os.path.join(directory, f"{name}.jsonl")
+        self.fsync = fsync
+        self.rotate_bytes = int(rotate_bytes)
+        self.keep_files = int(keep_files)
+        self.seq = 0
+        self._file = None
+
+    @classmethod
+    def from_settings(cls, settings, db_path, shards):
+        settings = dict(DEFAULT_JOURNAL_SETTINGS, **(settings or {}))
+        if not settings["enabled"]:
+            return None
+        directory = settings["directory"] or os.path.join(os.path.dirname(db_path), "journal")
+        return cls(directory, journal_name(shards), settings["fsync"], settings["rotate_bytes"], settings["keep_files"])
+
+    @property
+    def opened(self):
+        return self._file is not None
+
+    def open(self, committed_seq):
+        """Opens the journal for appending. Returns the [(seq, VoteRequest)] not yet committed."""
+        os.makedirs(self.directory, exist_ok=True)
+        entries, aborted, good_size = read_journal(self.path)
+        if os.path.exists(self.path) and os.path.getsize(self.path) > good_size:
+            logging.warning(f"Discarding a torn entry at the end of {self.path}")
+            os.truncate(self.path, good_size)
+        self.seq = max([committed_seq or 0] + [seq for seq, request in entries] + list(aborted))
+        self._file = open(self.path, "ab")
+        return [(seq, request) for seq, request in entries if seq > (committed_seq or 0) and seq not in aborted]
+
+    def append(self, requests):
+        """Writes a batch and makes it durable. Returns the (first, last) sequence numbers."""
+        self._rotate_if_full()
+        now = round(time.time(), 3)
+        first = self.seq + 1
+        lines = []
+        for request in requests:
+            self.seq += 1
+            lines.append(json.dumps({
+                "seq": self.seq,
+                "time": request.voted_at or now,
+                "event_id": request.event_id,
+                "user_id": request.user_id,
+                "voter_name": request.voter_name,
+                "submission_ids": request.submission_ids,
+                "ballot": request.ballot,
+            }))
+        self._write(lines)
+        return first, self.seq
+
+    def abort(self, first, last):
+        """Marks a batch the database rejected, so recovery does not replay it."""
+        self._write([json.dumps({"aborted": [first, last]})])
+
+    def _write(self, lines):
+        self._file.write(("\n".join(lines) + "\n").encode())
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def _rotate_if_full(self):
+        # Only called between batches, when every entry is committed or aborted, so a
+        # rotated file never holds anything recovery needs
+        if self._file.tell() < self.rotate_bytes:
+            return
+        # Named after the last sequence number it holds, which only grows
+        rotated_path = f"{self.path}.{self.seq}"
+        if os.path.exists(rotated_path):
+            logging.error(f"Not rotating {self.path}: {rotated_path} already exists")
+            return
+        self._file.close()
+        os.rename(self.path, rotated_path)
+        for old_path in self.rotated_files()[:-self.keep_files or None]:
+            os.remove(old_path)
+        self._file = open(self.path, "ab")
+
+    def rotated_files(self):
+        """Returns the rotated files of this journal, oldest first.
+
+        Files are named after their last sequence number (older ones after their rotation
+        time), so they are ordered by when they were last written.
+        """
+        return sorted(
+            glob.glob(glob.escape(self.path) + ".*"),
+            key=lambda path: (os.path.getmtime(path), int(path.rsplit(".", 1)[1]))
+        )
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,311 @@
+"""End-to-end load simulator.
+
+Runs the real bot_core/commands handlers against a local stand-in for the Discord REST
+endpoints the bot uses (send, fetch_message, edit), with configurable latency and
+per-channel 429 rate limits. Synthetic voters arrive at a fixed rate and either react
+to submission messages or DM a submitvote ballot. The report (JSON) gives vote-to-embed
+latency percentiles, lost votes and REST calls per vote:
+
+    python loadsim.py --rate 20 --duration 30 --embed-window 2 --output sim.json
+"""
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from collections import Counter, deque
+
+import discord
+
+from benchmark import seed, StubReaction, StubUser
+
+# Set by the driver around each handler call so the vote hook knows when the vote started
+vote_started = contextvars.ContextVar("vote_started", default=None)
+
+SCORE_PATTERN = re.compile(r"Score: (\d+)")
+
+class FakeResponse:
+    """The parts of an aiohttp response that discord.HTTPException reads."""
+
+    def __init__(self, status, reason):
+        self.status = status
+        self.reason = reason
+
+class FakeDiscord:
+    """In-process stand-in for the Discord REST API.
+
+    Every call sleeps for a sampled latency and takes a token from the bucket of its
+    route and channel; an empty bucket answers 429 like Discord does.
+    """
+
+    def __init__(self, latency_ms, jitter_ms, bucket_size, bucket_period, rng):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.bucket_size = bucket_size
+        self.refill_rate = bucket_size / bucket_period
+        self.rng = rng
+        self.calls = Counter()
+        self.rate_limited = Counter()
+        self._buckets = {}  # (route, channel_id) -> [tokens, updated]
+        self.channels = {}
+        self.on_edit = None  # fn(message, embed) called when an edit lands
+
+    async def request(self, route, channel_id):
+        self.calls[route] += 1
+        await asyncio.sleep(max(0.0, self.rng.gauss(self.latency, self.jitter)))
+
+        now = time.perf_counter()
+        bucket = self._buckets.setdefault((route, channel_id), [self.bucket_size, now])
+        bucket[0] = min(self.bucket_size, bucket[0] + (now - bucket[1]) * self.refill_rate)
+        bucket[1] = now
+        if bucket[0] < 1:
+            self.rate_limited[route] += 1
+            raise discord.HTTPException(FakeResponse(429, "Too Many Requests"), "You are being rate limited.")
+        bucket[0] -= 1
+
+    def get_channel(self, channel_id):
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            channel = self.channels[channel_id] = FakeChannel(self, channel_id)
+        return channel
+
+class FakeMessage:
+    def __init__(self, api, channel, message_id, content=None, embed=None):
+        self.api = api
+        self.channel = channel
+        self.id = message_id
+        self.content = content
+        self.embed = embed
+        self.author = None
+
+    async def edit(self, content=None, embed=None):
+        await self.api.request("PATCH /channels/{channel}/messages/{message}", self.channel.id)
+        self.embed = embed
+        if self.api.on_edit:
+            self.api.on_edit(self, embed)
+
+class FakeChannel:
+    def __init__(self, api, channel_id):
+        self.api = api
+        self.id = channel_id
+        self.messages = {}
+
+    async def send(self, content=None, embed=None):
+        await self.api.request("POST /channels/{channel}/messages", self.id)
+        message = FakeMessage(self.api, self, random.getrandbits(60), content, embed)
+        self.messages[message.id] = message
+        return message
+
+    async def fetch_message(self, message_id):
+        await self.api.request("GET /channels/{channel}/messages/{message}", self.id)
+        message = self.messages.get(message_id)
+        if message is None:
+            message = self.messages[message_id] = FakeMessage(self.api, self, message_id)
+        return message
+
+class FakeDMChannel(discord.DMChannel):
+    """Passes submitvote's DM check; not backed by the discord.py state machinery."""
+
+    def __init__(self):
+        pass
+
+class FakeAuthor(StubUser):
+    def __init__(self, api, user_id):
+        super().__init__(user_id)
+        self.api = api
+        self.mutual_guilds = []
+
+    async def send(self, content=None, embed=None):
+        await self.api.request("POST /channels/{dm}/messages", ("dm", self.id))
+
+class FakeContext:
+    def __init__(self, author):
+        self.author = author
+        self.channel = FakeDMChannel()
+        self.guild = None
+
+    async def send(self, content=None, embed=None):
+        await self.author.send(content, embed)
+
+def percentiles(values):
+    if not values:
+        return {"count": 0}
+    values = sorted(values)
+    count = len(values)
+    pick = lambda q: round(values[min(count - 1, int(count * q))] * 1000, 2)
+    return {"count": count, "p50_ms": pick(0.5), "p90_ms": pick(0.9), "p99_ms": pick(0.99), "max_ms": round(values[-1] * 1000, 2)}
+
+class Simulation:
+    def __init__(self, args, event_id, submission_ids, messages):
+        self.args = args
+        self.event_id = event_id
+        self.submission_ids = submission_ids
+        self.messages = messages
+        self.rng = random.Random(args.seed)
+        self.api = FakeDiscord(args.latency_ms, args.jitter_ms, args.bucket_size, args.bucket_period, self.rng)
+        self.api.on_edit = self.embed_edited
+        self.applied_points = 0
+        self.unseen = deque()  # (applied_points after the vote, vote start time), waiting for an embed
+        self.latencies = []
+        self.votes_sent = 0
+        self.votes_applied = 0
+        self.ballots = 0
+        self.errors = Counter()
+        self.embed_edits = 0
+        self.end_event_calls = 0
+
+    def embed_edited(self, message, embed):
+        self.embed_edits += 1
+        shown = sum(int(score) for score in SCORE_PATTERN.findall(json.dumps(embed.to_dict())))
+        now = time.perf_counter()
+        while self.unseen and self.unseen[0][0] <= shown:
+            self.latencies.append(now - self.unseen.popleft()[1])
+
+    async def run(self):
+        with contextlib.redirect_stdout(sys.stderr):
+            import bot_core
+            from bot_setup import db, vote_queue, outbound, message_index, rankings, event_cache
+
+        logging.getLogger().setLevel(logging.WARNING)
+        bot = bot_core.bot
+        bot.get_channel = self.api.get_channel
+
+        await bot.load_extension("commands")
+        vote_queue.start()
+        outbound.start()
+        await message_index.load()
+        await rankings.load()
+        await event_cache.load()
+        cog = bot.get_cog("Commands")
+        await cog.load_milestones()
+        if self.args.embed_window is not None:
+            cog.embed_updates.window = self.args.embed_window
+
+        # Count every vote the handlers apply, tagged with when its reaction/ballot arrived
+        apply_vote = cog.apply_vote
+        async def tracked_apply_vote(event_id, submission_id, vote_value, *voter):
+            self.votes_applied += 1
+            self.applied_points += vote_value
+            self.unseen.append((self.applied_points, vote_started.get()))
+            return await apply_vote(event_id, submission_id, vote_value, *voter)
+        cog.apply_vote = tracked_apply_vote
+
+        async def count_end_event(event_id):
+            self.end_event_calls += 1  # The real one waits on an admin reply
+        cog.end_event = count_end_event
+
+        tasks = set()
+        next_user = 5_000_000
+        interval = 1 / self.args.rate
+        start = time.perf_counter()
+        while time.perf_counter() - start < self.args.duration:
+            next_user += 1
+            if self.rng.random() < self.args.ballot_share:
+                task = asyncio.get_running_loop().create_task(self.ballot(cog, next_user))
+            else:
+                task = asyncio.get_running_loop().create_task(self.react(bot_core, next_user))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            await asyncio.sleep(self.rng.expovariate(1 / interval))
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        traffic_time = time.perf_counter() - start
+
+        # Give the last embed edits time to land
+        drain_deadline = time.perf_counter() + self.args.drain
+        while self.unseen and time.perf_counter() < drain_deadline:
+            await asyncio.sleep(0.1)
+
+        backlog = outbound.pending()
+        await vote_queue.stop()
+        await outbound.stop()
+        cog.event_scheduler.stop()
+        recorded = (await db.fetchone("SELECT COUNT(*) FROM votes WHERE event_id = ?", (self.event_id,)))[0]
+        db.close()
+        return self.report(traffic_time, recorded, backlog)
+
+    async def react(self, bot_core, user_id):
+        user = StubUser(user_id)
+        for submission_id in self.rng.sample(self.submission_ids, self.rng.randint(1, 3)):
+            vote_started.set(time.perf_counter())
+            self.votes_sent += 1
+            try:
+                await bot_core.on_reaction_add(StubReaction(self.messages[submission_id]), user)
+            except Exception as e:
+                self.errors[type(e).__name__] += 1
+            await asyncio.sleep(self.rng.uniform(0, self.args.think_time))
+
+    async def ballot(self, cog, user_id):
+        tracks = self.rng.sample(range(1, len(self.submission_ids) + 1), 3)
+        vote_started.set(time.perf_counter())
+        self.votes_sent += 3
+        self.ballots += 1
+        try:
+            await cog.submitvote.callback(cog, FakeContext(FakeAuthor(self.api, user_id)), *map(str, tracks))
+        except Exception as e:
+            self.errors[type(e).__name__] += 1
+
+    def report(self, traffic_time, recorded, backlog):
+        total_calls = sum(self.api.calls.values())
+        return {
+            "parameters": {key: value for key, value in vars(self.args).items() if key != "output"},
+            "traffic_seconds": round(traffic_time, 2),
+            "votes_sent": self.votes_sent,
+            "votes_applied": self.votes_applied,
+            "votes_recorded": recorded,
+            "votes_lost": self.votes_sent - recorded,
+            "ballots": self.ballots,
+            "handler_errors": dict(self.errors),
+            "end_event_calls": self.end_event_calls,
+            "vote_to_embed": dict(percentiles(self.latencies), never_shown=len(self.unseen)),
+            "embed_edits": self.embed_edits,
+            "outbound_backlog": backlog,  # Messages still queued (e.g. milestones) when the run ended
+            "rest": {
+                "calls": dict(self.api.calls),
+                "rate_limited": dict(self.api.rate_limited),
+                "total_calls": total_calls,
+                "calls_per_vote": round(total_calls / recorded, 3) if recorded else None,
+            },
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate voters against the bot with a fake Discord REST API.")
+    parser.add_argument("--submissions", type=int, default=20, help="Submissions in the simulated event")
+    parser.add_argument("--rate", type=float, default=20, help="Voters arriving per second")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of traffic")
+    parser.add_argument("--ballot-share", type=float, default=0.2, help="Share of voters using submitvote instead of reactions")
+    parser.add_argument("--think-time", type=float, default=2.0, help="Maximum pause between a voter's reactions (seconds)")
+    parser.add_argument("--latency-ms", type=float, default=80, help="Mean REST latency")
+    parser.add_argument("--jitter-ms", type=float, default=30, help="Standard deviation of the REST latency")
+    parser.add_argument("--bucket-size", type=int, default=5, help="Requests per route and channel before a 429")
+    parser.add_argument("--bucket-period", type=float, default=5.0, help="Seconds for a rate-limit bucket to refill")
+    parser.add_argument("--embed-window", type=float, help="Override event.embed_update_window")
+    parser.add_argument("--drain", type=float, default=30, help="Seconds to wait for the final embed edits")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    parser.add_argument("--output", default="-", help="Where to write the JSON report (- for stdout)")
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))  # config.yaml is read from the working directory
+    with tempfile.TemporaryDirectory() as scratch:
+        os.environ["DB_PATH"] = os.path.join(scratch, "loadsim.db")
+        event_id, submission_ids, messages = seed(os.environ["DB_PATH"], 1, args.submissions, 0, args.seed)
+        messages = {submission_id: FakeMessage(None, None, message_id) for submission_id, message_id in messages.items()}
+        report = asyncio.run(Simulation(args, event_id, submission_ids, messages).run())
+
+    output = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import logging
+
+# Prefix of the confirmation message posted for each submission
+SUBMISSION_MESSAGE_PREFIX = "✅ Your song has been submitted as"
+
+def parse_submission_message(content):
+    """Extracts (track_id, event_name) from a submission message, or returns None."""
+    if not content.startswith(SUBMISSION_MESSAGE_PREFIX):
+        return None
+    parts = content.split("**")
+    if len(parts) < 4:
+        return None
+    return parts[1], parts[3]
+
+class SubmissionMessageIndex:
+    """Maps submission message ids to (event_id, submission_id).
+
+    The mapping is persisted in the submission_messages table and held in memory for
+    active events, so routing a reaction is a single dict lookup with no queries.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._routes = {}  # message_id -> (event_id, submission_id)
+        self._event_messages = {}  # event_id -> set of message ids, for eviction
+
+    async def load(self):
+        """Loads the routes of every active event (called once at startup)."""
+        for message_id, event_id, submission_id in await self.db.get_active_submission_messages():
+            self._add(message_id, event_id, submission_id)
+        logging.info(f"Loaded {len(self._routes)} submission message routes")
+
+    def lookup(self, message_id):
+        """Returns (event_id, submission_id) for a submission message, or None."""
+        return self._routes.get(message_id)
+
+    async def register(self, message_id, event_id, submission_id):
+        """Records the message that represents a submission."""
+        await self.db.add_submission_message(message_id, event_id, submission_id)
+        self._add(message_id, event_id, submission_id)
+
+    def _add(self, message_id, event_id, submission_id):
+        self._routes[message_id] = (event_id, submission_id)
+        self._event_messages.setdefault(event_id, set()).add(message_id)
+
+    async def register_message(self, message):
+        """Routes a submission message by parsing it once, when the bot posts it (or on the
+        first reaction to one posted before the index existed).
+
+        The event is looked up by name among the active events of the message's guild; the
+        message is left unrouted when no event or more than one matches. The result is
+        registered, so later reactions on the same message are dict hits.
+        """
+        parsed = parse_submission_message(message.content)
+        if not parsed:
+            return None
+        track_id, event_name = parsed
+
+        event_ids = await self.db.get_active_event_ids_by_name(event_name, message.guild.id if message.guild else None)
+        if not event_ids:
+            logging.warning(f"Active event not found for name: {event_name}")
+            return None
+        if len(event_ids) > 1:
+            logging.warning(f"Not routing message {message.id}: {len(event_ids)} active events are named {event_name}")
+            return None
+        event_id = event_ids[0]
+
+        submission_id = await self.db.get_submission_id(event_id, track_id)
+        if not submission_id:
+            logging.warning(f"Submission not found for track ID: {track_id} in event: {event_id}")
+            return None
+
+        await self.register(message.id, event_id, submission_id)
+        return event_id, submission_id
+
+    def drop_event(self, event_id):
+        """Forgets the in-memory routes of an event that has ended."""
+        for message_id in self._event_messages.pop(event_id, ()):
+            self._routes.pop(message_id, None)
+
+    def __len__(self):
+        return len(self._routes)
@@ -0,0 +1,246 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+import aiohttp
+import discord
+
+import metrics
+
+# Discord rejects messages longer than this
+DISCORD_MESSAGE_LIMIT = 2000
+
+# Outbound priorities (lower is sent first)
+PRIORITY_RESULTS = 0       # Event results, countdowns and published charts
+PRIORITY_ANNOUNCEMENT = 1  # Milestones
+PRIORITY_REFRESH = 2       # Cosmetic updates such as standings embed edits
+
+OUTBOUND_SECONDS = metrics.REGISTRY.histogram(
+    "countdown_outbound_request_duration_seconds",
+    "Duration of each Discord call made by the outbound queue, by route and outcome",
+    ("route", "outcome")
+)
+OUTBOUND_DROPPED = metrics.REGISTRY.counter(
+    "countdown_outbound_dropped_total",
+    "Outbound messages given up on after a permanent error or the last retry",
+    ("route",)
+)
+
+# Queue settings used when config.yaml has no "outbound" section
+DEFAULT_OUTBOUND_SETTINGS = {
+    "channel_burst": 5,     # Requests a channel route (sends or edits) can take back to back
+    "channel_period": 5.0,  # Seconds for an empty bucket to refill completely
+    "max_attempts": 4,      # Attempts per message before it is dropped
+    "retry_backoff": 1.0,   # Seconds before the first retry; doubled on every attempt
+}
+
+async def chunk_lines(lines, limit=DISCORD_MESSAGE_LIMIT):
+    """Groups an async stream of lines into messages of at most limit characters.
+
+    Lines are kept whole; a single line longer than limit is truncated. Only the chunk
+    being built is held in memory.
+    """
+    chunk = []
+    size = 0
+    async for line in lines:
+        if len(line) > limit:
+            line = line[:limit - 1] + "…"
+        added = len(line) + (1 if chunk else 0)  # Joining newline
+        if chunk and size + added > limit:
+            yield "\n".join(chunk)
+            chunk = [line]
+            size = len(line)
+        else:
+            chunk.append(line)
+            size += added
+    if chunk:
+        yield "\n".join(chunk)
+
+def is_retryable(error):
+    """Returns True for failures worth retrying: server errors, rate limits and network errors."""
+    if isinstance(error, discord.HTTPException):
+        return error.status >= 500 or error.status == 429
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+class ChannelBucket:
+    """Token bucket of one channel route; busy while one of its requests is in flight."""
+
+    __slots__ = ("tokens", "updated", "busy")
+
+    def __init__(self, tokens, updated):
+        self.tokens = tokens
+        self.updated = updated
+        self.busy = False
+
+class OutboundItem:
+    __slots__ = ("priority", "seq", "channel_id", "route", "action", "key", "future", "superseded")
+
+    def __init__(self, priority, seq, channel_id, route, action, key, future):
+        self.priority = priority
+        self.seq = seq
+        self.channel_id = channel_id
+        self.route = route
+        self.action = action  # async fn() making one Discord call
+        self.key = key
+        self.future = future
+        self.superseded = False
+
+class OutboundQueue:
+    """Central queue for Discord sends and edits.
+
+    Callers enqueue and move on; a single dispatcher sends the highest-priority ready item
+    of every channel route that has a token in its rate-limit bucket. Like Discord, sends
+    and edits in a channel are limited separately, so announcements cannot starve embed
+    edits. Requests of a route go out one at a time in priority then enqueue order, and
+    failed ones are retried with exponential backoff. An item enqueued with a key replaces
+    a pending item with the same key, so superseded updates are never sent. Every enqueue
+    returns a future resolving to the action's result (the sent discord.Message), or None
+    if it was dropped.
+    """
+
+    def __init__(self, settings=None):
+        settings = dict(DEFAULT_OUTBOUND_SETTINGS, **(settings or {}))
+        self.channel_burst = int(settings["channel_burst"])
+        self.refill_rate = self.channel_burst / float(settings["channel_period"])
+        self.max_attempts = int(settings["max_attempts"])
+        self.retry_backoff = float(settings["retry_backoff"])
+        self._ready = []    # (priority, seq, item)
+        self._delayed = []  # (send_at, seq, item)
+        self._keyed = {}    # coalescing key -> pending item
+        self._buckets = {}  # (channel_id, route) -> ChannelBucket
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._task = None
+        self._in_flight = set()
+
+    def start(self):
+        """Starts the dispatcher on the running event loop."""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stops dispatching after the sends already in flight have finished."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        self._task = None
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        if self.pending():
+            logging.warning(f"Dropping {self.pending()} queued outbound messages on shutdown")
+
+    def pending(self):
+        """Returns the number of queued items that have not been sent yet."""
+        return len(self._ready) + len(self._delayed)
+
+    def enqueue(self, channel_id, action, priority=PRIORITY_ANNOUNCEMENT, key=None, delay=0, route="send"):
+        """Queues action() on a channel route ("send" or "edit"), to run no earlier than delay seconds from now."""
+        loop = asyncio.get_running_loop()
+        item = OutboundItem(priority, next(self._seq), channel_id, route, action, key, loop.create_future())
+
+        if key is not None:
+            previous = self._keyed.get(key)
+            if previous is not None:
+                previous.superseded = True
+                previous.future.set_result(None)
+            self._keyed[key] = item
+
+        if delay > 0:
+            heapq.heappush(self._delayed, (loop.time() + delay, item.seq, item))
+        else:
+            heapq.heappush(self._ready, (item.priority, item.seq, item))
+        if self._wakeup:
+            self._wakeup.set()
+        return item.future
+
+    def send(self, channel, content=None, embed=None, priority=PRIORITY_ANNOUNCEMENT, key=None, delay=0):
+        """Queues channel.send(content, embed)."""
+        return self.enqueue(channel.id, lambda: channel.send(content=content, embed=embed), priority, key, delay)
+
+    def cancel(self, key):
+        """Drops the pending item with the given key, if any."""
+        item = self._keyed.pop(key, None)
+        if item is not None:
+            item.superseded = True
+            item.future.set_result(None)
+
+    def _bucket(self, channel_id, route, now):
+        bucket = self._buckets.get((channel_id, route))
+        if bucket is None:
+            bucket = self._buckets[(channel_id, route)] = ChannelBucket(self.channel_burst, now)
+        else:
+            bucket.tokens = min(self.channel_burst, bucket.tokens + (now - bucket.updated) * self.refill_rate)
+            bucket.updated = now
+        return bucket
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            now = loop.time()
+
+            while self._delayed and self._delayed[0][0] <= now:
+                item = heapq.heappop(self._delayed)[2]
+                heapq.heappush(self._ready, (item.priority, item.seq, item))
+            timeout = self._delayed[0][0] - now if self._delayed else None
+
+            blocked = []
+            while self._ready:
+                entry = heapq.heappop(self._ready)
+                item = entry[2]
+                if item.superseded:
+                    continue
+
+                bucket = self._bucket(item.channel_id, item.route, now)
+                if bucket.busy or bucket.tokens < 1:
+                    blocked.append(entry)
+                    if not bucket.busy:
+                        refill = (1 - bucket.tokens) / self.refill_rate
+                        timeout = refill if timeout is None else min(timeout, refill)
+                    continue
+
+                bucket.tokens -= 1
+                bucket.busy = True
+                if item.key is not None and self._keyed.get(item.key) is item:
+                    del self._keyed[item.key]  # In flight: a newer item with this key is sent after it
+                task = loop.create_task(self._send(item, bucket))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+
+            for entry in blocked:
+                heapq.heappush(self._ready, entry)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _send(self, item, bucket):
+        result = None
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                start = time.perf_counter()
+                try:
+                    result = await item.action()
+                    OUTBOUND_SECONDS.observe(time.perf_counter() - start, item.route, "ok")
+                    break
+                except Exception as e:
+                    if not is_retryable(e) or attempt == self.max_attempts:
+                        OUTBOUND_SECONDS.observe(time.perf_counter() - start, item.route, "error")
+                        OUTBOUND_DROPPED.inc(item.route)
+                        logging.error(f"Failed to send to channel {item.channel_id}: {e}")
+                        break
+                    OUTBOUND_SECONDS.observe(time.perf_counter() - start, item.route, "retry")
+                    delay = self.retry_backoff * 2 ** (attempt - 1)
+                    logging.warning(f"Send to channel {item.channel_id} failed, retrying in {delay}s: {e}")
+                    await asyncio.sleep(delay)
+        finally:
+            # The route stays busy through retries so its requests keep their order
+            bucket.busy = False
+            if not item.future.done():
+                item.future.set_result(result)
+            if self._wakeup:
+                self._wakeup.set()
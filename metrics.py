@@ -0,0 +1,207 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket bounds in seconds, from a fast SQL lookup to a slow Discord call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Metrics settings used when config.yaml has no "metrics" section
+DEFAULT_METRICS_SETTINGS = {
+    "enabled": False,   # Nothing is recorded or served unless this is true
+    "host": "127.0.0.1",
+    "port": 9108,
+}
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    def __init__(self, registry, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()  # Observed from the database threads too
+
+    def observe(self, value, *label_values):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        """Observes the duration of the with block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {label_values: list(values) for label_values, values in self._series.items()}
+        for label_values, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, label_values, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, label_values, [('le', '+Inf')])} {values[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, label_values)} {_format_value(values[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, label_values)} {values[-1]}")
+        return lines
+
+class Counter:
+    def __init__(self, registry, name, help_text, labels=()):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+class Gauge:
+    """A value read from a callback when the metrics are scraped."""
+
+    def __init__(self, registry, name, help_text, read):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            lines.append(f"{self.name} {_format_value(self.read())}")
+        except Exception as e:
+            logging.error(f"Failed to read gauge {self.name}: {e}")
+        return lines
+
+class Registry:
+    """Holds every metric and serves them in the Prometheus text format.
+
+    Metrics are declared at import time by the modules that record them. Until
+    configure() enables the registry, recording returns immediately and no server runs.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.settings = dict(DEFAULT_METRICS_SETTINGS)
+        self._metrics = {}
+        self._server = None
+
+    def configure(self, settings=None):
+        self.settings = dict(DEFAULT_METRICS_SETTINGS, **(settings or {}))
+        self.enabled = bool(self.settings["enabled"])
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, help_text, labels, buckets))
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(Counter(self, name, help_text, labels))
+
+    def gauge(self, name, help_text, read):
+        """Registers (or replaces) a gauge whose value is read(), evaluated at scrape time."""
+        self._metrics.pop(name, None)
+        return self._register(Gauge(self, name, help_text, read))
+
+    def render(self):
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+    async def start_server(self):
+        """Serves GET /metrics on the configured host and port (only when enabled)."""
+        if not self.enabled or self._server is not None:
+            return
+        host, port = self.settings["host"], int(self.settings["port"])
+        self._server = await asyncio.start_server(self._handle, host, port)
+        logging.info(f"Serving metrics on http://{host}:{port}/metrics")
+
+    async def stop_server(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass  # Headers are not needed
+
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body = "200 OK", self.render().encode()
+            else:
+                status, body = "404 Not Found", b"Not found\n"
+            writer.write(
+                (
+                    f"HTTP/1.1 {status}\r\n"
+                    "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    "Connection: close\r\n\r\n"
+                ).encode() + body
+            )
+            await writer.drain()
+        except Exception as e:
+            logging.error(f"Failed to serve metrics: {e}")
+        finally:
+            writer.close()
+
+# The registry every module records into
+REGISTRY = Registry()
+
+def timed(histogram, *label_values):
+    """Decorates a coroutine function to observe its duration in histogram."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with histogram.time(*label_values):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,316 @@
+import logging
+from datetime import datetime
+
+import archive
+import database
+import scoring
+import snapshots
+import vote_stats
+
+# Migration steps
+# Every step is idempotent (IF NOT EXISTS / full rebuilds), so a step that was
+# interrupted before its version row was written can safely run again.
+def create_base_tables(conn, cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS events (
+            event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            duration INTEGER,
+            min_submissions INTEGER,
+            max_submissions INTEGER,
+            song_min_duration INTEGER,
+            song_max_duration INTEGER,
+            start_time TEXT,
+            end_time TEXT,
+            channel_id INTEGER,
+            message_id INTEGER,
+            highest_score INTEGER DEFAULT 0,
+            active INTEGER DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS submissions (
+            submission_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER,
+            user_id INTEGER,
+            song_name TEXT,
+            url TEXT,
+            duration INTEGER,
+            submission_time TEXT,
+            track_id TEXT,
+            submitter_name TEXT,
+            milestone_reached BOOLEAN DEFAULT 0,
+            FOREIGN KEY (event_id) REFERENCES events(event_id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS votes (
+            vote_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            submission_id INTEGER,
+            user_id INTEGER,
+            vote_value INTEGER,
+            vote_time TEXT,
+            voter_name TEXT,
+            FOREIGN KEY (submission_id) REFERENCES submissions(submission_id)
+        )
+    """)
+
+def create_submission_scores(conn, cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS submission_scores (
+            submission_id INTEGER PRIMARY KEY,
+            event_id INTEGER,
+            score INTEGER DEFAULT 0,
+            vote_count INTEGER DEFAULT 0,
+            last_vote_time TEXT,
+            FOREIGN KEY (submission_id) REFERENCES submissions(submission_id),
+            FOREIGN KEY (event_id) REFERENCES events(event_id)
+        )
+    """)
+    # The rebuild as of this version; scoring.rebuild_scores reads columns added by later migrations
+    cursor.execute("DELETE FROM submission_scores")
+    cursor.execute(
+        (
+            "INSERT INTO submission_scores (submission_id, event_id, score, vote_count, last_vote_time) "
+            "SELECT s.submission_id, s.event_id, SUM(v.vote_value), COUNT(*), MAX(v.vote_time) "
+            "FROM votes v "
+            "JOIN submissions s ON s.submission_id = v.submission_id "
+            "GROUP BY s.submission_id"
+        )
+    )
+
+def create_hot_indexes(conn, cursor):
+    # votes WHERE submission_id = ? (admin vote details, score rebuilds)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_votes_submission ON votes (submission_id, vote_value)")
+    # votes WHERE user_id = ? AND submission_id IN (...) (vote quotas)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_votes_user_submission ON votes (user_id, submission_id)")
+    # submissions WHERE event_id = ? [AND track_id = ?]
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_submissions_event_track ON submissions (event_id, track_id)")
+    # events WHERE name = ? / WHERE active = 1
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_name ON events (name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_active ON events (active)")
+    # submission_scores WHERE event_id = ?
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_submission_scores_event ON submission_scores (event_id, score)")
+
+def create_submission_messages(conn, cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS submission_messages (
+            message_id INTEGER PRIMARY KEY,
+            event_id INTEGER,
+            submission_id INTEGER,
+            FOREIGN KEY (event_id) REFERENCES events(event_id),
+            FOREIGN KEY (submission_id) REFERENCES submissions(submission_id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_submission_messages_event ON submission_messages (event_id)")
+
+def add_vote_ranks(conn, cursor):
+    cursor.execute("PRAGMA table_info(votes)")
+    columns = [row[1] for row in cursor.fetchall()]
+    if "event_id" not in columns:
+        cursor.execute("ALTER TABLE votes ADD COLUMN event_id INTEGER REFERENCES events(event_id)")
+    if "vote_rank" not in columns:
+        cursor.execute("ALTER TABLE votes ADD COLUMN vote_rank INTEGER")
+
+    cursor.execute("""
+        UPDATE votes
+        SET event_id = (SELECT s.event_id FROM submissions s WHERE s.submission_id = votes.submission_id)
+        WHERE event_id IS NULL
+    """)
+    # Rank = number of earlier votes by the same user in the same event
+    cursor.execute("""
+        UPDATE votes
+        SET vote_rank = (
+            SELECT COUNT(*)
+            FROM votes earlier
+            WHERE earlier.event_id = votes.event_id
+              AND earlier.user_id = votes.user_id
+              AND earlier.vote_id < votes.vote_id
+        )
+        WHERE vote_rank IS NULL
+    """)
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_votes_event_user_rank ON votes (event_id, user_id, vote_rank)")
+
+def create_standings_snapshots(conn, cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS standings_snapshots (
+            snapshot_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER,
+            snapshot_time TEXT,
+            FOREIGN KEY (event_id) REFERENCES events(event_id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS standings_snapshot_rows (
+            snapshot_id INTEGER,
+            submission_id INTEGER,
+            rank INTEGER,
+            score INTEGER,
+            PRIMARY KEY (snapshot_id, submission_id),
+            FOREIGN KEY (snapshot_id) REFERENCES standings_snapshots(snapshot_id),
+            FOREIGN KEY (submission_id) REFERENCES submissions(submission_id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_standings_snapshots_event ON standings_snapshots (event_id)")
+
+def add_milestone_masks(conn, cursor):
+    cursor.execute("PRAGMA table_info(submissions)")
+    columns = [row[1] for row in cursor.fetchall()]
+    if "milestone_mask" not in columns:
+        cursor.execute("ALTER TABLE submissions ADD COLUMN milestone_mask INTEGER DEFAULT 0")
+
+def add_event_guilds(conn, cursor):
+    cursor.execute("PRAGMA table_info(events)")
+    columns = [row[1] for row in cursor.fetchall()]
+    if "guild_id" not in columns:
+        # Left NULL for existing events: they predate guild scoping and stay visible everywhere
+        cursor.execute("ALTER TABLE events ADD COLUMN guild_id INTEGER")
+    # events WHERE guild_id = ? AND active = 1
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_guild_active ON events (guild_id, active)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS guild_settings (
+            guild_id INTEGER,
+            setting TEXT,
+            value INTEGER,
+            PRIMARY KEY (guild_id, setting)
+        ) WITHOUT ROWID
+    """)
+
+# (table, text column, epoch column) for every timestamp moved to UTC epoch seconds
+EPOCH_COLUMNS = [
+    ("events", "start_time", "start_at"),
+    ("events", "end_time", "end_at"),
+    ("submissions", "submission_time", "submitted_at"),
+    ("votes", "vote_time", "voted_at"),
+    ("submission_scores", "last_vote_time", "last_voted_at"),
+    ("standings_snapshots", "snapshot_time", "published_at"),
+]
+
+def add_epoch_timestamps(conn, cursor):
+    # SQLite cannot change a column's type, and the SQLite the image ships cannot drop one,
+    # so each timestamp gets a new INTEGER column. The old text columns are left in place
+    # but are no longer written or read.
+    for table, text_column, epoch_column in EPOCH_COLUMNS:
+        cursor.execute(f"PRAGMA table_info({table})")
+        columns = [row[1] for row in cursor.fetchall()]
+        if epoch_column not in columns:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {epoch_column} INTEGER")
+        # The text was written with datetime.now(), i.e. in this host's local time; the 'utc'
+        # modifier converts from local time (including DST) before taking the epoch
+        cursor.execute(
+            f"UPDATE {table} SET {epoch_column} = CAST(strftime('%s', {text_column}, 'utc') AS INTEGER) "
+            f"WHERE {epoch_column} IS NULL AND {text_column} IS NOT NULL"
+        )
+    # votes WHERE event_id = ? AND voted_at BETWEEN ... (time-windowed vote stats)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_votes_event_time ON votes (event_id, voted_at)")
+
+def add_event_archives(conn, cursor):
+    cursor.execute("PRAGMA table_info(events)")
+    columns = [row[1] for row in cursor.fetchall()]
+    if "archived_at" not in columns:
+        # Set once an ended event's rows have moved to its archive file (see archive.py)
+        cursor.execute("ALTER TABLE events ADD COLUMN archived_at INTEGER")
+
+def create_vote_journals(conn, cursor):
+    # Position of each vote journal (journal.py), committed with the votes it covers
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS vote_journals (
+            name TEXT PRIMARY KEY,
+            last_seq INTEGER
+        ) WITHOUT ROWID
+    """)
+
+# Ordered list of (version, description, step). Append new migrations at the end;
+# never renumber or edit one that has already shipped.
+MIGRATIONS = [
+    (1, "Create events, submissions and votes tables", create_base_tables),
+    (2, "Add materialized submission_scores table", create_submission_scores),
+    (3, "Add indexes for hot lookups", create_hot_indexes),
+    (4, "Add submission_messages routing table", create_submission_messages),
+    (5, "Add event-scoped vote ranks with a unique quota index", add_vote_ranks),
+    (6, "Add structured standings snapshots", create_standings_snapshots),
+    (7, "Add per-submission milestone bitmasks", add_milestone_masks),
+    (8, "Scope events to guilds and add per-guild settings", add_event_guilds),
+    (9, "Store timestamps as indexed UTC epoch seconds", add_epoch_timestamps),
+    (10, "Track which ended events have been archived", add_event_archives),
+    (11, "Add vote journal positions", create_vote_journals),
+]
+
+# Queries on the vote and leaderboard paths, as the bot runs them. None of them may fall
+# back to a full table scan.
+HOT_QUERIES = [
+    (database.COUNT_USER_VOTES_QUERY, (1, 1)),
+    (database.SUBMISSION_VOTES_QUERY, (1,)),
+    (database.EVENT_VOTES_QUERY, (1,)),
+    (database.SUBMISSION_ID_QUERY, (1, "Track-1")),
+    (database.EVENT_SUBMISSIONS_QUERY, (1,)),
+    (database.ACTIVE_EVENT_IDS_BY_NAME_QUERY, ("event",)),
+    (database.GUILD_ACTIVE_EVENT_IDS_BY_NAME_QUERY, ("event", 1)),
+    (database.ACTIVE_EVENTS_QUERY, ()),
+    (database.GUILD_ACTIVE_EVENTS_QUERY, (1,)),
+    (database.ACTIVE_EVENT_IDS_QUERY, ()),
+    (database.ACTIVE_SUBMISSION_MESSAGES_QUERY, ()),
+    (database.ACTIVE_MILESTONE_STATE_QUERY, ()),
+    (database.EVENT_MILESTONE_STATE_QUERY, (1,)),
+    (
+        database.INSERT_VOTE_SQL,
+        {"event_id": 1, "submission_id": 1, "user_id": 1, "voted_at": 0, "voter_name": "voter", "rank": None}
+    ),
+    (archive.ARCHIVABLE_EVENTS_QUERY, (0,)),
+    (scoring.SCORE_QUERY, (1,)),
+    (scoring.STANDINGS_QUERY, (1,)),
+    (scoring.STANDINGS_WITH_VOTES_QUERY, (1,)),
+    (snapshots.LATEST_SNAPSHOT_QUERY, (1,)),
+    (snapshots.SNAPSHOT_RANKS_QUERY, (1,)),
+    (vote_stats.COUNT_VOTES_QUERY, (1, 0)),
+    (vote_stats.COUNT_VOTES_UNTIL_QUERY, (1, 0, 60)),
+    (vote_stats.VOTES_PER_MINUTE_QUERY, (1, 0)),
+    (vote_stats.VOTES_PER_MINUTE_UNTIL_QUERY, (1, 0, 60)),
+    (vote_stats.LAST_CHART_TIME_QUERY, (1,)),
+]
+
+def get_schema_version(cursor):
+    """Returns the highest applied migration version (0 for a fresh database)."""
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cursor.fetchone()[0]
+
+def migrate(conn):
+    """Applies every pending migration in order and records it in schema_version."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TEXT
+        )
+    """)
+    current_version = get_schema_version(cursor)
+
+    for version, description, step in MIGRATIONS:
+        if version <= current_version:
+            continue
+        logging.info(f"Applying migration {version}: {description}")
+        step(conn, cursor)
+        cursor.execute(
+            "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+            (version, description, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        )
+        conn.commit()
+
+    return get_schema_version(cursor)
+
+def find_full_scans(cursor):
+    """Runs EXPLAIN QUERY PLAN over HOT_QUERIES.
+
+    Returns a list of (query, plan_detail) for every step that scans a whole table
+    or a whole index instead of searching it. Scans of a subquery's own result
+    ("SCAN (subquery-1)") are not table scans and are ignored.
+    """
+    full_scans = []
+    for query, params in HOT_QUERIES:
+        cursor.execute("EXPLAIN QUERY PLAN " + query, params)
+        for row in cursor.fetchall():
+            detail = row[-1]
+            if detail.startswith("SCAN") and not detail.startswith("SCAN ("):
+                full_scans.append((query, detail))
+    return full_scans
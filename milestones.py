@@ -0,0 +1,104 @@
+from collections import namedtuple
+
+# A milestone owns one bit of a submission's milestone mask. "points" milestones are
+# absolute scores; "percentage" milestones are fractions of the event's highest score.
+Milestone = namedtuple("Milestone", ["bit", "kind", "threshold"])
+
+class EventMilestoneState:
+    __slots__ = ("high_score", "leader", "scores", "masks")
+
+    def __init__(self):
+        self.high_score = 0
+        self.leader = None   # submission holding high_score
+        self.scores = {}     # submission_id -> score
+        self.masks = {}      # submission_id -> bitmask of crossed milestones
+
+class MilestoneEngine:
+    """Tracks milestone crossings entirely in memory.
+
+    Keeps each active event's high score and every submission's score and crossed-milestone
+    bitmask, so evaluating a vote is O(milestones) with no database reads. Callers persist the
+    mask only when apply_vote reports a newly crossed milestone.
+    """
+
+    def __init__(self, milestone_points, milestone_percentages):
+        points = [Milestone(bit, "points", threshold) for bit, threshold in enumerate(sorted(milestone_points))]
+        percentages = [
+            Milestone(len(points) + bit, "percentage", threshold)
+            for bit, threshold in enumerate(sorted(milestone_percentages))
+        ]
+        self.milestones = points + percentages
+        self._events = {}  # event_id -> EventMilestoneState
+
+    def load_submission(self, event_id, submission_id, score, mask):
+        """Seeds the state of a submission (from the database at startup)."""
+        state = self._events.setdefault(event_id, EventMilestoneState())
+        state.scores[submission_id] = score
+        state.masks[submission_id] = mask
+        if score > state.high_score:
+            state.high_score = score
+            state.leader = submission_id
+
+    def crossed_mask(self, score):
+        """Returns the mask of every points milestone a score has already reached."""
+        mask = 0
+        for milestone in self.milestones:
+            if milestone.kind == "points" and score >= milestone.threshold:
+                mask |= 1 << milestone.bit
+        return mask
+
+    def apply_vote(self, event_id, submission_id, vote_value):
+        """Adds a vote and returns (new_score, [newly crossed Milestone, ...]).
+
+        Percentage milestones are measured against the high score before this vote, and
+        never against the submission's own lead.
+        """
+        state = self._events.setdefault(event_id, EventMilestoneState())
+        score = state.scores.get(submission_id, 0) + vote_value
+        state.scores[submission_id] = score
+        mask = state.masks.get(submission_id, 0)
+
+        crossed = []
+        for milestone in self.milestones:
+            if mask & (1 << milestone.bit):
+                continue
+            if milestone.kind == "points":
+                reached = score >= milestone.threshold
+            else:
+                reached = (
+                    state.high_score > 0
+                    and state.leader != submission_id
+                    and score >= state.high_score * milestone.threshold
+                )
+            if reached:
+                mask |= 1 << milestone.bit
+                crossed.append(milestone)
+
+        state.masks[submission_id] = mask
+        if score > state.high_score:
+            state.high_score = score
+            state.leader = submission_id
+        return score, crossed
+
+    def get_mask(self, event_id, submission_id):
+        state = self._events.get(event_id)
+        return state.masks.get(submission_id, 0) if state else 0
+
+    def get_high_score(self, event_id):
+        state = self._events.get(event_id)
+        return state.high_score if state else 0
+
+    def drop_event(self, event_id):
+        """Forgets an event that has ended."""
+        self._events.pop(event_id, None)
+
+    def replay(self, votes):
+        """Feeds a recorded vote stream of (event_id, submission_id, vote_value) through the engine.
+
+        Returns [(event_id, submission_id, score, Milestone), ...] in crossing order.
+        """
+        crossings = []
+        for event_id, submission_id, vote_value in votes:
+            score, crossed = self.apply_vote(event_id, submission_id, vote_value)
+            crossings.extend((event_id, submission_id, score, milestone) for milestone in crossed)
+        return crossings
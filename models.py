@@ -0,0 +1,198 @@
+import logging
+import time
+
+from scoring import highest_score
+
+class Model:
+    """A table row with named, slot-backed fields (one slot per selected column, in order)."""
+
+    __slots__ = ()
+
+    @classmethod
+    def columns(cls):
+        """The column list to SELECT for from_row()."""
+        return ", ".join(cls.__slots__)
+
+    @classmethod
+    def from_row(cls, row):
+        model = cls.__new__(cls)
+        for name, value in zip(cls.__slots__, row):
+            setattr(model, name, value)
+        return model
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+class Event(Model):
+    __slots__ = (
+        "event_id", "name", "duration", "min_submissions", "max_submissions", "song_min_duration",
+        "song_max_duration", "start_at", "end_at", "channel_id", "message_id", "highest_score",
+        "active", "guild_id", "archived_at",
+    )
+
+class Submission(Model):
+    __slots__ = (
+        "submission_id", "event_id", "user_id", "song_name", "url", "duration", "submitted_at",
+        "track_id", "submitter_name", "milestone_reached", "milestone_mask",
+    )
+
+class Vote(Model):
+    __slots__ = ("vote_id", "submission_id", "user_id", "voter_name", "vote_value", "vote_rank", "voted_at")
+
+class EventState:
+    """Everything cached for one active event."""
+
+    __slots__ = ("event", "submissions", "track_ids", "votes_by_submission", "votes_by_user")
+
+    def __init__(self, event):
+        self.event = event
+        self.submissions = {}          # submission_id -> Submission
+        self.track_ids = {}            # track_id -> submission_id
+        self.votes_by_submission = {}  # submission_id -> [Vote], in vote order
+        self.votes_by_user = {}        # user_id -> [Vote], in vote order
+
+    def add_submission(self, submission):
+        self.submissions[submission.submission_id] = submission
+        self.track_ids[submission.track_id] = submission.submission_id
+
+    def add_vote(self, vote):
+        self.votes_by_submission.setdefault(vote.submission_id, []).append(vote)
+        self.votes_by_user.setdefault(vote.user_id, []).append(vote)
+
+class EventCache:
+    """Write-through cache of the events this process runs, with their submissions and votes.
+
+    An event is loaded once when it starts (or at startup) and evicted when it ends.
+    Reads of a cached event never touch the database; writes go to the database first and
+    then to the cached models. Events that are not cached (ended ones, or ones another
+    process owns) are read from the database. Submissions are created outside the bot's
+    write path, so one added after its event was loaded is cached when its message is
+    posted (see Commands.add_submission), or otherwise fetched on first use.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._events = {}       # event_id -> EventState
+        self._submissions = {}  # submission_id -> EventState
+
+    async def load(self, event_ids=None):
+        """Loads every active event (or the given ones)."""
+        if event_ids is None:
+            event_ids = await self.db.get_active_event_ids()
+        for event_id in event_ids:
+            await self.load_event(event_id)
+        logging.info(f"Cached {len(event_ids)} events with {len(self._submissions)} submissions")
+
+    async def load_event(self, event_id):
+        """Caches an event with its submissions and votes, replacing what was cached for it."""
+        event = await self.db.get_event(event_id)
+        if event is None:
+            return None
+        self.drop_event(event_id)
+        state = EventState(event)
+        for submission in await self.db.get_submissions(event_id):
+            state.add_submission(submission)
+            self._submissions[submission.submission_id] = state
+        for vote in await self.db.get_event_votes(event_id):
+            state.add_vote(vote)
+        self._events[event_id] = state
+        return state
+
+    def get(self, event_id):
+        """Returns the cached EventState, or None."""
+        return self._events.get(event_id)
+
+    def active(self, guild_id=None):
+        """Returns the cached events of a guild (plus those without a guild), or all of them."""
+        return [
+            state.event for state in self._events.values()
+            if guild_id is None or state.event.guild_id in (guild_id, None)
+        ]
+
+    async def get_event(self, event_id):
+        state = self._events.get(event_id)
+        return state.event if state else await self.db.get_event(event_id)
+
+    async def get_submissions(self, event_id):
+        state = self._events.get(event_id)
+        return list(state.submissions.values()) if state else await self.db.get_submissions(event_id)
+
+    async def get_submission(self, submission_id):
+        state = self._submissions.get(submission_id)
+        if state is not None:
+            return state.submissions[submission_id]
+        submission = await self.db.get_submission(submission_id)
+        if submission is not None:
+            self._add_submission(submission)
+        return submission
+
+    async def get_submission_id(self, event_id, track_id):
+        state = self._events.get(event_id)
+        if state is not None and track_id in state.track_ids:
+            return state.track_ids[track_id]
+        submission_id = await self.db.get_submission_id(event_id, track_id)
+        if submission_id is not None and state is not None:
+            await self.get_submission(submission_id)
+        return submission_id
+
+    def _add_submission(self, submission):
+        state = self._events.get(submission.event_id)
+        if state is not None:
+            state.add_submission(submission)
+            self._submissions[submission.submission_id] = state
+
+    async def count_user_votes(self, event_id, user_id):
+        state = self._events.get(event_id)
+        if state is None:
+            return await self.db.count_user_votes(event_id, user_id)
+        return len(state.votes_by_user.get(user_id, ()))
+
+    def get_votes(self, event_id, submission_id):
+        """Returns the cached votes of a submission (None when the event is not cached)."""
+        state = self._events.get(event_id)
+        return state.votes_by_submission.get(submission_id, []) if state else None
+
+    def add_vote(self, event_id, submission_id, user_id, voter_name, vote_value):
+        """Caches a vote the vote queue has committed."""
+        state = self._events.get(event_id)
+        if state is None:
+            return
+        rank = len(state.votes_by_user.get(user_id, ()))
+        state.add_vote(Vote.from_row((None, submission_id, user_id, voter_name, vote_value, rank, int(time.time()))))
+
+    # Writes: database first, then the cached model
+    async def set_event_message(self, event_id, message_id):
+        await self.db.set_event_message(event_id, message_id)
+        state = self._events.get(event_id)
+        if state is not None:
+            state.event.message_id = message_id
+
+    async def update_highest_score(self, event_id, standings):
+        """Stores the event's highest score; skipped when the cached event already has it."""
+        state = self._events.get(event_id)
+        if state is not None and state.event.highest_score == highest_score(standings):
+            return
+        await self.db.update_highest_score(event_id, standings)
+        if state is not None:
+            state.event.highest_score = highest_score(standings)
+
+    async def set_milestone_mask(self, submission_id, mask):
+        await self.db.set_milestone_mask(submission_id, mask)
+        state = self._submissions.get(submission_id)
+        if state is not None:
+            state.submissions[submission_id].milestone_mask = mask
+
+    async def deactivate_event(self, event_id):
+        await self.db.deactivate_event(event_id)
+        self.drop_event(event_id)
+
+    def drop_event(self, event_id):
+        """Evicts an event that has ended."""
+        state = self._events.pop(event_id, None)
+        if state is not None:
+            for submission_id in state.submissions:
+                self._submissions.pop(submission_id, None)
+
+    def __len__(self):
+        return len(self._events)
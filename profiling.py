@@ -0,0 +1,123 @@
+import cProfile
+import linecache
+import os
+import pstats
+import time
+import tracemalloc
+from datetime import datetime
+
+# Profiling settings used when config.yaml has no "profiling" section
+DEFAULT_PROFILING_SETTINGS = {
+    "output_dir": None,   # Defaults to a "profiles" directory next to the database
+    "top": 15,            # Entries listed in each summary
+    "max_duration": 600,  # Longest profiling window an admin can request (seconds)
+    "frames": 5,          # Traceback depth kept by tracemalloc
+}
+
+def _timestamp():
+    return datetime.now().strftime("%Y%m%d-%H%M%S")
+
+def _location(filename, line):
+    return f"{os.path.basename(filename)}:{line}"
+
+class Profiler:
+    """cProfile over an admin-chosen window.
+
+    cProfile only sees the thread that enabled it, so call start() and stop() from the
+    event loop: that covers every command, reaction handler and embed render, but not
+    the SQL running on the database threads (see the SQL metrics for those).
+    """
+
+    def __init__(self, output_dir, top=15):
+        self.output_dir = output_dir
+        self.top = top
+        self._profile = None
+        self._started = None
+
+    @property
+    def running(self):
+        return self._profile is not None
+
+    def start(self):
+        """Starts profiling. Raises ValueError when another profiler is already active."""
+        profile = cProfile.Profile()
+        profile.enable()
+        self._profile = profile
+        self._started = time.perf_counter()
+
+    def stop(self):
+        """Stops profiling and returns (profile, seconds profiled)."""
+        profile, self._profile = self._profile, None
+        profile.disable()
+        return profile, time.perf_counter() - self._started
+
+    def save(self, profile, seconds):
+        """Writes the raw stats and a text report. Returns (stats path, summary lines)."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"profile-{_timestamp()}")
+        stats = pstats.Stats(profile)
+        stats.dump_stats(base + ".pstats")  # Open with pstats or snakeviz
+
+        # stats.stats: (file, line, function) -> (primitive calls, calls, own time, cumulative time, callers)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+        lines = [f"Profiled {seconds:.1f}s, {stats.total_calls} calls. Top functions by cumulative time:"]
+        for (filename, line, function), (_, calls, own, cumulative, _) in rows[:self.top]:
+            lines.append(f"{cumulative:8.3f}s {own:8.3f}s {calls:>8}  {function} ({_location(filename, line)})")
+
+        with open(base + ".txt", "w") as f:
+            f.write("\n".join(lines) + "\n\n")
+            pstats.Stats(profile, stream=f).sort_stats("cumulative").print_stats(100)
+        return base + ".pstats", lines
+
+class AllocationTracer:
+    """tracemalloc snapshots, each compared with the one before it."""
+
+    def __init__(self, output_dir, top=15, frames=5):
+        self.output_dir = output_dir
+        self.top = top
+        self.frames = frames
+        self._previous = None
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def snapshot(self):
+        """Takes a snapshot (starting tracing on the first call). Returns (snapshot path, summary lines)."""
+        started = False
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            started = True
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, linecache.__file__),
+        ))
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"memory-{_timestamp()}.snapshot")
+        snapshot.dump(path)
+
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Traced memory: {current / 1024:.0f} KiB (peak {peak / 1024:.0f} KiB)"]
+        if started:
+            lines.append("Tracing started now; only allocations made from here on are seen.")
+        lines.append("Top allocation sites:")
+        for stat in snapshot.statistics("lineno")[:self.top]:
+            frame = stat.traceback[0]
+            lines.append(f"{stat.size / 1024:9.1f} KiB {stat.count:>8}  {_location(frame.filename, frame.lineno)}")
+
+        if self._previous is not None:
+            lines.append("Change since the previous snapshot:")
+            for stat in snapshot.compare_to(self._previous, "lineno")[:self.top]:
+                frame = stat.traceback[0]
+                lines.append(f"{stat.size_diff / 1024:+9.1f} KiB {stat.count_diff:>+8}  {_location(frame.filename, frame.lineno)}")
+        self._previous = snapshot
+
+        with open(path[:-len(".snapshot")] + ".txt", "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return path, lines
+
+    def stop(self):
+        """Stops tracing and forgets the previous snapshot."""
+        tracemalloc.stop()
+        self._previous = None
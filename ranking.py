@@ -0,0 +1,265 @@
+import logging
+from bisect import bisect_left, insort
+from itertools import islice
+
+from scoring import Standing
+
+class SortedKeys:
+    """A sorted multiset of keys with O(log n) insert, remove and rank.
+
+    Keys live in buckets of at most 2 * BUCKET_SIZE sorted keys (the layout of
+    sortedcontainers.SortedList). Insert and remove touch one bucket, found by binary
+    search over the bucket maxima, and a Fenwick tree over the bucket lengths turns a
+    key's bucket into its rank. The tree is rebuilt only when a bucket splits or empties.
+    """
+
+    BUCKET_SIZE = 64
+
+    __slots__ = ("_buckets", "_maxes", "_tree", "_len")
+
+    def __init__(self):
+        self._buckets = []  # sorted lists; every key of a bucket sorts before the next bucket's
+        self._maxes = []    # last key of each bucket
+        self._tree = []     # Fenwick tree of the bucket lengths (1-based)
+        self._len = 0
+
+    def _rebuild_tree(self):
+        tree = [0] * (len(self._buckets) + 1)
+        for position, bucket in enumerate(self._buckets, 1):
+            tree[position] += len(bucket)
+            parent = position + (position & -position)
+            if parent < len(tree):
+                tree[parent] += tree[position]
+        self._tree = tree
+
+    def _update_tree(self, bucket_index, delta):
+        position = bucket_index + 1
+        while position < len(self._tree):
+            self._tree[position] += delta
+            position += position & -position
+
+    def _keys_before(self, bucket_index):
+        """Returns the number of keys in the buckets before bucket_index."""
+        total = 0
+        position = bucket_index
+        while position > 0:
+            total += self._tree[position]
+            position -= position & -position
+        return total
+
+    def add(self, key):
+        self._len += 1
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            self._rebuild_tree()
+            return
+        i = min(bisect_left(self._maxes, key), len(self._buckets) - 1)
+        bucket = self._buckets[i]
+        insort(bucket, key)
+        self._maxes[i] = bucket[-1]
+        if len(bucket) > 2 * self.BUCKET_SIZE:
+            self._buckets[i:i + 1] = [bucket[:self.BUCKET_SIZE], bucket[self.BUCKET_SIZE:]]
+            self._maxes[i:i + 1] = [bucket[self.BUCKET_SIZE - 1], bucket[-1]]
+            self._rebuild_tree()
+        else:
+            self._update_tree(i, 1)
+
+    def remove(self, key):
+        """Removes a key that is present."""
+        i = bisect_left(self._maxes, key)
+        bucket = self._buckets[i]
+        del bucket[bisect_left(bucket, key)]
+        self._len -= 1
+        if bucket:
+            self._maxes[i] = bucket[-1]
+            self._update_tree(i, -1)
+        else:
+            del self._buckets[i]
+            del self._maxes[i]
+            self._rebuild_tree()
+
+    def index(self, key):
+        """Returns the 0-based position of a key that is present."""
+        i = bisect_left(self._maxes, key)
+        return self._keys_before(i) + bisect_left(self._buckets[i], key)
+
+    def first(self):
+        return self._buckets[0][0]
+
+    def __iter__(self):
+        for bucket in self._buckets:
+            yield from bucket
+
+    def __len__(self):
+        return self._len
+
+class EventRanking:
+    """Order-statistics view of one event's scores.
+
+    Submissions are kept as sort keys (-score, -vote_count, submission_id), the same order
+    as scoring.get_standings, in a SortedKeys. A vote moves one key in O(log n), so top-K,
+    the rank of a submission and the reverse order never need a full sort.
+    """
+
+    __slots__ = ("_keys", "_key_of", "_details")
+
+    def __init__(self):
+        self._keys = SortedKeys()  # (-score, -vote_count, submission_id)
+        self._key_of = {}   # submission_id -> its current key
+        self._details = {}  # submission_id -> (track_id, song_name, url, submitter_name)
+
+    def add(self, submission_id, details, score=0, vote_count=0):
+        """Adds a submission (or replaces it) with the given totals."""
+        self._remove_key(submission_id)
+        key = (-score, -vote_count, submission_id)
+        self._keys.add(key)
+        self._key_of[submission_id] = key
+        self._details[submission_id] = details
+
+    def add_submission(self, submission_id, details=None):
+        """Adds a new submission at zero points; a submission that is already ranked is kept.
+
+        Without details, they are filled in by set_details like those of add_vote.
+        """
+        if submission_id not in self._key_of:
+            self.add(submission_id, details)
+
+    def add_vote(self, submission_id, vote_value):
+        """Applies a committed vote.
+
+        A submission seen for the first time starts from zero (every vote since the ranking
+        was loaded passes through here); its details are filled in by set_details.
+        """
+        key = self._key_of.get(submission_id)
+        if key is None:
+            key = (0, 0, submission_id)
+            self._details[submission_id] = None
+        else:
+            self._remove_key(submission_id)
+        key = (key[0] - vote_value, key[1] - 1, submission_id)
+        self._keys.add(key)
+        self._key_of[submission_id] = key
+
+    def missing_details(self):
+        """Returns the ids of submissions whose details have not been loaded yet."""
+        return [submission_id for submission_id, details in self._details.items() if details is None]
+
+    def set_details(self, submission_id, details):
+        self._details[submission_id] = details
+
+    def remove(self, submission_id):
+        """Drops a submission (one that was deleted)."""
+        self._remove_key(submission_id)
+        self._details.pop(submission_id, None)
+
+    def _remove_key(self, submission_id):
+        key = self._key_of.pop(submission_id, None)
+        if key is not None:
+            self._keys.remove(key)
+
+    def rank(self, submission_id):
+        """Returns the 1-based rank of a submission, or None when it is unknown."""
+        key = self._key_of.get(submission_id)
+        return self._keys.index(key) + 1 if key is not None else None
+
+    def score(self, submission_id):
+        key = self._key_of.get(submission_id)
+        return -key[0] if key is not None else 0
+
+    def highest_score(self):
+        return -self._keys.first()[0] if self._keys else 0
+
+    def _standing(self, rank, key):
+        submission_id = key[2]
+        track_id, song_name, url, submitter_name = self._details[submission_id]
+        return Standing(rank, submission_id, track_id, song_name, url, submitter_name, -key[0], -key[1])
+
+    def top(self, k=None):
+        """Returns the first k standings (all of them when k is None), best first."""
+        keys = self._keys if k is None else islice(self._keys, k)
+        return [self._standing(rank, key) for rank, key in enumerate(keys, 1)]
+
+    def bottom_up(self, k=None):
+        """Returns the top k standings (all of them when k is None) in reverse order, rank 1 last."""
+        count = len(self._keys) if k is None else min(k, len(self._keys))
+        keys = list(islice(self._keys, count))
+        return [self._standing(rank, keys[rank - 1]) for rank in range(count, 0, -1)]
+
+    def ranks(self):
+        """Returns {submission_id: rank} for every submission."""
+        return {key[2]: rank for rank, key in enumerate(self._keys, 1)}
+
+    def __len__(self):
+        return len(self._keys)
+
+class RankingIndex:
+    """Live EventRanking of every active event.
+
+    Rankings are seeded from the database at startup (or when an event starts) and kept
+    current by feeding them each new submission and each committed vote. Events that are
+    not held in memory (ended ones) are read from the database on demand.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._events = {}  # event_id -> EventRanking
+
+    async def load(self, event_id=None):
+        """Loads the rankings of every active event, or reloads a single event."""
+        event_ids = [event_id] if event_id is not None else await self.db.get_active_event_ids()
+        for loaded_event_id in event_ids:
+            self._events[loaded_event_id] = self._build(await self.db.get_standings(loaded_event_id))
+        logging.info(f"Loaded rankings for {len(event_ids)} events")
+
+    @staticmethod
+    def _build(standings):
+        ranking = EventRanking()
+        for standing in standings:
+            ranking.add(
+                standing.submission_id,
+                (standing.track_id, standing.song_name, standing.url, standing.submitter_name),
+                standing.score,
+                standing.vote_count
+            )
+        return ranking
+
+    async def start_event(self, event_id):
+        """Starts tracking a newly created event, with every submission it already has."""
+        self._events[event_id] = self._build(await self.db.get_standings(event_id))
+
+    def add_submission(self, event_id, submission_id):
+        """Ranks a submission added to a live event at zero points until it gets votes."""
+        ranking = self._events.get(event_id)
+        if ranking is not None:
+            ranking.add_submission(submission_id)
+
+    def apply_vote(self, event_id, submission_id, vote_value):
+        ranking = self._events.get(event_id)
+        if ranking is not None:
+            ranking.add_vote(submission_id, vote_value)
+
+    async def get_ranking(self, event_id):
+        """Returns the event's EventRanking, reading it from the database if it is not live."""
+        ranking = self._events.get(event_id)
+        if ranking is None:
+            return self._build(await self.db.get_standings(event_id))
+        for submission_id in ranking.missing_details():
+            details = await self.db.get_submission_details(submission_id)
+            if details is None:
+                # Deleted since it was ranked
+                ranking.remove(submission_id)
+            else:
+                ranking.set_details(submission_id, tuple(details))
+        return ranking
+
+    async def get_standings(self, event_id, limit=None):
+        """Returns the event's standings, best first (the first limit of them when given)."""
+        return (await self.get_ranking(event_id)).top(limit)
+
+    def drop_event(self, event_id):
+        """Forgets an event that has ended."""
+        self._events.pop(event_id, None)
+
+    def __len__(self):
+        return len(self._events)
@@ -0,0 +1,388 @@
+"""Storage server shared by the bot's shard processes, and the client backend they use.
+
+The server owns the SQLite database and runs the same fn(cursor, ...) and
+fn(conn, cursor, ...) query functions the single-process bot runs locally, so every
+process sees one database with one writer. It also relays invalidation messages
+between the processes. Run it next to the workers:
+
+    STORAGE_TOKEN=... python remote_storage.py --host 0.0.0.0
+
+and point each worker at it with storage.backend: "remote".
+"""
+import argparse
+import asyncio
+import hmac
+import importlib
+import inspect
+import io
+import itertools
+import logging
+import os
+import pickle
+import sqlite3
+import struct
+import sys
+import time
+
+import yaml
+
+import metrics
+from database import SQLiteStorage, DEFAULT_STORAGE_PROFILE, SQL_SECONDS, STREAM_BATCH_SIZE, statement_class
+from migrations import migrate
+
+# Modules whose top-level functions the server runs on a worker's behalf
+REMOTE_MODULES = ("database", "scoring", "snapshots", "vote_stats", "archive")
+
+# Classes allowed in a frame besides plain values (tuples, lists, dicts, strings, numbers)
+FRAME_CLASSES = {("database", "VoteRequest"), ("scoring", "Standing")}
+
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+HANDSHAKE_TIMEOUT = 10
+
+class RemoteStorageError(Exception):
+    """A storage server failure that has no matching sqlite3 exception."""
+
+class _FrameUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if (module, name) in FRAME_CLASSES:
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(f"{module}.{name} is not allowed in a storage frame")
+
+async def read_frame(reader):
+    header = await reader.readexactly(4)
+    (size,) = struct.unpack("!I", header)
+    if size > MAX_FRAME_SIZE:
+        raise ConnectionError(f"Storage frame of {size} bytes is too large")
+    return _FrameUnpickler(io.BytesIO(await reader.readexactly(size))).load()
+
+def encode_frame(value):
+    body = pickle.dumps(value, protocol=4)
+    return struct.pack("!I", len(body)) + body
+
+def function_name(fn):
+    return f"{fn.__module__}.{fn.__name__}"
+
+def resolve_function(name):
+    """Returns the query function called name, refusing anything outside REMOTE_MODULES."""
+    module_name, _, function = name.rpartition(".")
+    if module_name not in REMOTE_MODULES or function.startswith("_"):
+        raise ValueError(f"{name} cannot be run remotely")
+    fn = getattr(importlib.import_module(module_name), function, None)
+    if not inspect.isfunction(fn) or fn.__module__ != module_name:
+        raise ValueError(f"{name} cannot be run remotely")
+    return fn
+
+def remote_error(name, message):
+    """Rebuilds a server-side exception, keeping sqlite3 errors so callers can still catch them."""
+    error_class = getattr(sqlite3, name, None)
+    if isinstance(error_class, type) and issubclass(error_class, sqlite3.Error):
+        return error_class(message)
+    return RemoteStorageError(f"{name}: {message}")
+
+class _Client:
+    """A worker connected to the server."""
+
+    __slots__ = ("writer", "lock", "streams", "stream_ids", "tasks")
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.lock = asyncio.Lock()
+        self.streams = {}  # stream id -> async generator of rows
+        self.stream_ids = itertools.count(1)
+        self.tasks = set()
+
+    async def send(self, value):
+        async with self.lock:
+            self.writer.write(encode_frame(value))
+            await self.writer.drain()
+
+class StorageServer:
+    """Serves a SQLiteStorage to the workers and relays their invalidation messages.
+
+    Requests on a connection run concurrently; the storage's single writer thread keeps
+    writes serialized in arrival order. Every worker must present the shared token first.
+    """
+
+    def __init__(self, storage, token):
+        self.storage = storage
+        self.token = token
+        self._clients = set()
+        self._handlers = set()
+        self._server = None
+
+    async def start(self, host, port):
+        self._server = await asyncio.start_server(self._handle, host, port)
+        logging.info(f"Storage server listening on {host}:{port}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for client in list(self._clients):
+                client.writer.close()
+            if self._handlers:
+                await asyncio.wait(self._handlers, timeout=HANDSHAKE_TIMEOUT)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        client = _Client(writer)
+        handler = asyncio.current_task()
+        self._handlers.add(handler)
+        try:
+            hello = await asyncio.wait_for(read_frame(reader), HANDSHAKE_TIMEOUT)
+            if not (
+                isinstance(hello, tuple) and len(hello) == 2 and hello[0] == "hello"
+                and hmac.compare_digest(str(hello[1]).encode(), self.token.encode())
+            ):
+                logging.warning(f"Rejected storage client {writer.get_extra_info('peername')}")
+                return
+            await client.send(("welcome",))
+            self._clients.add(client)
+
+            while True:
+                frame = await read_frame(reader)
+                task = asyncio.get_running_loop().create_task(self._dispatch(client, frame))
+                client.tasks.add(task)
+                task.add_done_callback(client.tasks.discard)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError, pickle.UnpicklingError) as e:
+            logging.debug(f"Storage client disconnected: {e!r}")
+        finally:
+            self._clients.discard(client)
+            for task in list(client.tasks):
+                task.cancel()
+            for stream in client.streams.values():
+                try:
+                    await stream.aclose()
+                except RuntimeError:
+                    pass  # Still being read by a request that was just cancelled
+            writer.close()
+            self._handlers.discard(handler)
+
+    async def _dispatch(self, client, frame):
+        request_id, op, payload = frame
+        try:
+            if op == "read":
+                result = await self.storage.read(resolve_function(payload[0]), *payload[1])
+            elif op == "write":
+                result = await self.storage.write(resolve_function(payload[0]), *payload[1])
+            elif op == "stream_open":
+                query, params, batch_size = payload
+                result = next(client.stream_ids)
+                client.streams[result] = self.storage.stream(query, params, batch_size)
+            elif op == "stream_next":
+                stream_id, batch_size = payload
+                result = await self._next_rows(client, stream_id, batch_size)
+            elif op == "stream_close":
+                stream = client.streams.pop(payload[0], None)
+                if stream is not None:
+                    await stream.aclose()
+                result = None
+            elif op == "publish":
+                for other in list(self._clients):
+                    if other is not client:
+                        await other.send((None, True, payload[0]))
+                result = None
+            else:
+                raise ValueError(f"Unknown storage operation: {op}")
+        except Exception as e:
+            await client.send((request_id, False, (type(e).__name__, str(e))))
+        else:
+            await client.send((request_id, True, result))
+
+    async def _next_rows(self, client, stream_id, batch_size):
+        """Returns up to batch_size more rows of a stream; an empty list means it has ended."""
+        stream = client.streams.get(stream_id)
+        if stream is None:
+            return []
+        rows = []
+        try:
+            while len(rows) < batch_size:
+                rows.append(await stream.__anext__())
+        except StopAsyncIteration:
+            del client.streams[stream_id]
+        return rows
+
+class RemoteStorage:
+    """Storage backend that runs database work on a StorageServer.
+
+    Requests share one connection, opened on first use and reopened after it drops.
+    Messages published by other workers are handed to the subscribed callbacks; after a
+    reconnect they get ("reconnected",), since messages sent meanwhile were missed.
+    """
+
+    def __init__(self, host, port, token):
+        if not token:
+            raise ValueError("The remote storage backend needs STORAGE_TOKEN to be set")
+        self.host = host
+        self.port = port
+        self.token = token
+        self._writer = None
+        self._connect_lock = None
+        self._write_lock = None
+        self._pending = {}  # request id -> future
+        self._ids = itertools.count(1)
+        self._listeners = []
+        self._connected_before = False
+
+    async def _connect(self):
+        if self._writer is not None:
+            return
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+            self._write_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._writer is not None:
+                return
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            writer.write(encode_frame(("hello", self.token)))
+            await writer.drain()
+            try:
+                reply = await asyncio.wait_for(read_frame(reader), HANDSHAKE_TIMEOUT)
+            except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                reply = None
+            if reply != ("welcome",):
+                writer.close()
+                raise ConnectionError(f"Storage server {self.host}:{self.port} refused the connection")
+
+            self._writer = writer
+            asyncio.get_running_loop().create_task(self._read_loop(reader, writer))
+            logging.info(f"Connected to storage server {self.host}:{self.port}")
+            if self._connected_before:
+                self._deliver(("reconnected",))
+            self._connected_before = True
+
+    async def _read_loop(self, reader, writer):
+        error = None
+        try:
+            while True:
+                request_id, ok, value = await read_frame(reader)
+                if request_id is None:
+                    self._deliver(value)
+                    continue
+                future = self._pending.pop(request_id, None)
+                if future is not None and not future.done():
+                    future.set_result((ok, value))
+        except Exception as e:
+            error = e
+        finally:
+            if self._writer is writer:  # Not closed on purpose
+                self._writer = None
+                logging.error(f"Lost the storage server connection: {error!r}")
+            writer.close()
+            pending, self._pending = self._pending, {}
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Lost the storage server connection"))
+
+    def _deliver(self, message):
+        loop = asyncio.get_running_loop()
+        for callback in self._listeners:
+            loop.create_task(callback(message))
+
+    async def _request(self, op, *payload):
+        await self._connect()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            async with self._write_lock:
+                self._writer.write(encode_frame((request_id, op, payload)))
+                await self._writer.drain()
+            ok, value = await future
+        finally:
+            self._pending.pop(request_id, None)
+        if not ok:
+            raise remote_error(*value)
+        return value
+
+    async def _call(self, op, fn, args):
+        start = time.perf_counter()
+        try:
+            return await self._request(op, function_name(fn), args)
+        finally:
+            if metrics.REGISTRY.enabled:
+                SQL_SECONDS.observe(time.perf_counter() - start, statement_class(fn, args), op)
+
+    async def read(self, fn, *args):
+        """Runs fn(cursor, *args) on the server."""
+        return await self._call("read", fn, args)
+
+    async def write(self, fn, *args):
+        """Runs fn(conn, cursor, *args) on the server's writer inside one transaction."""
+        return await self._call("write", fn, args)
+
+    async def stream(self, query, params=(), batch_size=STREAM_BATCH_SIZE):
+        """Yields the rows of a query, fetching batch_size rows per round trip."""
+        stream_id = await self._request("stream_open", query, tuple(params), batch_size)
+        finished = False
+        try:
+            while True:
+                rows = await self._request("stream_next", stream_id, batch_size)
+                if not rows:
+                    finished = True
+                    break
+                for row in rows:
+                    yield row
+        finally:
+            if not finished:
+                await self._request("stream_close", stream_id)
+
+    async def checkpoint_loop(self):
+        """Nothing to do: the storage server checkpoints its own database."""
+
+    async def publish(self, message):
+        await self._request("publish", message)
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def close(self):
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            try:
+                writer.close()
+            except RuntimeError:
+                pass  # The event loop has already shut down and taken the connection with it
+
+async def serve(storage, token, host, port):
+    server = StorageServer(storage, token)
+    await server.start(host, port)
+    checkpoints = asyncio.get_running_loop().create_task(storage.checkpoint_loop())
+    try:
+        await asyncio.Event().wait()
+    finally:
+        checkpoints.cancel()
+        await server.stop()
+
+def main():
+    with open("config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    settings = dict(DEFAULT_STORAGE_PROFILE, **(config.get('storage') or {}))
+
+    parser = argparse.ArgumentParser(description="Serve the bot's database to its shard processes.")
+    parser.add_argument("--host", default=settings["server_host"], help="Address to listen on")
+    parser.add_argument("--port", type=int, default=settings["server_port"], help="Port to listen on")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=config['bot']['log_level'])
+    token = os.environ.get("STORAGE_TOKEN")
+    if not token:
+        sys.exit("STORAGE_TOKEN must be set")
+
+    path = os.environ.get("DB_PATH", os.path.join("/app/data", "countdown_bot.db"))
+    conn = sqlite3.connect(path)
+    try:
+        logging.info(f"Database schema version: {migrate(conn)}")
+    finally:
+        conn.close()
+
+    storage = SQLiteStorage(path, config.get('storage'))
+    try:
+        asyncio.run(serve(storage, token, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        storage.close()
+
+if __name__ == "__main__":
+    main()
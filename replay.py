@@ -0,0 +1,182 @@
+"""Offline replay of a vote journal.
+
+Feeds the journaled votes back through the real vote recording (quotas, weights and the
+score table) on a scratch database, then through the milestone engine and the live
+ranking, and reports the final standings, the milestone crossings and the replay
+throughput as JSON:
+
+    python replay.py journal/votes.jsonl --database countdown_bot.db --output replay.json
+    python replay.py journal/votes.jsonl.48211 journal/votes.jsonl --weights 10,5,1
+    python replay.py journal/votes.jsonl --event 3 --until 1760000000 --milestone-points 20,40
+
+--weights and the milestone options answer "what if" questions without touching the bot.
+Without --database, events and submissions are made up from the ids in the journal. The
+source database is never modified.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from benchmark import summarize
+from database import VOTE_VALUES, record_votes
+from journal import read_journal
+from migrations import migrate
+from milestones import MilestoneEngine
+from ranking import EventRanking
+
+def load_entries(paths, event_ids=None, until=None):
+    """Reads journal files in the order given and returns the VoteRequests to replay."""
+    requests = []
+    for path in paths:
+        entries, aborted, good_size = read_journal(path)
+        for seq, request in entries:
+            if seq in aborted:
+                continue
+            if event_ids and request.event_id not in event_ids:
+                continue
+            if until is not None and request.voted_at > until:
+                continue
+            requests.append(request)
+    return requests
+
+def prepare_database(path, source, requests):
+    """Creates the scratch database: a copy of source without the replayed events' votes
+    (and with those events active again), or made-up events and submissions for every id
+    in the journal."""
+    conn = sqlite3.connect(path)
+    event_ids = sorted({request.event_id for request in requests})
+    if source:
+        source_conn = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+        source_conn.backup(conn)
+        source_conn.close()
+        migrate(conn)
+        placeholders = ", ".join("?" for _ in event_ids)
+        conn.execute(f"DELETE FROM votes WHERE event_id IN ({placeholders})", event_ids)
+        conn.execute(f"DELETE FROM submission_scores WHERE event_id IN ({placeholders})", event_ids)
+        conn.execute(f"UPDATE submissions SET milestone_mask = 0, milestone_reached = 0 WHERE event_id IN ({placeholders})", event_ids)
+        # Replays are usually post-mortems of ended events; votes are only recorded for active ones
+        conn.execute(f"UPDATE events SET active = 1 WHERE event_id IN ({placeholders})", event_ids)
+    else:
+        migrate(conn)
+        conn.executemany(
+            "INSERT INTO events (event_id, name, active) VALUES (?, ?, 1)",
+            [(event_id, f"Replay {event_id}") for event_id in event_ids]
+        )
+        submissions = sorted({
+            (submission_id, request.event_id)
+            for request in requests
+            for submission_id in request.submission_ids
+        })
+        conn.executemany(
+            (
+                "INSERT INTO submissions (submission_id, event_id, song_name, track_id, submitter_name) "
+                "VALUES (?, ?, ?, ?, ?)"
+            ),
+            [(submission_id, event_id, f"Song {submission_id}", f"Track-{submission_id}", f"submitter{submission_id}") for submission_id, event_id in submissions]
+        )
+    conn.commit()
+    return conn
+
+def replay(conn, requests, batch_size):
+    """Records the requests in batches like the vote queue. Returns (accepted requests, batch durations, wall time)."""
+    cursor = conn.cursor()
+    accepted = 0
+    durations = []
+    started = time.perf_counter()
+    for start in range(0, len(requests), batch_size):
+        batch = requests[start:start + batch_size]
+        batch_started = time.perf_counter()
+        results = record_votes(conn, cursor, batch)
+        conn.commit()
+        durations.append(time.perf_counter() - batch_started)
+        accepted += sum(1 for result in results if result not in (None, False))
+    return accepted, durations, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a vote journal through the scoring and milestone logic.")
+    parser.add_argument("journal", nargs="+", help="Journal files, oldest first (rotated files before the current one)")
+    parser.add_argument("--database", help="Bot database to copy submissions from (it is not modified)")
+    parser.add_argument("--event", type=int, action="append", help="Only replay this event (repeatable)")
+    parser.add_argument("--until", type=float, help="Only replay votes journaled up to this epoch second")
+    parser.add_argument("--batch-size", type=int, default=200, help="Votes recorded per transaction")
+    parser.add_argument("--weights", help="Points by vote rank instead of the bot's, e.g. 10,5,1")
+    parser.add_argument("--milestone-points", default="25,50,75", help="Absolute score milestones")
+    parser.add_argument("--milestone-percentages", default="0.5,0.75,1.0", help="Milestones as fractions of the high score")
+    parser.add_argument("--top", type=int, default=10, help="Standings listed per event")
+    parser.add_argument("--output", default="-", help="Where to write the JSON report (- for stdout)")
+    args = parser.parse_args()
+
+    requests = load_entries(args.journal, set(args.event or ()), args.until)
+    if not requests:
+        print("Nothing to replay.", file=sys.stderr)
+        sys.exit(1)
+    weights = [int(weight) for weight in args.weights.split(",")] if args.weights else [VOTE_VALUES[rank] for rank in sorted(VOTE_VALUES)]
+
+    with tempfile.TemporaryDirectory() as scratch:
+        conn = prepare_database(os.path.join(scratch, "replay.db"), args.database, requests)
+        accepted, durations, wall_time = replay(conn, requests, args.batch_size)
+        event_ids = sorted({request.event_id for request in requests})
+        placeholders = ", ".join("?" for _ in event_ids)
+        votes = conn.execute(
+            f"SELECT event_id, submission_id, vote_rank FROM votes WHERE event_id IN ({placeholders}) ORDER BY vote_id",
+            event_ids
+        ).fetchall()
+        details = {
+            row[0]: row[1:]
+            for row in conn.execute(
+                f"SELECT submission_id, track_id, song_name, url, submitter_name FROM submissions WHERE event_id IN ({placeholders})",
+                event_ids
+            )
+        }
+        conn.close()
+
+    # Rescore with the chosen weights (ranks past the table are worth 1, like the bot)
+    scored = [(event_id, submission_id, weights[rank] if rank < len(weights) else 1) for event_id, submission_id, rank in votes]
+    engine = MilestoneEngine(
+        [int(points) for points in args.milestone_points.split(",") if points],
+        [float(percentage) for percentage in args.milestone_percentages.split(",") if percentage]
+    )
+    crossings = engine.replay(scored)
+    rankings = {event_id: EventRanking() for event_id in event_ids}
+    for event_id, submission_id, vote_value in scored:
+        rankings[event_id].add_vote(submission_id, vote_value)
+    for event_id, ranking in rankings.items():
+        for submission_id in ranking.missing_details():
+            ranking.set_details(submission_id, details.get(submission_id, (None, None, None, None)))
+
+    report = {
+        "journal": args.journal,
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("journal", "output")},
+        "weights": weights,
+        "requests": len(requests),
+        "requests_accepted": accepted,
+        "requests_rejected": len(requests) - accepted,
+        "votes": len(votes),
+        "record_votes": summarize(durations, wall_time),
+        "votes_per_s": round(len(votes) / wall_time, 2) if wall_time else None,
+        "events": {
+            event_id: {
+                "votes": sum(1 for vote in scored if vote[0] == event_id),
+                "top": [standing._asdict() for standing in rankings[event_id].top(args.top)],
+                "milestones": [
+                    {"submission_id": submission_id, "score": score, "kind": milestone.kind, "threshold": milestone.threshold}
+                    for crossed_event_id, submission_id, score, milestone in crossings
+                    if crossed_event_id == event_id
+                ],
+            }
+            for event_id in event_ids
+        },
+    }
+    output = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import asyncio
+import heapq
+import json
+import logging
+import time
+
+import discord
+
+from messages import PRIORITY_REFRESH
+
+class EmbedUpdateScheduler:
+    """Coalesces event embed updates.
+
+    Callers mark an event dirty; bursts of marks collapse into at most one edit per
+    window seconds. The discord.Message of each event is cached instead of being fetched
+    for every edit, and an edit is skipped when the rendered embed is identical to the
+    last one sent. Edits go through the outbound queue at refresh priority; a newer
+    render replaces an edit that is still queued.
+    """
+
+    def __init__(self, bot, outbound, render, window=5):
+        self.bot = bot
+        self.outbound = outbound
+        self.render = render  # async fn(event_id) -> (channel_id, message_id, embed) or None
+        self.window = window
+        self._messages = {}      # event_id -> discord.Message
+        self._last_payload = {}  # event_id -> serialized embed of the last edit
+        self._last_flush = {}    # event_id -> loop time of the last flush
+        self._pending = {}       # event_id -> scheduled flush task
+
+    def mark_dirty(self, event_id):
+        """Schedules an embed update for the event unless one is already pending."""
+        if event_id in self._pending:
+            return
+
+        loop = asyncio.get_running_loop()
+        last_flush = self._last_flush.get(event_id)
+        delay = 0 if last_flush is None else max(0, last_flush + self.window - loop.time())
+        self._pending[event_id] = loop.create_task(self._flush_later(event_id, delay))
+
+    def pending(self):
+        """Returns the number of events waiting for an embed update."""
+        return len(self._pending)
+
+    def forget(self, event_id):
+        """Cancels pending updates and drops cached state for an event that has ended."""
+        task = self._pending.pop(event_id, None)
+        if task and task is not asyncio.current_task():
+            task.cancel()
+        self.outbound.cancel(("embed", event_id))
+        self._messages.pop(event_id, None)
+        self._last_payload.pop(event_id, None)
+        self._last_flush.pop(event_id, None)
+
+    async def _flush_later(self, event_id, delay):
+        await asyncio.sleep(delay)
+        # Leave the pending slot first so marks that arrive during the edit schedule the next one
+        self._pending.pop(event_id, None)
+        await self.flush(event_id)
+
+    async def flush(self, event_id):
+        """Renders the event embed and queues an edit if anything changed."""
+        self._last_flush[event_id] = asyncio.get_running_loop().time()
+
+        try:
+            rendered = await self.render(event_id)
+        except Exception as e:
+            logging.error(f"Error rendering event message: {e}")
+            return
+        if rendered is None:
+            return
+        channel_id, message_id, embed = rendered
+
+        payload = json.dumps(embed.to_dict(), sort_keys=True)
+        if payload == self._last_payload.get(event_id):
+            return
+
+        self.outbound.enqueue(
+            channel_id,
+            lambda: self._edit(event_id, channel_id, message_id, embed, payload),
+            PRIORITY_REFRESH,
+            key=("embed", event_id),
+            route="edit"
+        )
+
+    async def _edit(self, event_id, channel_id, message_id, embed, payload):
+        try:
+            message = self._messages.get(event_id)
+            if message is None or message.id != message_id:
+                channel = self.bot.get_channel(channel_id)
+                message = await channel.fetch_message(message_id)
+                self._messages[event_id] = message
+
+            await message.edit(embed=embed)
+            self._last_payload[event_id] = payload
+
+        except discord.NotFound:
+            self._messages.pop(event_id, None)
+            logging.error(f"Message for event {event_id} not found in channel {channel_id}.")
+
+class EventScheduler:
+    """One scheduler for every active event's deadline and periodic refresh.
+
+    Deadlines live in a heap keyed on end time; a single task sleeps until the earliest
+    one and calls on_deadline(event_id) exactly when it is reached. A separate task calls
+    on_refresh(event_id) for every scheduled event each refresh_interval seconds.
+    """
+
+    def __init__(self, on_deadline, on_refresh, refresh_interval=60):
+        self.on_deadline = on_deadline  # async fn(event_id)
+        self.on_refresh = on_refresh    # fn(event_id)
+        self.refresh_interval = refresh_interval
+        self._heap = []       # (end_at, event_id); stale entries are skipped lazily
+        self._deadlines = {}  # event_id -> end_at
+        self._wakeup = None
+        self._tasks = []
+
+    def start(self):
+        """Starts the deadline and refresh tasks on the running event loop."""
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            loop.create_task(self._run_deadlines()),
+            loop.create_task(self._run_refreshes()),
+        ]
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def schedule(self, event_id, end_at):
+        """Schedules (or reschedules) an event to end at end_at (UTC epoch seconds)."""
+        self._deadlines[event_id] = end_at
+        heapq.heappush(self._heap, (end_at, event_id))
+        if self._wakeup:
+            self._wakeup.set()
+
+    def cancel(self, event_id):
+        """Stops tracking an event; its heap entry is discarded when it reaches the top."""
+        self._deadlines.pop(event_id, None)
+
+    def scheduled_events(self):
+        """Returns the ids of every event that still has a pending deadline."""
+        return list(self._deadlines)
+
+    async def _run_deadlines(self):
+        while True:
+            self._wakeup.clear()
+
+            # Discard entries for cancelled or rescheduled events
+            while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+
+            if self._heap:
+                end_at, event_id = self._heap[0]
+                timeout = end_at - time.time()
+                if timeout <= 0:
+                    heapq.heappop(self._heap)
+                    del self._deadlines[event_id]
+                    asyncio.get_running_loop().create_task(self._fire(event_id))
+                    continue
+            else:
+                timeout = None
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, event_id):
+        try:
+            await self.on_deadline(event_id)
+        except Exception as e:
+            logging.error(f"Error ending event {event_id}: {e}")
+
+    async def _run_refreshes(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            for event_id in self.scheduled_events():
+                self.on_refresh(event_id)
@@ -0,0 +1,119 @@
+from collections import namedtuple
+
+# One row per submission, already ranked. Kept as a namedtuple so callers can
+# unpack it like the database rows they used to work with.
+Standing = namedtuple(
+    "Standing",
+    ["rank", "submission_id", "track_id", "song_name", "url", "submitter_name", "score", "vote_count"]
+)
+
+# Every submission of an event with its totals, in standings order
+STANDINGS_QUERY = (
+    "SELECT s.submission_id, s.track_id, s.song_name, s.url, s.submitter_name, "
+    "       COALESCE(sc.score, 0) AS score, COALESCE(sc.vote_count, 0) AS vote_count "
+    "FROM submissions s "
+    "LEFT JOIN submission_scores sc ON sc.submission_id = s.submission_id "
+    "WHERE s.event_id = ? "
+    "ORDER BY score DESC, vote_count DESC, s.submission_id ASC"
+)
+
+def get_standings(cursor, event_id):
+    """Ranks every submission of an event in a single query over the materialized score table.
+
+    Ties on score are broken by vote count (more votes first), then by submission order.
+    """
+    cursor.execute(STANDINGS_QUERY, (event_id,))
+    return [Standing(rank, *row) for rank, row in enumerate(cursor.fetchall(), 1)]
+
+# Every submission of an event in standings order, followed by its votes in the order
+# they were cast. Submissions without votes yield one row with NULL voter_name/vote_value.
+STANDINGS_WITH_VOTES_QUERY = (
+    "SELECT s.submission_id, s.song_name, s.url, s.submitter_name, "
+    "       COALESCE(sc.score, 0) AS score, v.voter_name, v.vote_value "
+    "FROM submissions s "
+    "LEFT JOIN submission_scores sc ON sc.submission_id = s.submission_id "
+    "LEFT JOIN votes v ON v.submission_id = s.submission_id "
+    "WHERE s.event_id = ? "
+    "ORDER BY score DESC, COALESCE(sc.vote_count, 0) DESC, s.submission_id ASC, v.vote_id ASC"
+)
+
+SCORE_QUERY = "SELECT score FROM submission_scores WHERE submission_id = ?"
+
+def get_score(cursor, submission_id):
+    """Returns the current score of a single submission."""
+    cursor.execute(SCORE_QUERY, (submission_id,))
+    result = cursor.fetchone()
+    return result[0] if result else 0
+
+def highest_score(standings):
+    """Returns the top score from a list of standings (0 when there are no submissions)."""
+    return standings[0].score if standings else 0
+
+def update_highest_score(conn, cursor, event_id, standings):
+    """Stores the event's current highest score and returns it (without committing)."""
+    score = highest_score(standings)
+    cursor.execute("UPDATE events SET highest_score = ? WHERE event_id = ?", (score, event_id))
+    return score
+
+def add_vote_scores(cursor, votes):
+    """Applies newly inserted votes to the materialized score table.
+
+    votes is a list of (submission_id, event_id, vote_value, voted_at) tuples. Does not
+    commit: call it right after the vote INSERTs so both land in the same transaction.
+    """
+    cursor.executemany(
+        (
+            "INSERT INTO submission_scores (submission_id, event_id, score, vote_count, last_voted_at) "
+            "VALUES (?, ?, ?, 1, ?) "
+            "ON CONFLICT(submission_id) DO UPDATE SET "
+            "    score = score + excluded.score, "
+            "    vote_count = vote_count + 1, "
+            "    last_voted_at = excluded.last_voted_at"
+        ),
+        votes
+    )
+
+def verify_scores(cursor, event_id=None):
+    """Compares the score table with the raw votes.
+
+    Returns a list of (submission_id, stored_score, stored_votes, actual_score, actual_votes)
+    for every submission whose materialized score has drifted.
+    """
+    query = (
+        "SELECT s.submission_id, COALESCE(sc.score, 0), COALESCE(sc.vote_count, 0), "
+        "       COALESCE(v.score, 0), COALESCE(v.vote_count, 0) "
+        "FROM submissions s "
+        "LEFT JOIN submission_scores sc ON sc.submission_id = s.submission_id "
+        "LEFT JOIN ("
+        "    SELECT submission_id, SUM(vote_value) AS score, COUNT(*) AS vote_count "
+        "    FROM votes "
+        "    GROUP BY submission_id"
+        ") v ON v.submission_id = s.submission_id "
+        "WHERE (COALESCE(sc.score, 0) != COALESCE(v.score, 0) "
+        "    OR COALESCE(sc.vote_count, 0) != COALESCE(v.vote_count, 0))"
+    )
+    if event_id is None:
+        cursor.execute(query)
+    else:
+        cursor.execute(query + " AND s.event_id = ?", (event_id,))
+    return cursor.fetchall()
+
+def rebuild_scores(conn, cursor, event_id=None):
+    """Recomputes the score table from the votes table (for one event, or all of them).
+
+    Does not commit: the caller (the storage writer) owns the transaction.
+    """
+    where = "" if event_id is None else "WHERE s.event_id = ? "
+    params = () if event_id is None else (event_id,)
+    cursor.execute("DELETE FROM submission_scores " + ("" if event_id is None else "WHERE event_id = ?"), params)
+    cursor.execute(
+        (
+            "INSERT INTO submission_scores (submission_id, event_id, score, vote_count, last_voted_at) "
+            "SELECT s.submission_id, s.event_id, SUM(v.vote_value), COUNT(*), MAX(v.voted_at) "
+            "FROM votes v "
+            "JOIN submissions s ON s.submission_id = v.submission_id "
+            + where +
+            "GROUP BY s.submission_id"
+        ),
+        params
+    )
@@ -0,0 +1,54 @@
+import os
+
+# Sharding settings used when config.yaml has no "sharding" section
+DEFAULT_SHARDING_SETTINGS = {
+    "shard_count": None,  # Total gateway shards across every process (None: no sharding)
+    "shard_ids": None,    # Shards run by this process (None: all of them)
+}
+
+def shard_for(guild_id, shard_count):
+    """Returns the shard Discord delivers a guild's events to (shard 0 for DMs)."""
+    if guild_id is None or not shard_count:
+        return 0
+    return (guild_id >> 22) % shard_count
+
+class ShardOwnership:
+    """Which guilds, and so which events, this process is responsible for.
+
+    An event is owned by the process running the shard of its guild: that process keeps
+    the event's standings, milestones and embed updates, and ends it. Events created
+    before events had a guild belong to shard 0.
+    """
+
+    def __init__(self, shard_count=None, shard_ids=None):
+        self.shard_count = int(shard_count) if shard_count else None
+        self.shard_ids = [int(shard_id) for shard_id in shard_ids] if shard_ids is not None else None
+        if self.shard_ids is not None:
+            if not self.shard_count:
+                raise ValueError("sharding.shard_ids needs sharding.shard_count")
+            if any(shard_id < 0 or shard_id >= self.shard_count for shard_id in self.shard_ids):
+                raise ValueError(f"sharding.shard_ids must be between 0 and {self.shard_count - 1}")
+
+    @classmethod
+    def from_settings(cls, settings=None):
+        """Builds the ownership from config.yaml, overridden by SHARD_COUNT and SHARD_IDS (e.g. "0,1")."""
+        settings = dict(DEFAULT_SHARDING_SETTINGS, **(settings or {}))
+        shard_count = os.environ.get("SHARD_COUNT") or settings["shard_count"]
+        shard_ids = settings["shard_ids"]
+        if os.environ.get("SHARD_IDS"):
+            shard_ids = os.environ["SHARD_IDS"].split(",")
+        return cls(shard_count, shard_ids)
+
+    @property
+    def sharded(self):
+        return self.shard_count is not None
+
+    @property
+    def partial(self):
+        """True when other processes run some of the shards."""
+        return self.shard_ids is not None and len(set(self.shard_ids)) < self.shard_count
+
+    def owns(self, guild_id):
+        if not self.partial:
+            return True
+        return shard_for(guild_id, self.shard_count) in self.shard_ids
@@ -0,0 +1,65 @@
+import time
+
+# Arrows shown next to a submission in published charts
+RANK_UP = "⬆️"
+RANK_DOWN = "⬇️"
+RANK_NEW = "🆕"
+
+def save_snapshot(conn, cursor, event_id, standings):
+    """Stores the ranks and scores of a chart publication and returns the snapshot id."""
+    cursor.execute(
+        "INSERT INTO standings_snapshots (event_id, published_at) VALUES (?, ?)",
+        (event_id, int(time.time()))
+    )
+    snapshot_id = cursor.lastrowid
+    cursor.executemany(
+        "INSERT INTO standings_snapshot_rows (snapshot_id, submission_id, rank, score) VALUES (?, ?, ?, ?)",
+        [(snapshot_id, standing.submission_id, standing.rank, standing.score) for standing in standings]
+    )
+    return snapshot_id
+
+def get_snapshots(cursor, event_id):
+    """Returns (snapshot_id, published_at) for every publication of an event, oldest first."""
+    cursor.execute(
+        (
+            "SELECT snapshot_id, published_at "
+            "FROM standings_snapshots "
+            "WHERE event_id = ? "
+            "ORDER BY snapshot_id"
+        ),
+        (event_id,)
+    )
+    return cursor.fetchall()
+
+LATEST_SNAPSHOT_QUERY = "SELECT MAX(snapshot_id) FROM standings_snapshots WHERE event_id = ?"
+SNAPSHOT_RANKS_QUERY = "SELECT submission_id, rank FROM standings_snapshot_rows WHERE snapshot_id = ?"
+
+def get_latest_snapshot_id(cursor, event_id):
+    """Returns the id of the event's most recent snapshot, or None."""
+    cursor.execute(LATEST_SNAPSHOT_QUERY, (event_id,))
+    return cursor.fetchone()[0]
+
+def get_snapshot_ranks(cursor, snapshot_id):
+    """Returns {submission_id: rank} for a snapshot (empty when there is none)."""
+    if snapshot_id is None:
+        return {}
+    cursor.execute(SNAPSHOT_RANKS_QUERY, (snapshot_id,))
+    return dict(cursor.fetchall())
+
+def rank_changes(previous_ranks, current_ranks):
+    """Diffs two {submission_id: rank} maps in one pass over the current one.
+
+    Returns {submission_id: arrow}. With no previous snapshot nothing is marked as new.
+    """
+    changes = {}
+    for submission_id, rank in current_ranks.items():
+        previous_rank = previous_ranks.get(submission_id)
+        if previous_rank is None:
+            changes[submission_id] = RANK_NEW if previous_ranks else ""
+        elif rank < previous_rank:
+            changes[submission_id] = RANK_UP
+        elif rank > previous_rank:
+            changes[submission_id] = RANK_DOWN
+        else:
+            changes[submission_id] = ""
+    return changes
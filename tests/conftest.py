@@ -0,0 +1,46 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# The bot's modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database, SQLiteStorage
+from migrations import migrate
+
+@pytest.fixture
+def db_path(tmp_path):
+    """A migrated, empty database file."""
+    path = str(tmp_path / "countdown.db")
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.close()
+    return path
+
+@pytest.fixture
+def conn(db_path):
+    """A plain connection to the test database, for seeding rows and checking results."""
+    connection = sqlite3.connect(db_path)
+    yield connection
+    connection.close()
+
+@pytest.fixture
+def open_db(db_path):
+    """Opens Database handles on the test database (one per simulated bot process)."""
+    opened = []
+
+    def open_db():
+        database = Database(SQLiteStorage(db_path, {"reader_connections": 1}))
+        opened.append(database)
+        return database
+
+    yield open_db
+    for database in opened:
+        database.close()
+
+@pytest.fixture
+def db(open_db):
+    """A Database on the test database, closed after the test."""
+    return open_db()
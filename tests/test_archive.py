@@ -0,0 +1,35 @@
+import asyncio
+import os
+
+import archive
+from archive import Archiver
+
+def seed(conn):
+    conn.executemany(
+        "INSERT INTO events (event_id, name, active, end_at) VALUES (?, ?, 0, ?)",
+        [(1, "Old", 100), (2, "Recent", 10 ** 12)]
+    )
+    conn.execute("INSERT INTO submissions (submission_id, event_id, track_id) VALUES (1, 1, 'Track-1')")
+    conn.commit()
+
+def test_a_rolled_back_expiry_keeps_the_archive(conn, tmp_path):
+    seed(conn)
+    cursor = conn.cursor()
+    path = archive.archive_event(conn, cursor, 1, str(tmp_path / "archive"))
+    conn.commit()
+
+    assert archive.expire_archives(conn, cursor, 1000, str(tmp_path / "archive")) == [(1, path)]
+    conn.rollback()
+
+    # The event row is back, so its archive must still be there
+    assert cursor.execute("SELECT archived_at IS NOT NULL FROM events WHERE event_id = 1").fetchone() == (1,)
+    assert os.path.exists(path)
+
+def test_archive_due_removes_files_after_the_rows(conn, db, tmp_path):
+    seed(conn)
+    archiver = Archiver(db, {"directory": str(tmp_path / "archive"), "archive_after": 0, "retention_days": 1})
+
+    archived, expired = asyncio.run(archiver.archive_due())
+    assert archived == [1] and expired == [1]
+    assert conn.execute("SELECT event_id FROM events").fetchall() == [(2,)]
+    assert os.listdir(tmp_path / "archive") == []
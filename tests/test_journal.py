@@ -0,0 +1,29 @@
+import os
+
+from database import VoteRequest
+from journal import VoteJournal, read_journal
+
+def test_rotations_in_the_same_second_keep_every_file(tmp_path):
+    journal = VoteJournal(str(tmp_path), rotate_bytes=1, keep_files=10)
+    journal.open(0)
+    for user_id in range(5):
+        journal.append([VoteRequest(1, user_id, f"user{user_id}", [1], False)])
+    journal.close()
+
+    rotated = journal.rotated_files()
+    assert [os.path.basename(path) for path in rotated] == [f"votes.jsonl.{seq}" for seq in (1, 2, 3, 4)]
+    seqs = [seq for path in rotated + [journal.path] for seq, request in read_journal(path)[0]]
+    assert seqs == [1, 2, 3, 4, 5]
+
+def test_rotation_never_overwrites_a_file(tmp_path):
+    journal = VoteJournal(str(tmp_path), rotate_bytes=1)
+    journal.open(0)
+    journal.append([VoteRequest(1, 1, "user1", [1], False)])
+    with open(journal.path + ".1", "w") as f:
+        f.write("kept\n")
+    journal.append([VoteRequest(1, 2, "user2", [1], False)])  # Would rotate to votes.jsonl.1
+    journal.close()
+
+    with open(journal.path + ".1") as f:
+        assert f.read() == "kept\n"
+    assert [seq for seq, request in read_journal(journal.path)[0]] == [1, 2]
@@ -0,0 +1,40 @@
+import asyncio
+from types import SimpleNamespace
+
+from message_index import SubmissionMessageIndex
+
+def seed(conn):
+    conn.executemany(
+        "INSERT INTO events (event_id, name, guild_id, active) VALUES (?, ?, ?, ?)",
+        [
+            (1, "Countdown", 10, 0),  # An ended run in guild 10
+            (2, "Countdown", 10, 1),
+            (3, "Countdown", 20, 1),
+            (4, "Countdown", 20, 1),
+        ]
+    )
+    conn.executemany(
+        "INSERT INTO submissions (submission_id, event_id, track_id) VALUES (?, ?, ?)",
+        [(event_id * 10, event_id, "Track-1") for event_id in (1, 2, 3, 4)]
+    )
+    conn.commit()
+
+def message(message_id, guild_id):
+    return SimpleNamespace(
+        id=message_id,
+        guild=SimpleNamespace(id=guild_id),
+        content="✅ Your song has been submitted as **Track-1** for **Countdown**!"
+    )
+
+async def register(index, messages):
+    return [await index.register_message(msg) for msg in messages]
+
+def test_register_message_scopes_to_the_guilds_active_events(conn, db):
+    seed(conn)
+    index = SubmissionMessageIndex(db)
+    routes = asyncio.run(register(index, [message(1, 10), message(2, 20)]))
+
+    # Guild 10 has one active "Countdown" (the ended run is ignored); guild 20 has two
+    assert routes == [(2, 20), None]
+    assert index.lookup(1) == (2, 20)
+    assert index.lookup(2) is None
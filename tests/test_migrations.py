@@ -0,0 +1,19 @@
+import archive
+import database
+import scoring
+import snapshots
+import vote_stats
+from migrations import MIGRATIONS, HOT_QUERIES, migrate, find_full_scans
+
+def test_migrate_applies_every_version(conn):
+    assert migrate(conn) == MIGRATIONS[-1][0]
+
+def test_hot_queries_cover_the_shared_statements():
+    queries = [query for query, params in HOT_QUERIES]
+    for module in (database, archive, scoring, snapshots, vote_stats):
+        for name, value in vars(module).items():
+            if name.endswith(("_QUERY", "_SQL")):
+                assert value in queries, f"{module.__name__}.{name} is not in HOT_QUERIES"
+
+def test_hot_queries_do_not_scan_full_tables(conn):
+    assert find_full_scans(conn.cursor()) == []
@@ -0,0 +1,60 @@
+from milestones import MilestoneEngine
+
+# Bits: 0 = 10 points, 1 = 20 points, 2 = 50% of the high score, 3 = 100% of the high score
+POINTS = [10, 20]
+PERCENTAGES = [0.5, 1.0]
+
+# A recorded vote stream of (event_id, submission_id, vote_value), in commit order
+VOTES = [
+    (1, 1, 5),
+    (1, 2, 3),
+    (1, 1, 5),
+    (1, 2, 5),
+    (1, 2, 3),
+    (1, 1, 1),
+    (1, 1, 5),
+    (1, 2, 5),
+    (1, 2, 5),
+    (1, 2, 1),
+    (2, 3, 5),
+    (2, 3, 5),
+]
+
+def engine():
+    return MilestoneEngine(POINTS, PERCENTAGES)
+
+def crossing_keys(crossings):
+    return [(event_id, submission_id, score, milestone.kind, milestone.threshold) for event_id, submission_id, score, milestone in crossings]
+
+def test_replay_reports_each_crossing_once():
+    crossings = engine().replay(VOTES)
+
+    assert crossing_keys(crossings) == [
+        (1, 2, 3, "percentage", 0.5),    # half of the leader's 5
+        (1, 1, 10, "points", 10),
+        (1, 2, 11, "points", 10),
+        (1, 2, 11, "percentage", 1.0),   # overtakes the leader's 10
+        (1, 1, 11, "percentage", 0.5),
+        (1, 1, 11, "percentage", 1.0),   # ties the new leader's 11
+        (1, 2, 21, "points", 20),
+        (2, 3, 10, "points", 10),
+    ]
+    assert len({(submission_id, milestone.bit) for event_id, submission_id, score, milestone in crossings}) == len(crossings)
+
+def test_replay_is_idempotent_from_persisted_masks():
+    recorded = engine()
+    recorded.replay(VOTES)
+    masks = {
+        (event_id, submission_id): recorded.get_mask(event_id, submission_id)
+        for event_id, submission_id, vote_value in VOTES
+    }
+    assert masks == {(1, 1): 0b1101, (1, 2): 0b1111, (2, 3): 0b0001}
+
+    # Reload from the persisted bitmasks (scores start over, as before the stream) and replay
+    reloaded = engine()
+    for (event_id, submission_id), mask in masks.items():
+        reloaded.load_submission(event_id, submission_id, 0, mask)
+    assert reloaded.replay(VOTES) == []
+    for (event_id, submission_id), mask in masks.items():
+        assert reloaded.get_mask(event_id, submission_id) == mask
+    assert reloaded.get_high_score(1) == recorded.get_high_score(1) == 22
@@ -0,0 +1,28 @@
+import asyncio
+
+from models import EventCache
+
+async def submissions_after_start(db):
+    cache = EventCache(db)
+    await cache.load_event(1)  # As /countdownstart does, before any submission
+    assert await cache.get_submissions(1) == []
+
+    # Submissions are inserted by the submission flow, not through the cache; posting their
+    # messages caches them (Commands.add_submission)
+    await db.execute("INSERT INTO submissions (submission_id, event_id, track_id) VALUES (1, 1, 'Track-1')")
+    await db.execute("INSERT INTO submissions (submission_id, event_id, track_id) VALUES (2, 1, 'Track-2')")
+    for submission_id in (1, 2):
+        await cache.get_submission(submission_id)
+
+    # Served from the cache, even once the rows are gone from the database
+    await db.execute("DELETE FROM submissions")
+    submissions = await cache.get_submissions(1)
+    return sorted(submission.submission_id for submission in submissions), cache
+
+def test_submissions_registered_after_the_event_was_cached_are_served_from_it(conn, db):
+    conn.execute("INSERT INTO events (event_id, name, active) VALUES (1, 'Countdown', 1)")
+    conn.commit()
+
+    submission_ids, cache = asyncio.run(submissions_after_start(db))
+    assert submission_ids == [1, 2]
+    assert set(cache.get(1).track_ids) == {"Track-1", "Track-2"}
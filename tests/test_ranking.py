@@ -0,0 +1,75 @@
+import asyncio
+import random
+
+from ranking import RankingIndex, SortedKeys
+
+def seed(conn):
+    conn.execute("INSERT INTO events (event_id, name, active) VALUES (1, 'Countdown', 1)")
+    conn.executemany(
+        "INSERT INTO submissions (submission_id, event_id, track_id, song_name) VALUES (?, 1, ?, ?)",
+        [(1, "Track-1", "First"), (2, "Track-2", "Second")]
+    )
+    conn.commit()
+
+async def live_standings(db):
+    rankings = RankingIndex(db)
+    await rankings.start_event(1)
+    at_start = await rankings.get_standings(1)
+
+    await db.execute("INSERT INTO submissions (submission_id, event_id, track_id, song_name) VALUES (3, 1, 'Track-3', 'Third')")
+    rankings.add_submission(1, 3)
+    rankings.apply_vote(1, 2, 3)
+    live = await rankings.get_standings(1)
+    return at_start, live, await db.get_standings(1)
+
+def test_zero_vote_submissions_are_ranked(conn, db):
+    seed(conn)
+    at_start, live, stored = asyncio.run(live_standings(db))
+
+    assert [(standing.submission_id, standing.score) for standing in at_start] == [(1, 0), (2, 0)]
+    assert [(standing.rank, standing.submission_id, standing.song_name, standing.score) for standing in live] == [
+        (1, 2, "Second", 3),
+        (2, 1, "First", 0),
+        (3, 3, "Third", 0),
+    ]
+    # The live ranking lists the same submissions as the database (which has no votes here)
+    assert sorted(standing.submission_id for standing in live) == sorted(standing.submission_id for standing in stored)
+
+def test_sorted_keys_match_a_sorted_list():
+    rng = random.Random(7)
+    keys = SortedKeys()
+    expected = []
+    for step in range(5000):
+        if expected and rng.random() < 0.4:
+            key = expected.pop(rng.randrange(len(expected)))
+            keys.remove(key)
+        else:
+            key = (-rng.randrange(500), -rng.randrange(50), step)
+            keys.add(key)
+            expected.append(key)
+        if step % 250 == 0:
+            expected.sort()
+            assert list(keys) == expected
+            assert all(keys.index(key) == position for position, key in enumerate(expected))
+    expected.sort()
+    assert list(keys) == expected and len(keys) == len(expected)
+    assert keys.first() == expected[0]
+
+    # Emptying every bucket
+    rng.shuffle(expected)
+    while expected:
+        keys.remove(expected.pop())
+        if len(expected) % 100 == 0:
+            assert list(keys) == sorted(expected)
+    assert len(keys) == 0 and list(keys) == []
+
+async def deleted_submission(db):
+    rankings = RankingIndex(db)
+    await rankings.start_event(1)
+    rankings.apply_vote(1, 99, 5)  # A vote for a submission deleted before its details were read
+    return await rankings.get_standings(1)
+
+def test_deleted_submissions_are_dropped(conn, db):
+    seed(conn)
+    standings = asyncio.run(deleted_submission(db))
+    assert [standing.submission_id for standing in standings] == [1, 2]
@@ -0,0 +1,28 @@
+from database import VoteRequest
+from journal import VoteJournal
+from replay import load_entries, prepare_database, replay
+
+def test_replays_an_ended_event_from_a_copied_database(conn, db_path, tmp_path):
+    conn.execute("INSERT INTO events (event_id, name, active) VALUES (1, 'Countdown', 0)")
+    conn.executemany(
+        "INSERT INTO submissions (submission_id, event_id, track_id) VALUES (?, 1, ?)",
+        [(submission_id, f"Track-{submission_id}") for submission_id in range(1, 6)]
+    )
+    conn.commit()
+
+    journal = VoteJournal(str(tmp_path / "journal"))
+    journal.open(0)
+    journal.append([VoteRequest(1, user_id, f"user{user_id}", [user_id % 5 + 1], False) for user_id in range(10)])
+    journal.close()
+
+    requests = load_entries([journal.path])
+    scratch = prepare_database(str(tmp_path / "replay.db"), db_path, requests)
+    try:
+        accepted, durations, wall_time = replay(scratch, requests, 4)
+        assert accepted == 10
+        assert scratch.execute("SELECT COUNT(*) FROM votes WHERE event_id = 1").fetchone() == (10,)
+    finally:
+        scratch.close()
+
+    # The source database is left as it was
+    assert conn.execute("SELECT active FROM events WHERE event_id = 1").fetchone() == (0,)
@@ -0,0 +1,84 @@
+import asyncio
+import random
+
+from database import VOTE_VALUES, MAX_VOTES_PER_EVENT
+from vote_queue import VoteQueue
+
+EVENT_ID = 1
+ENDED_EVENT_ID = 2
+SUBMISSIONS = list(range(1, 9))
+USERS = list(range(100, 1100))  # About 4,000 concurrent requests across the queues
+
+def seed(conn):
+    conn.executemany(
+        "INSERT INTO events (event_id, name, active) VALUES (?, ?, ?)",
+        [(EVENT_ID, "Live", 1), (ENDED_EVENT_ID, "Ended", 0)]
+    )
+    conn.executemany(
+        "INSERT INTO submissions (submission_id, event_id, track_id) VALUES (?, ?, ?)",
+        [(submission_id, EVENT_ID, f"Track-{submission_id}") for submission_id in SUBMISSIONS]
+        + [(100 + submission_id, ENDED_EVENT_ID, f"Track-{submission_id}") for submission_id in SUBMISSIONS]
+    )
+    conn.commit()
+
+async def stress(databases, rounds=4):
+    # One storage (writer connection) and one queue per simulated process, all on the same file
+    queues = [VoteQueue(db, {"flush_interval": 0.001, "max_batch_size": 16}) for db in databases]
+    for queue in queues:
+        queue.start()
+
+    rng = random.Random(1234)
+    accepted = {}  # user_id -> number of votes the queues reported as recorded
+
+    async def voter(user_id):
+        calls = []
+        for _ in range(rounds):
+            queue = rng.choice(queues)
+            if rng.random() < 0.25:
+                picks = rng.sample(SUBMISSIONS, 3)
+                calls.append((True, queue.submit_ballot(EVENT_ID, picks, user_id, f"user{user_id}")))
+            else:
+                calls.append((False, queue.submit_vote(EVENT_ID, rng.choice(SUBMISSIONS), user_id, f"user{user_id}")))
+        results = await asyncio.gather(*(call for ballot, call in calls))
+        accepted[user_id] = sum(
+            3 if ballot and result else (1 if not ballot and result is not None else 0)
+            for (ballot, call), result in zip(calls, results)
+        )
+
+    try:
+        await asyncio.gather(*(voter(user_id) for user_id in USERS))
+        ended = await queues[0].submit_vote(ENDED_EVENT_ID, 101, USERS[0], "late")
+    finally:
+        for queue in queues:
+            await queue.stop()
+    return accepted, ended
+
+def test_concurrent_queues_keep_quota_ranks_and_scores(conn, open_db):
+    seed(conn)
+    accepted, ended_result = asyncio.run(stress([open_db() for _ in range(3)]))
+
+    cursor = conn.cursor()
+
+    rows = cursor.execute("SELECT user_id, vote_rank, vote_value FROM votes WHERE event_id = ?", (EVENT_ID,)).fetchall()
+    by_user = {}
+    for user_id, vote_rank, vote_value in rows:
+        by_user.setdefault(user_id, []).append((vote_rank, vote_value))
+
+    for user_id in USERS:
+        votes = sorted(by_user.get(user_id, []))
+        assert len(votes) <= MAX_VOTES_PER_EVENT
+        assert len(votes) == accepted[user_id]
+        # Ranks are 0, 1, 2... without gaps or duplicates, each with its weight
+        assert votes == [(rank, VOTE_VALUES[rank]) for rank in range(len(votes))]
+
+    # The materialized scores match a recomputation from the votes table
+    stored = dict(cursor.execute("SELECT submission_id, score FROM submission_scores WHERE event_id = ?", (EVENT_ID,)).fetchall())
+    actual = dict(cursor.execute(
+        "SELECT submission_id, SUM(vote_value) FROM votes WHERE event_id = ? GROUP BY submission_id",
+        (EVENT_ID,)
+    ).fetchall())
+    assert stored == actual
+
+    # Votes for an event that is no longer active are rejected
+    assert ended_result is None
+    assert cursor.execute("SELECT COUNT(*) FROM votes WHERE event_id = ?", (ENDED_EVENT_ID,)).fetchone()[0] == 0
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import sqlite3
+
+from database import VoteRequest
+
+# Queue settings used when config.yaml has no "votes" section
+DEFAULT_VOTE_SETTINGS = {
+    "flush_interval": 0.05,  # Seconds to wait for more votes after the first one arrives
+    "max_batch_size": 200,   # Votes written per transaction at most
+}
+
+WRITE_ATTEMPTS = 3
+
+class VoteQueue:
+    """Group-commit ingestion for votes.
+
+    Votes are queued from the reaction and submitvote handlers, collected for up to
+    flush_interval seconds (or until max_batch_size is reached) and written with
+    executemany in a single transaction. Each caller's future resolves only after the
+    batch containing its vote has been committed. With a VoteJournal, every batch is
+    journaled (and fsynced) before it is written, and recover() replays what the database
+    never committed.
+    """
+
+    def __init__(self, db, settings=None, journal=None):
+        self.db = db
+        self.journal = journal
+        settings = dict(DEFAULT_VOTE_SETTINGS, **(settings or {}))
+        self.flush_interval = float(settings["flush_interval"])
+        self.max_batch_size = int(settings["max_batch_size"])
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        """Starts the background flusher on the running event loop."""
+        if self._task is None:
+            # Created here rather than in __init__ so it belongs to the bot's loop
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stops the flusher after writing every vote that is already queued."""
+        if self._task is None:
+            return
+        await self._queue.put(None)  # Sentinel: flush what is left and exit
+        await self._task
+        self._task = None
+        if self.journal is not None:
+            self.journal.close()
+
+    def pending(self):
+        """Returns the number of votes waiting to be written."""
+        return self._queue.qsize() if self._queue else 0
+
+    async def submit_vote(self, event_id, submission_id, user_id, voter_name):
+        """Queues a reaction vote and waits until it is durable.
+
+        Returns the vote value, or None when the user has no votes left in the event.
+        """
+        return await self._submit(VoteRequest(event_id, user_id, voter_name, [submission_id], False))
+
+    async def submit_ballot(self, event_id, submission_ids, user_id, voter_name):
+        """Queues a submitvote ballot and waits until it is durable.
+
+        Returns False when the user has already voted in the event.
+        """
+        return await self._submit(VoteRequest(event_id, user_id, voter_name, list(submission_ids), True))
+
+    async def _submit(self, request):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((request, future))
+        return await future
+
+    async def _run(self):
+        if self.journal is not None and not self.journal.opened:
+            await self.recover()
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+    async def recover(self):
+        """Replays journaled votes the database never committed (called once, before start()).
+
+        Returns the ids of the events that received replayed votes.
+        """
+        if self.journal is None:
+            return set()
+        committed = await self.db.get_journal_position(self.journal.name)
+        pending = await asyncio.to_thread(self.journal.open, committed)
+        for start in range(0, len(pending), self.max_batch_size):
+            entries = pending[start:start + self.max_batch_size]
+            await self._record([request for seq, request in entries], (self.journal.name, entries[-1][0]))
+        if pending:
+            logging.warning(f"Replayed {len(pending)} journaled votes that had not been committed")
+        return {request.event_id for seq, request in pending}
+
+    async def _flush(self, batch):
+        requests = [request for request, future in batch]
+        journaled = None
+        try:
+            if self.journal is not None:
+                journaled = await asyncio.to_thread(self.journal.append, requests)
+            results = await self._record(requests, (self.journal.name, journaled[1]) if journaled else None)
+        except Exception as e:
+            logging.error(f"Failed to write a batch of {len(batch)} votes: {e}")
+            if journaled:
+                try:
+                    await asyncio.to_thread(self.journal.abort, *journaled)
+                except OSError as abort_error:
+                    logging.error(f"Could not mark journal entries {journaled} aborted: {abort_error}")
+            for request, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        logging.debug(f"Committed a batch of {len(batch)} votes")
+        for (request, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _record(self, requests, journal=None):
+        # A unique-rank conflict means another writer won the race for a quota slot; the
+        # batch was rolled back, so it is safe to run it again against the new counts.
+        for attempt in range(WRITE_ATTEMPTS):
+            try:
+                return await self.db.record_votes(requests, journal)
+            except sqlite3.IntegrityError as e:
+                if attempt == WRITE_ATTEMPTS - 1:
+                    raise
+                logging.warning(f"Retrying vote batch after a quota conflict: {e}")
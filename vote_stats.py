@@ -0,0 +1,48 @@
+# Time-windowed vote queries. Times are UTC epoch seconds; every query is a range scan of
+# the (event_id, voted_at) index.
+
+COUNT_VOTES_QUERY = "SELECT COUNT(*), COALESCE(SUM(vote_value), 0) FROM votes WHERE event_id = ? AND voted_at >= ?"
+COUNT_VOTES_UNTIL_QUERY = COUNT_VOTES_QUERY + " AND voted_at < ?"
+VOTES_PER_MINUTE_QUERY = (
+    "SELECT voted_at / 60 * 60 AS minute, COUNT(*), SUM(vote_value) "
+    "FROM votes "
+    "WHERE event_id = ? AND voted_at >= ? "
+    "GROUP BY minute "
+    "ORDER BY minute"
+)
+VOTES_PER_MINUTE_UNTIL_QUERY = VOTES_PER_MINUTE_QUERY.replace("GROUP BY", "AND voted_at < ? GROUP BY")
+LAST_CHART_TIME_QUERY = "SELECT published_at FROM standings_snapshots WHERE event_id = ? ORDER BY snapshot_id DESC LIMIT 1"
+
+def count_votes(cursor, event_id, since, until=None):
+    """Returns (votes, points) cast in an event from since up to (not including) until."""
+    if until is None:
+        cursor.execute(COUNT_VOTES_QUERY, (event_id, since))
+    else:
+        cursor.execute(COUNT_VOTES_UNTIL_QUERY, (event_id, since, until))
+    return cursor.fetchone()
+
+def votes_per_minute(cursor, event_id, since, until=None):
+    """Returns (minute, votes, points) for every minute with votes in the window, oldest first.
+
+    minute is the epoch second the minute starts at.
+    """
+    if until is None:
+        cursor.execute(VOTES_PER_MINUTE_QUERY, (event_id, since))
+    else:
+        cursor.execute(VOTES_PER_MINUTE_UNTIL_QUERY, (event_id, since, until))
+    return cursor.fetchall()
+
+def get_last_chart_time(cursor, event_id):
+    """Returns when the event's standings were last published, or None."""
+    cursor.execute(LAST_CHART_TIME_QUERY, (event_id,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def votes_since_last_chart(cursor, event_id):
+    """Returns (published_at, votes, points) for the votes cast since the last chart publication.
+
+    published_at is None, and every vote of the event is counted, when no chart was published yet.
+    """
+    published_at = get_last_chart_time(cursor, event_id)
+    votes, points = count_votes(cursor, event_id, published_at or 0)
+    return published_at, votes, points